@@ -0,0 +1,72 @@
+import os
+import sys
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from wrapper import generate_vhdl
+# test_bench_generator/ is put on the import path by wrapper.py
+from test_bench_generator import TEST_BENCH_FILE, generate_test_bench_file
+
+def generate_configuration(configuration : dict):
+    """Generate one configuration in its own directory and return its result.
+
+    configuration is {"output_dir": ..., "design": {generate_vhdl() arguments}, "test_bench": {generate_test_bench_file()
+    arguments}}, design and test_bench being optional. The test bench takes MEM_DEPTH and MEM_WIDTH from the design when it
+    does not give them, and its files (test bench, vector file, preloaded rules) are written to output_dir. The result holds
+    the cost_model() of the design, whether the test bench was regenerated, or the error that stopped the generation.
+    """
+    output_dir : str = configuration["output_dir"]
+    result : dict = {"output_dir": output_dir}
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        design = configuration.get("design")
+        if design is not None:
+            result["cost"] = generate_vhdl(**design, output_dir=output_dir)
+        test_bench = configuration.get("test_bench")
+        if test_bench is not None:
+            options : dict = {key: design[key] for key in ("MEM_DEPTH", "MEM_WIDTH") if design is not None and key in design}
+            options.update(test_bench)
+            if options.get("vector_file") is not None:
+                options["vector_file"] = os.path.join(output_dir, os.path.basename(options["vector_file"]))
+            result["test_bench_generated"] = generate_test_bench_file(**options, output_file=os.path.join(output_dir, TEST_BENCH_FILE))
+    except Exception as error:
+        result["error"] = f"{type(error).__name__}: {error}"
+    return result
+
+def generate_batch(configurations : list, jobs : int = None, threads : bool = False):
+    """Generate configurations in parallel, see generate_configuration(), and return their results in the same order.
+
+    The generators are CPU bound, so they run in jobs processes by default. With threads they run in this process,
+    which the generators allow since they only use their arguments and their output directory.
+    """
+    executor = ThreadPoolExecutor if threads else ProcessPoolExecutor
+    with executor(max_workers=jobs) as pool:
+        return list(pool.map(generate_configuration, configurations))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Generate many design and test bench configurations in parallel, each in its own directory.')
+    parser.add_argument('configurations', help='JSON file holding a list of {"output_dir", "design", "test_bench"} configurations, '
+                                               'design and test_bench holding the arguments of generate_vhdl() and generate_test_bench_file()')
+    parser.add_argument('--jobs','-j', type=int, default= os.cpu_count(), help='Number of configurations generated at the same time')
+    parser.add_argument('--threads', action='store_true', help='Generate in threads of this process instead of worker processes')
+
+    args = parser.parse_args()
+
+    with open(args.configurations, 'r') as f:
+        configurations = json.load(f)
+    results = generate_batch(configurations, args.jobs, args.threads)
+
+    for result in results:
+        if "error" in result:
+            print(f"{result['output_dir']}: {result['error']}", file=sys.stderr)
+        elif "cost" in result:
+            print(f"{result['output_dir']}: {result['cost']['arch']}, {result['cost']['logic_levels']} logic levels, {result['cost']['area_units']} area units")
+        else:
+            print(f"{result['output_dir']}: test bench {'generated' if result.get('test_bench_generated') else 'up to date'}")
+    errors : int = sum("error" in result for result in results)
+    print(f"{len(results)} configuration(s) generated, {errors} in error")
+    if errors:
+        raise SystemExit(1)
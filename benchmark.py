@@ -0,0 +1,130 @@
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+import numpy as np
+
+from wrapper import generate_vhdl
+# test_bench_generator/ is put on the import path by wrapper.py
+from test_bench_generator import period, unite, generate_test_bench_file
+from reference_model import ENCODINGS, rwx_width, field_widths, decode_rules, evaluate, write_requests
+from rule_image import write_rule_image
+from rule_optimizer import MATCHABLE_RWX, encode_rules
+import vector_generator
+
+GHDL : str = "ghdl"
+
+def random_rules(path : str, MEM_DEPTH : int, MEM_WIDTH : int, rng, encoding : str = "range"):
+    """Write one valid rule per memory cell (ID, read or write rwx, non empty range) and return the rule words.
+
+    A range rule has addr_min < addr_max within the addr_max field, a NAPOT rule a naturally aligned power-of-two region.
+    """
+    ID_width, adress_width = field_widths(MEM_DEPTH, MEM_WIDTH, encoding)
+    field_id = rng.integers(0, 2**ID_width, MEM_DEPTH)
+    field_rwx = rng.choice(MATCHABLE_RWX, MEM_DEPTH)
+    if encoding == "napot":
+        size_bits = rng.integers(0, adress_width + 1, MEM_DEPTH)
+        addr_min = rng.integers(0, 2**(adress_width - size_bits)) << size_bits
+        addr_max = addr_min + (1 << size_bits)
+    else:
+        addr_max_width : int = MEM_WIDTH-ID_width-rwx_width-adress_width
+        addr_max = rng.integers(1, 2**addr_max_width, MEM_DEPTH)
+        addr_min = rng.integers(0, addr_max)
+    words = encode_rules(list(zip(field_id.tolist(), field_rwx.tolist(), addr_min.tolist(), addr_max.tolist())), MEM_DEPTH, MEM_WIDTH, encoding)
+    write_rule_image(path, words, MEM_DEPTH, MEM_WIDTH)
+    return words
+
+def random_requests(path : str, requests : int, words, MEM_DEPTH : int, MEM_WIDTH : int, rng, encoding : str = "range"):
+    # uniformly random single beat requests with the responses of the reference model to the rules words
+    mid, rwx, addr = vector_generator.random_requests(requests, MEM_DEPTH, MEM_WIDTH, rng, encoding)
+    expected = evaluate(decode_rules(words, MEM_DEPTH, MEM_WIDTH, encoding), mid, rwx, addr)
+    write_requests(path, {"mid": mid, "rwx": rwx, "addr": addr}, expected, MEM_DEPTH, MEM_WIDTH, encoding)
+
+def measure(function, *args, **kwargs):
+    # wall time in seconds and peak python memory in bytes, from two calls so that tracemalloc does not slow down the timed one
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    function(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": seconds, "peak_bytes": peak}
+
+def run_ghdl(work_dir : str, stop_time : int):
+    # analyse, elaborate and run times, None when ghdl is not available
+    if shutil.which(GHDL) is None:
+        return None
+    timings = {}
+    for step, command in (("analyze", [GHDL, "-a", "rules_array.vhd", "wrapper.vhd", "interface_AXI.vhd", "Interface_AXI_tb.vhd"]),
+                          ("elaborate", [GHDL, "-e", "generated_tb"]),
+                          ("run", [GHDL, "-r", "generated_tb", f"--stop-time={stop_time}{unite}"])):
+        start = time.perf_counter()
+        result = subprocess.run(command, cwd=work_dir, capture_output=True, text=True)
+        timings[f"{step}_seconds"] = time.perf_counter() - start
+        if result.returncode != 0 and step != "run":
+            timings["error"] = result.stderr.strip()
+            break
+    return timings
+
+def benchmark_point(MEM_DEPTH : int, MEM_WIDTH : int, requests : int, vector_file : bool, simulate : bool, seed : int, encoding : str = "range"):
+    rng = np.random.default_rng(seed)
+    point = {"mem_depth": MEM_DEPTH, "mem_width": MEM_WIDTH, "requests": requests, "vector_file": vector_file, "encoding": encoding}
+    with tempfile.TemporaryDirectory() as work_dir:
+        memory_file : str = os.path.join(work_dir, "memory_configuration.txt")
+        request_file : str = os.path.join(work_dir, "request.txt")
+        words = random_rules(memory_file, MEM_DEPTH, MEM_WIDTH, rng, encoding)
+        random_requests(request_file, requests, words, MEM_DEPTH, MEM_WIDTH, rng, encoding)
+
+        # every file is generated in work_dir, the working directory of the benchmark does not change
+        point["generate_vhdl"] = measure(generate_vhdl, MEM_DEPTH, MEM_WIDTH, encoding=encoding, output_dir=work_dir)
+        point["generate_test_bench_file"] = measure(generate_test_bench_file, MEM_DEPTH, MEM_WIDTH, os.path.join(work_dir, "vectors.txt") if vector_file else None,
+                                                    memory_file=memory_file, request_file=request_file,
+                                                    output_file=os.path.join(work_dir, "Interface_AXI_tb.vhd"), incremental=False, encoding=encoding)
+        point["file_bytes"] = {name: os.path.getsize(os.path.join(work_dir, name)) for name in sorted(os.listdir(work_dir)) if name.endswith((".vhd", ".txt"))}
+        if simulate:
+            point["ghdl"] = run_ghdl(work_dir, 30 + period*(MEM_DEPTH + requests + 10))
+    return point
+
+def int_list(text : str):
+    return [int(value) for value in text.split(',')]
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Measure how the generators and the simulation scale with MEM_DEPTH, MEM_WIDTH and the number of requests.')
+    parser.add_argument('--mem_depths', type=int_list, default=[8, 64, 256], help='Comma separated MEM_DEPTH values')
+    parser.add_argument('--mem_widths', type=int_list, default=[16, 32], help='Comma separated MEM_WIDTH values')
+    parser.add_argument('--requests', type=int_list, default=[100, 10000], help='Comma separated request counts')
+    parser.add_argument('--vector_file', action='store_true', help='Generate file-driven test benches instead of unrolled ones')
+    parser.add_argument('--no_simulation', action='store_true', help='Only measure the generators, skip ghdl')
+    parser.add_argument('--encoding','-e', choices=ENCODINGS, default='range', help='Address field of the rules: addr_min/addr_max range or NAPOT region')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random rules and requests')
+    parser.add_argument('--output','-o', default=None, help='JSON output file (default: standard output)')
+
+    args = parser.parse_args()
+
+    points = []
+    for MEM_DEPTH in args.mem_depths:
+        for MEM_WIDTH in args.mem_widths:
+            ID_width : int = math.ceil(math.log2(MEM_DEPTH))
+            if MEM_WIDTH - ID_width - 3 < 2:
+                print(f"skipping MEM_DEPTH = {MEM_DEPTH} MEM_WIDTH = {MEM_WIDTH}: no room for the address fields", file=sys.stderr)
+                continue
+            for requests in args.requests:
+                print(f"MEM_DEPTH = {MEM_DEPTH} MEM_WIDTH = {MEM_WIDTH} requests = {requests}", file=sys.stderr)
+                points.append(benchmark_point(MEM_DEPTH, MEM_WIDTH, requests, args.vector_file, not args.no_simulation, args.seed, args.encoding))
+
+    result = json.dumps({"ghdl": shutil.which(GHDL) is not None, "points": points}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(result + "\n")
+    else:
+        print(result)
@@ -19,7 +19,18 @@ entity interface_AXI is
         C_S_AXI_RUSER_WIDTH    : integer := 0;
         C_S_AXI_BUSER_WIDTH    : integer := 0;
 
-        C_MASTER_ID_WIDTH      : integer := 3
+        C_MASTER_ID_WIDTH      : integer := 3;
+
+        -- Clock cycles between an address and the wrapper decision
+        C_DECISION_LATENCY     : integer := 1;
+        -- Depth of the address, write route and local response FIFOs, at least C_DECISION_LATENCY+2 for one address per cycle
+        C_FIFO_DEPTH           : integer := 3;
+        -- Transactions forwarded to the protected slave per ID
+        C_MAX_OUTSTANDING      : integer := 255;
+        -- Response of a denied transaction, SLVERR ("10") or DECERR ("11")
+        C_DENY_RESP            : std_logic_vector(1 downto 0) := "10";
+        -- Rule image loaded into the rules at elaboration and restored by reset, empty for no preloaded rules
+        C_RULES_INIT_FILE      : string := ""
     );
     port(
         -- Memory configuration
@@ -105,28 +116,666 @@ entity interface_AXI is
         S_AXI_RRESP       : out std_logic_vector(1 downto 0); -- Read response code (OKAY, EXOKAY, SLVERR, DECERR)
         S_AXI_RLAST       : out std_logic; -- Indicates the last data transfer in a read burst
         S_AXI_RUSER       : out std_logic_vector(C_S_AXI_RUSER_WIDTH-1 downto 0); -- Additional user signals 
-        S_AXI_RVALID      : out std_logic  -- Indicates that the read data is valid
+        S_AXI_RVALID      : out std_logic; -- Indicates that the read data is valid
+
+        -- Firewall to protected slave signals, only the allowed transactions are forwarded
+
+        -- Write address and control channels
+        M_AXI_AWID        : out std_logic_vector(C_S_AXI_ID_WIDTH-1 downto 0);
+        M_AXI_AWADDR      : out std_logic_vector(C_S_AXI_ADDR_WIDTH-1 downto 0);
+        M_AXI_AWLEN       : out std_logic_vector(7 downto 0);
+        M_AXI_AWSIZE      : out std_logic_vector(2 downto 0);
+        M_AXI_AWBURST     : out std_logic_vector(1 downto 0);
+        M_AXI_AWLOCK      : out std_logic;
+        M_AXI_AWCACHE     : out std_logic_vector(3 downto 0);
+        M_AXI_AWPROT      : out std_logic_vector(2 downto 0);
+        M_AXI_AWQOS       : out std_logic_vector(3 downto 0);
+        M_AXI_AWREGION    : out std_logic_vector(3 downto 0);
+        M_AXI_AWUSER      : out std_logic_vector(C_S_AXI_AWUSER_WIDTH-1 downto 0);
+        M_AXI_AWVALID     : out std_logic;
+        M_AXI_AWREADY     : in std_logic := '0';
+
+        -- Write data and control channels
+        M_AXI_WDATA       : out std_logic_vector(C_S_AXI_DATA_WIDTH-1 downto 0);
+        M_AXI_WSTRB       : out std_logic_vector((C_S_AXI_DATA_WIDTH/8)-1 downto 0);
+        M_AXI_WLAST       : out std_logic;
+        M_AXI_WUSER       : out std_logic_vector(C_S_AXI_WUSER_WIDTH-1 downto 0);
+        M_AXI_WVALID      : out std_logic;
+        M_AXI_WREADY      : in std_logic := '0';
+
+        -- Write response from the protected slave
+        M_AXI_BID         : in std_logic_vector(C_S_AXI_ID_WIDTH-1 downto 0) := (others => '0');
+        M_AXI_BRESP       : in std_logic_vector(1 downto 0) := "00";
+        M_AXI_BUSER       : in std_logic_vector(C_S_AXI_BUSER_WIDTH-1 downto 0) := (others => '0');
+        M_AXI_BVALID      : in std_logic := '0';
+        M_AXI_BREADY      : out std_logic;
+
+        -- Read address and control channels
+        M_AXI_ARID        : out std_logic_vector(C_S_AXI_ID_WIDTH-1 downto 0);
+        M_AXI_ARADDR      : out std_logic_vector(C_S_AXI_ADDR_WIDTH-1 downto 0);
+        M_AXI_ARLEN       : out std_logic_vector(7 downto 0);
+        M_AXI_ARSIZE      : out std_logic_vector(2 downto 0);
+        M_AXI_ARBURST     : out std_logic_vector(1 downto 0);
+        M_AXI_ARLOCK      : out std_logic;
+        M_AXI_ARCACHE     : out std_logic_vector(3 downto 0);
+        M_AXI_ARPROT      : out std_logic_vector(2 downto 0);
+        M_AXI_ARQOS       : out std_logic_vector(3 downto 0);
+        M_AXI_ARREGION    : out std_logic_vector(3 downto 0);
+        M_AXI_ARUSER      : out std_logic_vector(C_S_AXI_ARUSER_WIDTH-1 downto 0);
+        M_AXI_ARVALID     : out std_logic;
+        M_AXI_ARREADY     : in std_logic := '0';
+
+        -- Read data from the protected slave
+        M_AXI_RID         : in std_logic_vector(C_S_AXI_ID_WIDTH-1 downto 0) := (others => '0');
+        M_AXI_RDATA       : in std_logic_vector(C_S_AXI_DATA_WIDTH-1 downto 0) := (others => '0');
+        M_AXI_RRESP       : in std_logic_vector(1 downto 0) := "00";
+        M_AXI_RLAST       : in std_logic := '0';
+        M_AXI_RUSER       : in std_logic_vector(C_S_AXI_RUSER_WIDTH-1 downto 0) := (others => '0');
+        M_AXI_RVALID      : in std_logic := '0';
+        M_AXI_RREADY      : out std_logic
     );
 end interface_AXI;
 
 architecture interface_AXI_arch of interface_AXI is
 
+    type ChannelOwnerType is (NONE, SLAVE, LOCAL); -- source of the response currently presented on the B or R channel
+    type CounterArrayType is array (0 to 2**C_S_AXI_ID_WIDTH-1) of natural range 0 to C_MAX_OUTSTANDING; -- one counter per AXI ID
+    type IdArrayType is array (natural range <>) of std_logic_vector(C_S_AXI_ID_WIDTH-1 downto 0);
+
+    -- address and control of a transaction, allowed is the wrapper decision
+    type WriteAddressType is record
+        id      : std_logic_vector(C_S_AXI_ID_WIDTH-1 downto 0);
+        addr    : std_logic_vector(C_S_AXI_ADDR_WIDTH-1 downto 0);
+        len     : std_logic_vector(7 downto 0);
+        size    : std_logic_vector(2 downto 0);
+        burst   : std_logic_vector(1 downto 0);
+        lock    : std_logic;
+        cache   : std_logic_vector(3 downto 0);
+        prot    : std_logic_vector(2 downto 0);
+        qos     : std_logic_vector(3 downto 0);
+        region  : std_logic_vector(3 downto 0);
+        user    : std_logic_vector(C_S_AXI_AWUSER_WIDTH-1 downto 0);
+        allowed : std_logic;
+    end record;
+    type WriteAddressArrayType is array (natural range <>) of WriteAddressType;
+
+    type ReadAddressType is record
+        id      : std_logic_vector(C_S_AXI_ID_WIDTH-1 downto 0);
+        addr    : std_logic_vector(C_S_AXI_ADDR_WIDTH-1 downto 0);
+        len     : std_logic_vector(7 downto 0);
+        size    : std_logic_vector(2 downto 0);
+        burst   : std_logic_vector(1 downto 0);
+        lock    : std_logic;
+        cache   : std_logic_vector(3 downto 0);
+        prot    : std_logic_vector(2 downto 0);
+        qos     : std_logic_vector(3 downto 0);
+        region  : std_logic_vector(3 downto 0);
+        user    : std_logic_vector(C_S_AXI_ARUSER_WIDTH-1 downto 0);
+        allowed : std_logic;
+    end record;
+    type ReadAddressArrayType is array (natural range <>) of ReadAddressType;
+
+    -- destination of a write data burst : the protected slave or the bit bucket
+    type RouteType is record
+        forward : std_logic;
+        id      : std_logic_vector(C_S_AXI_ID_WIDTH-1 downto 0);
+    end record;
+    type RouteArrayType is array (natural range <>) of RouteType;
+
+    -- denied read answered locally with len+1 error beats
+    type BurstType is record
+        id  : std_logic_vector(C_S_AXI_ID_WIDTH-1 downto 0);
+        len : std_logic_vector(7 downto 0);
+    end record;
+    type BurstArrayType is array (natural range <>) of BurstType;
+
+    -- lowest and highest address of the burst footprint : one beat for FIXED, len+1 beats from the aligned address for INCR,
+    -- the whole wrap window for WRAP; the highest address saturates to all ones when the burst leaves the address space
+    -- or has the reserved burst type, burst_invalid flags these bursts, which are denied whatever the rules
+    -- (a NAPOT region at the top of the address space contains the all ones address)
+    function burst_first(addr : std_logic_vector; len : std_logic_vector; size : std_logic_vector; burst : std_logic_vector) return std_logic_vector is
+        variable total : unsigned(C_S_AXI_ADDR_WIDTH+15 downto 0);
+        variable first : unsigned(C_S_AXI_ADDR_WIDTH+15 downto 0);
+    begin
+        first := resize(unsigned(addr), C_S_AXI_ADDR_WIDTH+16);
+        if burst = "10" then
+            total := shift_left(resize(unsigned(len), C_S_AXI_ADDR_WIDTH+16) + 1, to_integer(unsigned(size)));
+            first := first and not (total - 1);
+        end if;
+        return std_logic_vector(first(C_S_AXI_ADDR_WIDTH-1 downto 0));
+    end function;
+
+    -- highest address of the burst on 16 more bits, the reserved burst type overflows them
+    function burst_end(addr : std_logic_vector; len : std_logic_vector; size : std_logic_vector; burst : std_logic_vector) return unsigned is
+        variable beat : unsigned(C_S_AXI_ADDR_WIDTH+15 downto 0);
+        variable total : unsigned(C_S_AXI_ADDR_WIDTH+15 downto 0);
+        variable start : unsigned(C_S_AXI_ADDR_WIDTH+15 downto 0);
+    begin
+        beat := shift_left(to_unsigned(1, C_S_AXI_ADDR_WIDTH+16), to_integer(unsigned(size)));
+        total := shift_left(resize(unsigned(len), C_S_AXI_ADDR_WIDTH+16) + 1, to_integer(unsigned(size)));
+        start := resize(unsigned(addr), C_S_AXI_ADDR_WIDTH+16);
+        case burst is
+            when "00" => return (start and not (beat - 1)) + beat - 1;  -- FIXED
+            when "01" => return (start and not (beat - 1)) + total - 1; -- INCR
+            when "10" => return (start and not (total - 1)) + total - 1; -- WRAP
+            when others => return (C_S_AXI_ADDR_WIDTH+15 downto 0 => '1');
+        end case;
+    end function;
+
+    function burst_invalid(addr : std_logic_vector; len : std_logic_vector; size : std_logic_vector; burst : std_logic_vector) return std_logic is
+        variable last : unsigned(C_S_AXI_ADDR_WIDTH+15 downto 0);
+    begin
+        last := burst_end(addr, len, size, burst);
+        if last(C_S_AXI_ADDR_WIDTH+15 downto C_S_AXI_ADDR_WIDTH) /= 0 then
+            return '1';
+        end if;
+        return '0';
+    end function;
+
+    function burst_last(addr : std_logic_vector; len : std_logic_vector; size : std_logic_vector; burst : std_logic_vector) return std_logic_vector is
+        variable last : unsigned(C_S_AXI_ADDR_WIDTH+15 downto 0);
+    begin
+        last := burst_end(addr, len, size, burst);
+        if last(C_S_AXI_ADDR_WIDTH+15 downto C_S_AXI_ADDR_WIDTH) /= 0 then
+            return (C_S_AXI_ADDR_WIDTH-1 downto 0 => '1');
+        end if;
+        return std_logic_vector(last(C_S_AXI_ADDR_WIDTH-1 downto 0));
+    end function;
+
+    -- active high reset of the wrapper, S_AXI_ARESETN is active low
+    signal reset : std_logic;
+
+    -- footprints checked by the wrapper, one decision per burst
+    signal aw_first : std_logic_vector(C_S_AXI_ADDR_WIDTH-1 downto 0);
+    signal aw_last  : std_logic_vector(C_S_AXI_ADDR_WIDTH-1 downto 0);
+    signal ar_first : std_logic_vector(C_S_AXI_ADDR_WIDTH-1 downto 0);
+    signal ar_last  : std_logic_vector(C_S_AXI_ADDR_WIDTH-1 downto 0);
+
+    signal write_response : std_logic;
+    signal read_response : std_logic;
+
+    -- invalid bursts, delayed like the wrapper decision, and the decisions once they are denied
+    signal aw_invalid : std_logic_vector(0 to C_DECISION_LATENCY-1) := (others => '0');
+    signal ar_invalid : std_logic_vector(0 to C_DECISION_LATENCY-1) := (others => '0');
+    signal write_decision : std_logic;
+    signal read_decision : std_logic;
+
+    -- write address : delay line aligned with the wrapper decision, then FIFO of decided addresses
+    signal aw_pipe       : WriteAddressArrayType(0 to C_DECISION_LATENCY-1);
+    signal aw_pipe_valid : std_logic_vector(0 to C_DECISION_LATENCY-1) := (others => '0');
+    signal aw_fifo       : WriteAddressArrayType(0 to C_FIFO_DEPTH-1);
+    signal aw_head       : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal aw_tail       : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal aw_count      : natural range 0 to C_FIFO_DEPTH := 0; -- decided addresses
+    signal aw_credits    : natural range 0 to C_FIFO_DEPTH := 0; -- accepted addresses not yet forwarded or dropped
+    signal aw_ready      : std_logic;
+    signal aw_forward    : std_logic; -- allowed head presented to the protected slave
+    signal aw_drop       : std_logic; -- denied head dropped
+    signal aw_pop        : std_logic;
+
+    -- write data : one route per decided address, in address order
+    signal w_route       : RouteArrayType(0 to C_FIFO_DEPTH-1);
+    signal w_route_head  : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal w_route_tail  : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal w_route_count : natural range 0 to C_FIFO_DEPTH := 0;
+    signal w_forward     : std_logic;
+    signal w_drop        : std_logic;
+    signal w_ready       : std_logic;
+
+    -- write response : IDs of the denied writes whose data has been swallowed
+    signal b_local       : IdArrayType(0 to C_FIFO_DEPTH-1);
+    signal b_local_head  : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal b_local_tail  : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal b_local_count : natural range 0 to C_FIFO_DEPTH := 0;
+    signal b_local_valid : std_logic;
+    signal b_owner       : ChannelOwnerType := NONE;
+    signal b_select      : ChannelOwnerType;
+    signal b_valid       : std_logic;
+    signal w_outstanding : CounterArrayType := (others => 0); -- writes forwarded and not yet answered by the slave
+    signal w_denied      : CounterArrayType := (others => 0); -- denied writes not yet answered
+    signal w_denied_total : natural range 0 to C_FIFO_DEPTH := 0;
+
+    -- read address : same structure as the write address
+    signal ar_pipe       : ReadAddressArrayType(0 to C_DECISION_LATENCY-1);
+    signal ar_pipe_valid : std_logic_vector(0 to C_DECISION_LATENCY-1) := (others => '0');
+    signal ar_fifo       : ReadAddressArrayType(0 to C_FIFO_DEPTH-1);
+    signal ar_head       : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal ar_tail       : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal ar_count      : natural range 0 to C_FIFO_DEPTH := 0;
+    signal ar_credits    : natural range 0 to C_FIFO_DEPTH := 0;
+    signal ar_ready      : std_logic;
+    signal ar_forward    : std_logic;
+    signal ar_drop       : std_logic;
+    signal ar_pop        : std_logic;
+
+    -- read data : denied reads waiting for their error beats
+    signal r_local       : BurstArrayType(0 to C_FIFO_DEPTH-1);
+    signal r_local_head  : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal r_local_tail  : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal r_local_count : natural range 0 to C_FIFO_DEPTH := 0;
+    signal r_local_valid : std_logic;
+    signal r_local_last  : std_logic;
+    signal r_beat        : unsigned(7 downto 0) := (others => '0');
+    signal r_owner       : ChannelOwnerType := NONE;
+    signal r_select      : ChannelOwnerType;
+    signal r_valid       : std_logic;
+    signal r_last        : std_logic;
+    signal r_outstanding : CounterArrayType := (others => 0); -- reads forwarded and not yet completed by the slave
+    signal r_denied      : CounterArrayType := (others => 0); -- denied reads not yet completed
+
 begin
 
+    reset <= not S_AXI_ARESETN;
+
+    aw_first <= burst_first(S_AXI_AWADDR, S_AXI_AWLEN, S_AXI_AWSIZE, S_AXI_AWBURST);
+    aw_last <= burst_last(S_AXI_AWADDR, S_AXI_AWLEN, S_AXI_AWSIZE, S_AXI_AWBURST);
+    ar_first <= burst_first(S_AXI_ARADDR, S_AXI_ARLEN, S_AXI_ARSIZE, S_AXI_ARBURST);
+    ar_last <= burst_last(S_AXI_ARADDR, S_AXI_ARLEN, S_AXI_ARSIZE, S_AXI_ARBURST);
+
     wrapper_inst: entity work.wrapper
+     generic map(
+        INIT_FILE => C_RULES_INIT_FILE
+    )
      port map(
         clk => S_AXI_ACLK,
-        reset => S_AXI_ARESETN,
+        reset => reset,
         w_rule_enable => w_rule_enable,
         data_rule => data_rule,
         rule_number => rule_number,
         MID_W => MID_W,
         MID_R => MID_R,
         x_enable => x_enable,
-        addr_w => S_AXI_AWADDR,
-        addr_r => S_AXI_ARADDR,
-        wrapper_write_response => wrapper_write_response,
-        wrapper_read_response => wrapper_read_response
+        addr_w => aw_first,
+        addr_r => ar_first,
+        addr_w_last => aw_last,
+        addr_r_last => ar_last,
+        wrapper_write_response => write_response,
+        wrapper_read_response => read_response
     );
 
+    -- the wrapper sees the all ones address of an invalid burst, its decision is overridden
+    process (S_AXI_ACLK)
+    begin
+        if rising_edge(S_AXI_ACLK) then
+            aw_invalid(0) <= burst_invalid(S_AXI_AWADDR, S_AXI_AWLEN, S_AXI_AWSIZE, S_AXI_AWBURST);
+            ar_invalid(0) <= burst_invalid(S_AXI_ARADDR, S_AXI_ARLEN, S_AXI_ARSIZE, S_AXI_ARBURST);
+            for i in 1 to C_DECISION_LATENCY-1 loop
+                aw_invalid(i) <= aw_invalid(i-1);
+                ar_invalid(i) <= ar_invalid(i-1);
+            end loop;
+        end if;
+    end process;
+
+    write_decision <= write_response and not aw_invalid(C_DECISION_LATENCY-1);
+    read_decision <= read_response and not ar_invalid(C_DECISION_LATENCY-1);
+
+    wrapper_write_response <= write_decision;
+    wrapper_read_response <= read_decision;
+
+    ------------------------------------------- write address channel -------------------------------------------
+    -- one address accepted per cycle as long as every accepted address has a place in the decided FIFO
+    aw_ready <= '1' when aw_credits < C_FIFO_DEPTH and reset /= '1' else '0';
+    S_AXI_AWREADY <= aw_ready;
+
+    -- an allowed write waits for the local responses of the denied writes of its ID so that the B responses stay in order
+    aw_forward <= '1' when aw_count > 0 and aw_fifo(aw_head).allowed = '1' and w_route_count < C_FIFO_DEPTH
+                           and w_denied(to_integer(unsigned(aw_fifo(aw_head).id))) = 0
+                           and w_outstanding(to_integer(unsigned(aw_fifo(aw_head).id))) < C_MAX_OUTSTANDING else '0';
+    aw_drop <= '1' when aw_count > 0 and aw_fifo(aw_head).allowed = '0' and w_route_count < C_FIFO_DEPTH
+                        and w_denied_total < C_FIFO_DEPTH else '0';
+    aw_pop <= (aw_forward and M_AXI_AWREADY) or aw_drop;
+
+    M_AXI_AWID <= aw_fifo(aw_head).id;
+    M_AXI_AWADDR <= aw_fifo(aw_head).addr;
+    M_AXI_AWLEN <= aw_fifo(aw_head).len;
+    M_AXI_AWSIZE <= aw_fifo(aw_head).size;
+    M_AXI_AWBURST <= aw_fifo(aw_head).burst;
+    M_AXI_AWLOCK <= aw_fifo(aw_head).lock;
+    M_AXI_AWCACHE <= aw_fifo(aw_head).cache;
+    M_AXI_AWPROT <= aw_fifo(aw_head).prot;
+    M_AXI_AWQOS <= aw_fifo(aw_head).qos;
+    M_AXI_AWREGION <= aw_fifo(aw_head).region;
+    M_AXI_AWUSER <= aw_fifo(aw_head).user;
+    M_AXI_AWVALID <= aw_forward;
+
+    process (S_AXI_ACLK)
+        variable entry : WriteAddressType;
+        variable accept : boolean;
+        variable decided : boolean;
+    begin
+        if rising_edge(S_AXI_ACLK) then
+            if reset = '1' then
+                aw_pipe_valid <= (others => '0');
+                aw_head <= 0;
+                aw_tail <= 0;
+                aw_count <= 0;
+                aw_credits <= 0;
+            else
+                -- the wrapper samples S_AXI_AWADDR and MID_W on the same edge, its decision comes C_DECISION_LATENCY cycles later
+                accept := S_AXI_AWVALID = '1' and aw_ready = '1';
+                aw_pipe(0) <= (S_AXI_AWID, S_AXI_AWADDR, S_AXI_AWLEN, S_AXI_AWSIZE, S_AXI_AWBURST, S_AXI_AWLOCK,
+                               S_AXI_AWCACHE, S_AXI_AWPROT, S_AXI_AWQOS, S_AXI_AWREGION, S_AXI_AWUSER, '0');
+                if accept then
+                    aw_pipe_valid(0) <= '1';
+                else
+                    aw_pipe_valid(0) <= '0';
+                end if;
+                for i in 1 to C_DECISION_LATENCY-1 loop
+                    aw_pipe(i) <= aw_pipe(i-1);
+                    aw_pipe_valid(i) <= aw_pipe_valid(i-1);
+                end loop;
+
+                decided := aw_pipe_valid(C_DECISION_LATENCY-1) = '1';
+                if decided then
+                    entry := aw_pipe(C_DECISION_LATENCY-1);
+                    entry.allowed := write_decision;
+                    aw_fifo(aw_tail) <= entry;
+                    aw_tail <= (aw_tail + 1) mod C_FIFO_DEPTH;
+                end if;
+                if aw_pop = '1' then
+                    aw_head <= (aw_head + 1) mod C_FIFO_DEPTH;
+                end if;
+
+                if decided and aw_pop /= '1' then
+                    aw_count <= aw_count + 1;
+                elsif not decided and aw_pop = '1' then
+                    aw_count <= aw_count - 1;
+                end if;
+                if accept and aw_pop /= '1' then
+                    aw_credits <= aw_credits + 1;
+                elsif not accept and aw_pop = '1' then
+                    aw_credits <= aw_credits - 1;
+                end if;
+            end if;
+        end if;
+    end process;
+
+    ------------------------------------------- write data channel -------------------------------------------
+    -- the beats of a denied burst are accepted and dropped, its response is queued after the last beat
+    w_forward <= '1' when w_route_count > 0 and w_route(w_route_head).forward = '1' else '0';
+    w_drop <= '1' when w_route_count > 0 and w_route(w_route_head).forward = '0' and b_local_count < C_FIFO_DEPTH else '0';
+    w_ready <= (w_forward and M_AXI_WREADY) or w_drop;
+    S_AXI_WREADY <= w_ready;
+
+    M_AXI_WDATA <= S_AXI_WDATA;
+    M_AXI_WSTRB <= S_AXI_WSTRB;
+    M_AXI_WLAST <= S_AXI_WLAST;
+    M_AXI_WUSER <= S_AXI_WUSER;
+    M_AXI_WVALID <= S_AXI_WVALID and w_forward;
+
+    ------------------------------------------- write response channel -------------------------------------------
+    -- a denied write is answered once the writes of its ID forwarded before it have been answered by the slave
+    b_local_valid <= '1' when b_local_count > 0 and w_outstanding(to_integer(unsigned(b_local(b_local_head)))) = 0 else '0';
+
+    -- the slave responses have priority, the selected source is kept until the handshake
+    b_select <= b_owner when b_owner /= NONE else
+                SLAVE when M_AXI_BVALID = '1' else
+                LOCAL when b_local_valid = '1' else
+                NONE;
+    b_valid <= M_AXI_BVALID when b_select = SLAVE else
+               b_local_valid when b_select = LOCAL else
+               '0';
+
+    S_AXI_BVALID <= b_valid;
+    S_AXI_BID <= M_AXI_BID when b_select = SLAVE else b_local(b_local_head);
+    S_AXI_BRESP <= M_AXI_BRESP when b_select = SLAVE else C_DENY_RESP;
+    S_AXI_BUSER <= M_AXI_BUSER when b_select = SLAVE else (others => '0');
+    M_AXI_BREADY <= S_AXI_BREADY when b_select = SLAVE else '0';
+
+    process (S_AXI_ACLK)
+        variable outstanding : CounterArrayType;
+        variable denied : CounterArrayType;
+        variable denied_total : natural range 0 to C_FIFO_DEPTH;
+        variable id : natural range 0 to 2**C_S_AXI_ID_WIDTH-1;
+        variable route_push : boolean;
+        variable route_pop : boolean;
+        variable local_push : boolean;
+        variable local_pop : boolean;
+    begin
+        if rising_edge(S_AXI_ACLK) then
+            if reset = '1' then
+                w_route_head <= 0;
+                w_route_tail <= 0;
+                w_route_count <= 0;
+                b_local_head <= 0;
+                b_local_tail <= 0;
+                b_local_count <= 0;
+                b_owner <= NONE;
+                w_outstanding <= (others => 0);
+                w_denied <= (others => 0);
+                w_denied_total <= 0;
+            else
+                outstanding := w_outstanding;
+                denied := w_denied;
+                denied_total := w_denied_total;
+
+                -- route of the decided head of the write address FIFO
+                route_push := aw_pop = '1';
+                if route_push then
+                    id := to_integer(unsigned(aw_fifo(aw_head).id));
+                    w_route(w_route_tail) <= (aw_fifo(aw_head).allowed, aw_fifo(aw_head).id);
+                    w_route_tail <= (w_route_tail + 1) mod C_FIFO_DEPTH;
+                    if aw_fifo(aw_head).allowed = '1' then
+                        outstanding(id) := outstanding(id) + 1;
+                    else
+                        denied(id) := denied(id) + 1;
+                        denied_total := denied_total + 1;
+                    end if;
+                end if;
+
+                -- end of a data burst
+                route_pop := S_AXI_WVALID = '1' and w_ready = '1' and S_AXI_WLAST = '1';
+                local_push := route_pop and w_drop = '1';
+                if route_pop then
+                    w_route_head <= (w_route_head + 1) mod C_FIFO_DEPTH;
+                end if;
+                if local_push then
+                    b_local(b_local_tail) <= w_route(w_route_head).id;
+                    b_local_tail <= (b_local_tail + 1) mod C_FIFO_DEPTH;
+                end if;
+
+                if route_push and not route_pop then
+                    w_route_count <= w_route_count + 1;
+                elsif not route_push and route_pop then
+                    w_route_count <= w_route_count - 1;
+                end if;
+
+                -- responses
+                local_pop := false;
+                if b_valid = '1' and S_AXI_BREADY = '1' then
+                    b_owner <= NONE;
+                    if b_select = SLAVE then
+                        id := to_integer(unsigned(M_AXI_BID));
+                        outstanding(id) := outstanding(id) - 1;
+                    else
+                        id := to_integer(unsigned(b_local(b_local_head)));
+                        denied(id) := denied(id) - 1;
+                        denied_total := denied_total - 1;
+                        b_local_head <= (b_local_head + 1) mod C_FIFO_DEPTH;
+                        local_pop := true;
+                    end if;
+                elsif b_valid = '1' then
+                    b_owner <= b_select;
+                end if;
+
+                if local_push and not local_pop then
+                    b_local_count <= b_local_count + 1;
+                elsif not local_push and local_pop then
+                    b_local_count <= b_local_count - 1;
+                end if;
+
+                w_outstanding <= outstanding;
+                w_denied <= denied;
+                w_denied_total <= denied_total;
+            end if;
+        end if;
+    end process;
+
+    ------------------------------------------- read address channel -------------------------------------------
+    ar_ready <= '1' when ar_credits < C_FIFO_DEPTH and reset /= '1' else '0';
+    S_AXI_ARREADY <= ar_ready;
+
+    -- an allowed read waits for the local responses of the denied reads of its ID so that the R bursts stay in order
+    ar_forward <= '1' when ar_count > 0 and ar_fifo(ar_head).allowed = '1'
+                           and r_denied(to_integer(unsigned(ar_fifo(ar_head).id))) = 0
+                           and r_outstanding(to_integer(unsigned(ar_fifo(ar_head).id))) < C_MAX_OUTSTANDING else '0';
+    ar_drop <= '1' when ar_count > 0 and ar_fifo(ar_head).allowed = '0' and r_local_count < C_FIFO_DEPTH else '0';
+    ar_pop <= (ar_forward and M_AXI_ARREADY) or ar_drop;
+
+    M_AXI_ARID <= ar_fifo(ar_head).id;
+    M_AXI_ARADDR <= ar_fifo(ar_head).addr;
+    M_AXI_ARLEN <= ar_fifo(ar_head).len;
+    M_AXI_ARSIZE <= ar_fifo(ar_head).size;
+    M_AXI_ARBURST <= ar_fifo(ar_head).burst;
+    M_AXI_ARLOCK <= ar_fifo(ar_head).lock;
+    M_AXI_ARCACHE <= ar_fifo(ar_head).cache;
+    M_AXI_ARPROT <= ar_fifo(ar_head).prot;
+    M_AXI_ARQOS <= ar_fifo(ar_head).qos;
+    M_AXI_ARREGION <= ar_fifo(ar_head).region;
+    M_AXI_ARUSER <= ar_fifo(ar_head).user;
+    M_AXI_ARVALID <= ar_forward;
+
+    process (S_AXI_ACLK)
+        variable entry : ReadAddressType;
+        variable accept : boolean;
+        variable decided : boolean;
+    begin
+        if rising_edge(S_AXI_ACLK) then
+            if reset = '1' then
+                ar_pipe_valid <= (others => '0');
+                ar_head <= 0;
+                ar_tail <= 0;
+                ar_count <= 0;
+                ar_credits <= 0;
+            else
+                accept := S_AXI_ARVALID = '1' and ar_ready = '1';
+                ar_pipe(0) <= (S_AXI_ARID, S_AXI_ARADDR, S_AXI_ARLEN, S_AXI_ARSIZE, S_AXI_ARBURST, S_AXI_ARLOCK,
+                               S_AXI_ARCACHE, S_AXI_ARPROT, S_AXI_ARQOS, S_AXI_ARREGION, S_AXI_ARUSER, '0');
+                if accept then
+                    ar_pipe_valid(0) <= '1';
+                else
+                    ar_pipe_valid(0) <= '0';
+                end if;
+                for i in 1 to C_DECISION_LATENCY-1 loop
+                    ar_pipe(i) <= ar_pipe(i-1);
+                    ar_pipe_valid(i) <= ar_pipe_valid(i-1);
+                end loop;
+
+                decided := ar_pipe_valid(C_DECISION_LATENCY-1) = '1';
+                if decided then
+                    entry := ar_pipe(C_DECISION_LATENCY-1);
+                    entry.allowed := read_decision;
+                    ar_fifo(ar_tail) <= entry;
+                    ar_tail <= (ar_tail + 1) mod C_FIFO_DEPTH;
+                end if;
+                if ar_pop = '1' then
+                    ar_head <= (ar_head + 1) mod C_FIFO_DEPTH;
+                end if;
+
+                if decided and ar_pop /= '1' then
+                    ar_count <= ar_count + 1;
+                elsif not decided and ar_pop = '1' then
+                    ar_count <= ar_count - 1;
+                end if;
+                if accept and ar_pop /= '1' then
+                    ar_credits <= ar_credits + 1;
+                elsif not accept and ar_pop = '1' then
+                    ar_credits <= ar_credits - 1;
+                end if;
+            end if;
+        end if;
+    end process;
+
+    ------------------------------------------- read data channel -------------------------------------------
+    -- a denied read is answered once the reads of its ID forwarded before it have been completed by the slave
+    r_local_valid <= '1' when r_local_count > 0 and r_outstanding(to_integer(unsigned(r_local(r_local_head).id))) = 0 else '0';
+    r_local_last <= '1' when r_beat = unsigned(r_local(r_local_head).len) else '0';
+
+    -- bursts are not interleaved : the selected source is kept until the last beat
+    r_select <= r_owner when r_owner /= NONE else
+                SLAVE when M_AXI_RVALID = '1' else
+                LOCAL when r_local_valid = '1' else
+                NONE;
+    r_valid <= M_AXI_RVALID when r_select = SLAVE else
+               r_local_valid when r_select = LOCAL else
+               '0';
+    r_last <= M_AXI_RLAST when r_select = SLAVE else r_local_last;
+
+    S_AXI_RVALID <= r_valid;
+    S_AXI_RID <= M_AXI_RID when r_select = SLAVE else r_local(r_local_head).id;
+    S_AXI_RDATA <= M_AXI_RDATA when r_select = SLAVE else (others => '0');
+    S_AXI_RRESP <= M_AXI_RRESP when r_select = SLAVE else C_DENY_RESP;
+    S_AXI_RLAST <= r_last;
+    S_AXI_RUSER <= M_AXI_RUSER when r_select = SLAVE else (others => '0');
+    M_AXI_RREADY <= S_AXI_RREADY when r_select = SLAVE else '0';
+
+    process (S_AXI_ACLK)
+        variable outstanding : CounterArrayType;
+        variable denied : CounterArrayType;
+        variable id : natural range 0 to 2**C_S_AXI_ID_WIDTH-1;
+        variable local_push : boolean;
+        variable local_pop : boolean;
+    begin
+        if rising_edge(S_AXI_ACLK) then
+            if reset = '1' then
+                r_local_head <= 0;
+                r_local_tail <= 0;
+                r_local_count <= 0;
+                r_beat <= (others => '0');
+                r_owner <= NONE;
+                r_outstanding <= (others => 0);
+                r_denied <= (others => 0);
+            else
+                outstanding := r_outstanding;
+                denied := r_denied;
+
+                local_push := ar_pop = '1' and ar_fifo(ar_head).allowed = '0';
+                if ar_pop = '1' then
+                    id := to_integer(unsigned(ar_fifo(ar_head).id));
+                    if ar_fifo(ar_head).allowed = '1' then
+                        outstanding(id) := outstanding(id) + 1;
+                    else
+                        denied(id) := denied(id) + 1;
+                        r_local(r_local_tail) <= (ar_fifo(ar_head).id, ar_fifo(ar_head).len);
+                        r_local_tail <= (r_local_tail + 1) mod C_FIFO_DEPTH;
+                    end if;
+                end if;
+
+                local_pop := false;
+                if r_valid = '1' and S_AXI_RREADY = '1' then
+                    if r_last = '1' then
+                        r_owner <= NONE;
+                    else
+                        r_owner <= r_select;
+                    end if;
+                    if r_select = SLAVE then
+                        if M_AXI_RLAST = '1' then
+                            id := to_integer(unsigned(M_AXI_RID));
+                            outstanding(id) := outstanding(id) - 1;
+                        end if;
+                    elsif r_local_last = '1' then
+                        id := to_integer(unsigned(r_local(r_local_head).id));
+                        denied(id) := denied(id) - 1;
+                        r_local_head <= (r_local_head + 1) mod C_FIFO_DEPTH;
+                        r_beat <= (others => '0');
+                        local_pop := true;
+                    else
+                        r_beat <= r_beat + 1;
+                    end if;
+                elsif r_valid = '1' then
+                    r_owner <= r_select;
+                end if;
+
+                if local_push and not local_pop then
+                    r_local_count <= r_local_count + 1;
+                elsif not local_push and local_pop then
+                    r_local_count <= r_local_count - 1;
+                end if;
+
+                r_outstanding <= outstanding;
+                r_denied <= denied;
+            end if;
+        end if;
+    end process;
+
 end architecture;
@@ -1,10 +1,39 @@
 library ieee;
 use ieee.std_logic_1164.all;
+use std.textio.all;
 
 package Memory_type is
     type MemoryArrayType is array (0 to 7) of std_logic_vector(15 DOWNTO 0);
+    -- rules of a rule image file : one line of 16 '0'/'1' per rule in rule_number order, the missing rules are zeros,
+    -- an empty file name gives an empty rules array
+    impure function load_rule_image(file_name : string) return MemoryArrayType;
 end package Memory_type;
 
+package body Memory_type is
+
+    impure function load_rule_image(file_name : string) return MemoryArrayType is
+        file image : text;
+        variable image_line : line;
+        variable word : bit_vector(15 DOWNTO 0);
+        variable rules : MemoryArrayType := (others => (others => '0'));
+        variable i : natural := 0;
+    begin
+        if file_name'length = 0 then
+            return rules;
+        end if;
+        file_open(image, file_name, read_mode);
+        while not endfile(image) and i < 8 loop
+            readline(image, image_line);
+            read(image_line, word);
+            rules(i) := to_stdlogicvector(word);
+            i := i + 1;
+        end loop;
+        file_close(image);
+        return rules;
+    end function;
+
+end package body Memory_type;
+
 ----------------------------------------------------------------------------------------------------
 
 library ieee;
@@ -13,6 +42,10 @@ use ieee.numeric_std.all;
 use work.Memory_type.all;
 
 entity rules_array is
+    generic(
+        -- rule image loaded at elaboration and restored by reset, see load_rule_image
+        INIT_FILE   : string := ""
+    );
     port(
         clk         : in std_logic;
         reset       : in std_logic;
@@ -25,14 +58,15 @@ entity rules_array is
 end rules_array;
 
 architecture rules_array_rtl of rules_array is
-    signal memory_array : MemoryArrayType := (others => (others => '0') );
+    constant INIT_RULES : MemoryArrayType := load_rule_image(INIT_FILE);
+    signal memory_array : MemoryArrayType := INIT_RULES;
 begin
 
     process(CLK)
     begin
         if rising_edge(CLK) then
             if RESET = '1' then
-                memory_array <= (others => (others => '0'));
+                memory_array <= INIT_RULES;
             else
                 if w_enable = '1' then
                     memory_array(to_integer(unsigned(rule_number))) <= data_in;
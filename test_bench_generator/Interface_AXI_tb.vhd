@@ -46,8 +46,15 @@ architecture arch_interface of generated_tb is
 
     signal error_signal           : std_logic := '0';
 
+    -- Clock cycle counter and cycle of the last change of each response
+    signal cycle                  : natural := 0; -- Rising edges of S_AXI_ACLK since the start of the simulation
+    signal write_response_cycle   : integer := -1;
+    signal read_response_cycle    : integer := -1;
+
     -- Declaration of a global log file
     file log_file : text; -- Global log file for recording operations
+    -- Structured results, one CSV record per vector
+    file results_file : text;
 
     -- Declaration of a function for write request verification 
     function check_write_test( wrapper_response : std_logic; test_number : integer) return boolean is
@@ -66,6 +73,34 @@ architecture arch_interface of generated_tb is
         end if;
     end function;
 
+    -- One results record : the request, the expected and actual responses, the cycle the request was driven,
+    -- the cycle the response was checked and the cycle the response last changed (-1 when it did not change since the request)
+    procedure write_result(test_number, lane, mid, x, addr, len, size, burst, expected : integer; request_cycle : natural) is
+        variable result_line : line;
+        variable actual : integer := 0;
+        variable settled_cycle : integer;
+    begin
+        if lane = 1 then
+            if wrapper_read_response = '1' then
+                actual := 1;
+            end if;
+            settled_cycle := read_response_cycle;
+        else
+            if wrapper_write_response = '1' then
+                actual := 1;
+            end if;
+            settled_cycle := write_response_cycle;
+        end if;
+        if settled_cycle < request_cycle then
+            settled_cycle := -1;
+        end if;
+        write(result_line, integer'image(test_number) & "," & integer'image(lane) & "," & integer'image(mid) & "," & integer'image(x) & ","
+                           & integer'image(addr) & "," & integer'image(len) & "," & integer'image(size) & "," & integer'image(burst) & ","
+                           & integer'image(expected) & "," & integer'image(actual) & "," & integer'image(request_cycle) & ","
+                           & integer'image(cycle) & "," & integer'image(settled_cycle));
+        writeline(results_file, result_line);
+    end procedure;
+
     -- Declaration of a function for read request verification
     function check_read_test( wrapper_response : std_logic; test_number : integer) return boolean is
         variable log_line : line;
@@ -239,11 +274,29 @@ begin
         -- S_AXI_ARESETN simulation
         reset_process : process
         begin
-            S_AXI_ARESETN <= '1';
-            wait for 5.0 us;
             S_AXI_ARESETN <= '0';
+            wait for 5.0 us;
+            S_AXI_ARESETN <= '1';
             wait;
         end process;
+
+        -- clock cycle counter for the results records
+        cycle_process : process(S_AXI_ACLK)
+        begin
+            if rising_edge(S_AXI_ACLK) then
+                cycle <= cycle + 1;
+            end if;
+        end process;
+
+        write_response_monitor : process(wrapper_write_response)
+        begin
+            write_response_cycle <= cycle;
+        end process;
+
+        read_response_monitor : process(wrapper_read_response)
+        begin
+            read_response_cycle <= cycle;
+        end process;
     	-- simulation of memory configuration 
         memory_process : process
         begin
@@ -273,15 +326,28 @@ begin
     wrapper_process : process
         variable log_line : line; -- Variable for writing lines to the file
         variable test_resp : boolean;
+        variable request_cycle : natural;
     begin
         file_open(log_file, "test_bench.log", write_mode);
+        file_open(results_file, "test_bench_results.csv", write_mode);
+        write(log_line, string'("test_number,lane,mid,x_enable,addr,len,size,burst,expected,actual,request_cycle,response_cycle,settled_cycle"));
+        writeline(results_file, log_line);
+        -- single beat INCR requests unless the request file gives a burst
+        S_AXI_AWLEN <= (others => '0');
+        S_AXI_AWSIZE <= "000";
+        S_AXI_AWBURST <= "01";
+        S_AXI_ARLEN <= (others => '0');
+        S_AXI_ARSIZE <= "000";
+        S_AXI_ARBURST <= "01";
         wait for 30 us;
 		-----------------------------------TEST 1------------------------------
         MID_W <= "000";
         x_enable <= '1'; 
         S_AXI_AWADDR <= "01100";
+        request_cycle := cycle;
         wait for 10 us;
         test_resp := check_write_test('1', 1);
+        write_result(1, 0, 0, 1, 12, 0, 0, 1, 1, request_cycle);
         if test_resp then
             error_signal <= '0';
         else
@@ -299,8 +365,10 @@ begin
         MID_W <= "101";
         x_enable <= '0'; 
         S_AXI_AWADDR <= "01100";
+        request_cycle := cycle;
         wait for 10 us;
         test_resp := check_write_test('1', 2);
+        write_result(2, 0, 5, 0, 12, 0, 0, 1, 1, request_cycle);
         if test_resp then
             error_signal <= '0';
         else
@@ -318,8 +386,10 @@ begin
         MID_W <= "000";
         x_enable <= '0'; 
         S_AXI_AWADDR <= "01100";
+        request_cycle := cycle;
         wait for 10 us;
         test_resp := check_write_test('1', 3);
+        write_result(3, 0, 0, 0, 12, 0, 0, 1, 1, request_cycle);
         if test_resp then
             error_signal <= '0';
         else
@@ -337,8 +407,10 @@ begin
         MID_W <= "000";
         x_enable <= '0'; 
         S_AXI_AWADDR <= "11111";
+        request_cycle := cycle;
         wait for 10 us;
         test_resp := check_write_test('0', 4);
+        write_result(4, 0, 0, 0, 31, 0, 0, 1, 0, request_cycle);
         if test_resp then
             error_signal <= '0';
         else
@@ -356,8 +428,10 @@ begin
         MID_R <= "100";
         x_enable <= '1'; 
         S_AXI_ARADDR <= "01100";
+        request_cycle := cycle;
         wait for 10 us;
         test_resp := check_read_test('1', 5);
+        write_result(5, 1, 4, 1, 12, 0, 0, 1, 1, request_cycle);
         if test_resp then
             error_signal <= '0';
         else
@@ -375,8 +449,10 @@ begin
         MID_R <= "100";
         x_enable <= '0'; 
         S_AXI_ARADDR <= "01100";
+        request_cycle := cycle;
         wait for 10 us;
         test_resp := check_read_test('1', 6);
+        write_result(6, 1, 4, 0, 12, 0, 0, 1, 1, request_cycle);
         if test_resp then
             error_signal <= '0';
         else
@@ -394,8 +470,10 @@ begin
         MID_R <= "001";
         x_enable <= '1'; 
         S_AXI_ARADDR <= "01100";
+        request_cycle := cycle;
         wait for 10 us;
         test_resp := check_read_test('0', 7);
+        write_result(7, 1, 1, 1, 12, 0, 0, 1, 0, request_cycle);
         if test_resp then
             error_signal <= '0';
         else
@@ -413,8 +491,10 @@ begin
         MID_R <= "001";
         x_enable <= '1'; 
         S_AXI_ARADDR <= "11111";
+        request_cycle := cycle;
         wait for 10 us;
         test_resp := check_read_test('0', 8);
+        write_result(8, 1, 1, 1, 31, 0, 0, 1, 0, request_cycle);
         if test_resp then
             error_signal <= '0';
         else
@@ -430,6 +510,7 @@ begin
         end if;
 		-- close file
         file_close(log_file);
+        file_close(results_file);
         
         MID_W <= (others => '-');
         MID_R <= (others => '-');
@@ -0,0 +1,65 @@
+import os
+import json
+import hashlib
+
+# generation manifest written next to the generated files
+MANIFEST_FILE : str = "generation_manifest.json"
+HASH_BLOCK_SIZE : int = 1 << 20
+
+def file_hash(path : str):
+    # sha256 of a file, None when it does not exist
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def write_if_changed(path : str, content : str):
+    """Write content to path unless the file already holds it, return True when the file was written.
+
+    An unchanged file keeps its modification time, so make and ghdl do not rebuild what depends on it.
+    """
+    data = content.encode()
+    if file_hash(path) == hashlib.sha256(data).hexdigest():
+        return False
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
+def replace_if_changed(temporary_path : str, path : str):
+    # same as write_if_changed() for a file streamed to temporary_path, which is consumed
+    if file_hash(temporary_path) == file_hash(path):
+        os.remove(temporary_path)
+        return False
+    os.replace(temporary_path, path)
+    return True
+
+def load_manifest(manifest_path : str):
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'r') as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            return {}
+
+def up_to_date(manifest_path : str, generator : str, parameters : dict, inputs : list):
+    """True when the last run of generator had the same parameters and input files and its outputs are untouched."""
+    entry = load_manifest(manifest_path).get(generator)
+    if entry is None or entry["parameters"] != parameters:
+        return False
+    if entry["inputs"] != {path: file_hash(path) for path in inputs}:
+        return False
+    return all(file_hash(path) == digest for path, digest in entry["outputs"].items())
+
+def record(manifest_path : str, generator : str, parameters : dict, inputs : list, outputs : list):
+    # parameters, input hashes and output hashes of a run, one entry per generator
+    manifest = load_manifest(manifest_path)
+    manifest[generator] = {
+        "parameters" : parameters,
+        "inputs"     : {path: file_hash(path) for path in inputs},
+        "outputs"    : {path: file_hash(path) for path in outputs},
+    }
+    write_if_changed(manifest_path, json.dumps(manifest, indent=2, sort_keys=True) + "\n")
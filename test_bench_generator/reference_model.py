@@ -0,0 +1,344 @@
+import os
+import math
+import argparse
+from collections import OrderedDict
+
+import numpy as np
+
+MEM_DEPTH : int = 8
+MEM_WIDTH : int = 16
+
+rwx_width : int = 3
+
+# lane selected by the most significant bit of the request rwx field
+WRITE_LANE : int = 0
+READ_LANE  : int = 1
+
+# AXI burst types of the optional len, size and burst request columns, a request without them is a single INCR beat
+BURST_FIXED : int = 0
+BURST_INCR  : int = 1
+BURST_WRAP  : int = 2
+
+# address field of a rule : an [addr_min, addr_max) range, or a naturally aligned power-of-two region (NAPOT)
+# whose field is the base shifted left by one with the log2 of its size in trailing ones, like RISC-V PMP
+ENCODINGS : tuple = ("range", "napot")
+
+def field_widths(MEM_DEPTH : int, MEM_WIDTH : int, encoding : str = "range"):
+    # same derivation as generate_vhdl() and generate_test_bench_file()
+    ID_width : int = math.ceil(math.log2(MEM_DEPTH))
+    if encoding == "napot":
+        # one region field of MEM_WIDTH-ID_width-rwx_width bits, one more bit than the address
+        return ID_width, MEM_WIDTH-ID_width-rwx_width-1
+    adress_width : int = math.ceil((MEM_WIDTH-ID_width-rwx_width)/2)
+    return ID_width, adress_width
+
+def read_fields(path : str):
+    # yields the whitespace separated fields of each line, ignoring comments and empty lines
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.split('#')[0].strip()
+            if not line:
+                continue
+            yield line.split()
+
+def load_rules(path : str, MEM_DEPTH : int, MEM_WIDTH : int):
+    """Return the rule words of a memory configuration file, in rule_number order.
+
+    Packed binary, NumPy and VHDL init rule images are read with rule_image.load_rule_image().
+    """
+    from rule_image import IMAGE_EXTENSIONS, load_rule_image
+    if os.path.splitext(path)[1] in IMAGE_EXTENSIONS:
+        return load_rule_image(path, MEM_DEPTH, MEM_WIDTH)
+    words = [int(fields[0], 16) & ((1 << MEM_WIDTH) - 1) for fields in read_fields(path)]
+    if len(words) > MEM_DEPTH:
+        raise ValueError(f"{path} contains {len(words)} rules but MEM_DEPTH is {MEM_DEPTH}")
+    return np.array(words, dtype=np.uint64)
+
+def napot_range(region, adress_width : int):
+    """Return the [addr_min, addr_max) range of NAPOT region fields.
+
+    The wrapper matches addr when ((addr & '0') xor region) and not mask = 0 with mask = region xor (region+1),
+    so k trailing ones give a region of 2**k addresses (the whole address space for k >= adress_width).
+    """
+    region = np.asarray(region, dtype=np.int64)
+    mask = (region ^ (region + 1)) & ((1 << (adress_width+1)) - 1)
+    addr_min = (region & ~mask) >> 1
+    return addr_min, np.minimum(addr_min + ((mask + 1) >> 1), 2**adress_width)
+
+def napot_region(addr_min, addr_max, adress_width : int):
+    """Return the NAPOT region fields of [addr_min, addr_max) ranges, ValueError when one is not a naturally aligned power of two."""
+    addr_min = np.asarray(addr_min, dtype=np.int64)
+    size = np.asarray(addr_max, dtype=np.int64) - addr_min
+    if np.any(size <= 0) or np.any(size & (size - 1)) or np.any(addr_min & (size - 1)) or np.any(addr_min + size > 2**adress_width):
+        raise ValueError("NAPOT regions are naturally aligned, non empty power-of-two ranges of the address space")
+    return (addr_min << 1) | (size - 1)
+
+def napot_split(addr_min : int, addr_max : int):
+    # fewest naturally aligned power-of-two ranges covering [addr_min, addr_max), lowest first
+    ranges : list = []
+    while addr_min < addr_max:
+        size : int = addr_min & -addr_min if addr_min else 1 << (addr_max.bit_length())
+        while addr_min + size > addr_max:
+            size >>= 1
+        ranges.append((addr_min, addr_min + size))
+        addr_min += size
+    return ranges
+
+def decode_rules(words, MEM_DEPTH : int, MEM_WIDTH : int, encoding : str = "range"):
+    """Slice rule words into the ID / rwx / addr_min / addr_max fields used by the wrapper.
+
+    NAPOT regions are decoded into the range they match, so every model below works with both encodings.
+    """
+    ID_width, adress_width = field_widths(MEM_DEPTH, MEM_WIDTH, encoding)
+    addr_max_width : int = MEM_WIDTH-ID_width-rwx_width-adress_width
+    words = np.asarray(words, dtype=np.uint64)
+    if encoding == "napot":
+        addr_min, addr_max = napot_range((words & np.uint64((1 << (adress_width+1)) - 1)).astype(np.int64), adress_width)
+        return {
+            "id"       : ((words >> np.uint64(MEM_WIDTH-ID_width)) & np.uint64((1 << ID_width) - 1)).astype(np.int64),
+            "rwx"      : ((words >> np.uint64(MEM_WIDTH-ID_width-rwx_width)) & np.uint64((1 << rwx_width) - 1)).astype(np.int64),
+            "addr_min" : addr_min,
+            "addr_max" : addr_max,
+        }
+    return {
+        "id"       : ((words >> np.uint64(MEM_WIDTH-ID_width)) & np.uint64((1 << ID_width) - 1)).astype(np.int64),
+        "rwx"      : ((words >> np.uint64(MEM_WIDTH-ID_width-rwx_width)) & np.uint64((1 << rwx_width) - 1)).astype(np.int64),
+        "addr_min" : ((words >> np.uint64(addr_max_width)) & np.uint64((1 << adress_width) - 1)).astype(np.int64),
+        "addr_max" : (words & np.uint64((1 << addr_max_width) - 1)).astype(np.int64),
+    }
+
+def load_requests(path : str, MEM_DEPTH : int, MEM_WIDTH : int, encoding : str = "range"):
+    """Return the MID, rwx, address, (optional) expected response and burst columns of a request file.
+
+    Fields are truncated to the widths the test bench drives, lines without an expected
+    response get -1 and lines without len, size and burst are single INCR beats.
+    """
+    ID_width, adress_width = field_widths(MEM_DEPTH, MEM_WIDTH, encoding)
+    mid, rwx, addr, expected, length, size, burst = [], [], [], [], [], [], []
+    for fields in read_fields(path):
+        mid.append(int(fields[0], 16))
+        rwx.append(int(fields[1], 16))
+        addr.append(int(fields[2], 16))
+        expected.append(int(fields[3]) if len(fields) > 3 else -1)
+        length.append(int(fields[4], 16) if len(fields) > 4 else 0)
+        size.append(int(fields[5], 16) if len(fields) > 5 else 0)
+        burst.append(int(fields[6], 16) if len(fields) > 6 else BURST_INCR)
+    return {
+        "mid"      : np.array(mid, dtype=np.int64) & ((1 << ID_width) - 1),
+        "rwx"      : np.array(rwx, dtype=np.int64) & ((1 << rwx_width) - 1),
+        "addr"     : np.array(addr, dtype=np.int64) & ((1 << adress_width) - 1),
+        "expected" : np.array(expected, dtype=np.int64),
+        "len"      : np.array(length, dtype=np.int64) & 0xFF,
+        "size"     : np.array(size, dtype=np.int64) & 0x7,
+        "burst"    : np.array(burst, dtype=np.int64) & 0x3,
+    }
+
+def burst_footprint(addr, length, size, burst, adress_width : int):
+    """Return the lowest and highest address touched by each AXI burst, as computed by interface_AXI, and its validity.
+
+    FIXED bursts touch one beat, INCR bursts len+1 beats from the aligned start and WRAP bursts
+    their whole wrap window. A burst that leaves the address space or has the reserved burst type
+    is invalid and denied whatever the rules, its highest address is saturated to all ones.
+    """
+    addr = np.asarray(addr, dtype=np.int64)
+    length = np.asarray(length, dtype=np.int64)
+    size = np.asarray(size, dtype=np.int64)
+    burst = np.asarray(burst, dtype=np.int64)
+    beat = np.left_shift(1, size)
+    total = (length + 1) << size
+    aligned = addr & ~(beat - 1)
+    first = np.where(burst == BURST_WRAP, addr & ~(total - 1), addr)
+    last = np.select([burst == BURST_FIXED, burst == BURST_INCR, burst == BURST_WRAP],
+                     [aligned + beat - 1, aligned + total - 1, first + total - 1], 2**adress_width)
+    return first, np.minimum(last, 2**adress_width - 1), last < 2**adress_width
+
+def request_key(rwx):
+    # rwx value a rule must hold to match the request: "10" & x_enable on the read lane, "01" & x_enable on the write lane
+    rwx = np.asarray(rwx, dtype=np.int64)
+    lane = rwx >> 2
+    return np.where(lane == READ_LANE, 0b100, 0b010) | (rwx & 1)
+
+def evaluate(rules, mid, rwx, addr, addr_last=None):
+    """Return the wrapper response (bool array) for each (MID, rwx, addr) request.
+
+    A request is allowed when at least one rule has its ID, the rwx value of its lane
+    and addr_min <= addr < addr_max, exactly as in the wrapper's myloop. A burst from addr
+    to addr_last is allowed when one rule contains both addresses.
+    """
+    mid = np.asarray(mid, dtype=np.int64)
+    addr = np.asarray(addr, dtype=np.int64)
+    addr_last = addr if addr_last is None else np.asarray(addr_last, dtype=np.int64)
+    key = request_key(rwx)
+    allowed = np.zeros(mid.shape, dtype=bool)
+    # one vectorised pass per rule keeps memory linear in the number of requests
+    for field_id, field_rwx, field_addr_min, field_addr_max in zip(rules["id"], rules["rwx"], rules["addr_min"], rules["addr_max"]):
+        allowed |= (mid == field_id) & (key == field_rwx) & (addr >= field_addr_min) & (addr_last < field_addr_max)
+    return allowed
+
+def build_interval_index(rules):
+    """Sort the [addr_min, addr_max) ranges of the rules of each (ID, rwx) pair by addr_min.
+
+    Returns a dict mapping (ID, rwx) to a (starts, ends) pair of arrays : starts holds the sorted addr_min
+    values and ends the running maximum of addr_max, so ends[i] is the highest addr_max among the rules
+    that start at or before starts[i]. Empty ranges are dropped and ranges are never merged, a burst that
+    spans two abutting rules is refused as in evaluate().
+    """
+    ranges = {}
+    for field_id, field_rwx, field_addr_min, field_addr_max in zip(rules["id"].tolist(), rules["rwx"].tolist(), rules["addr_min"].tolist(), rules["addr_max"].tolist()):
+        if field_addr_min < field_addr_max:
+            ranges.setdefault((field_id, field_rwx), []).append((field_addr_min, field_addr_max))
+    index = {}
+    for key, intervals in ranges.items():
+        intervals.sort()
+        index[key] = (np.array([start for start, _ in intervals], dtype=np.int64),
+                      np.maximum.accumulate(np.array([end for _, end in intervals], dtype=np.int64)))
+    return index
+
+def evaluate_index(index, mid, rwx, addr, addr_last=None):
+    """Same responses as evaluate(), looked up with a binary search in the interval index.
+
+    The search finds the last rule starting at or before addr, the burst is allowed when the
+    running maximum of addr_max at that position is above addr_last.
+    """
+    mid = np.asarray(mid, dtype=np.int64)
+    addr = np.asarray(addr, dtype=np.int64)
+    addr_last = addr if addr_last is None else np.asarray(addr_last, dtype=np.int64)
+    key = request_key(rwx)
+    allowed = np.zeros(mid.shape, dtype=bool)
+    for (field_id, field_rwx), (starts, ends) in index.items():
+        selected = np.flatnonzero((mid == field_id) & (key == field_rwx))
+        position = np.searchsorted(starts, addr[selected], side='right') - 1
+        inside = position >= 0
+        allowed[selected[inside]] = addr_last[selected[inside]] < ends[position[inside]]
+    return allowed
+
+def bitmap_address(mid, rwx, addr, adress_width : int):
+    # word of the permission bitmap : MID & lane & x_enable & addr
+    mid = np.asarray(mid, dtype=np.int64)
+    rwx = np.asarray(rwx, dtype=np.int64)
+    addr = np.asarray(addr, dtype=np.int64)
+    return (((mid << 1 | rwx >> 2) << 1 | (rwx & 1)) << adress_width) | addr
+
+def build_permission_bitmap(rules, MEM_DEPTH : int, MEM_WIDTH : int):
+    """Expand the rules into the bitmap of the bitmap wrapper architecture.
+
+    Returns a bool array with one row per (MID, lane, x_enable, address) word and one column
+    (bit plane) per rule.
+    """
+    ID_width, adress_width = field_widths(MEM_DEPTH, MEM_WIDTH)
+    bitmap = np.zeros((2**(ID_width+2+adress_width), len(rules["id"])), dtype=bool)
+    for plane, (field_id, field_rwx, field_addr_min, field_addr_max) in enumerate(zip(rules["id"].tolist(), rules["rwx"].tolist(), rules["addr_min"].tolist(), rules["addr_max"].tolist())):
+        if field_rwx >> 1 in (0b01, 0b10) and field_addr_min < field_addr_max:
+            start = int(bitmap_address(field_id, field_rwx, field_addr_min, adress_width))
+            bitmap[start:start + field_addr_max - field_addr_min, plane] = True
+    return bitmap
+
+def evaluate_bitmap(bitmap, mid, rwx, addr, MEM_DEPTH : int, MEM_WIDTH : int, addr_last=None):
+    """Same responses as evaluate(), read from the permission bitmap.
+
+    A burst reads the words of both ends of its footprint, a rule contains it when its bit is set in both.
+    """
+    _, adress_width = field_widths(MEM_DEPTH, MEM_WIDTH)
+    words = bitmap[bitmap_address(mid, rwx, addr, adress_width)]
+    if addr_last is not None:
+        words &= bitmap[bitmap_address(mid, rwx, addr_last, adress_width)]
+    return words.any(axis=1)
+
+def simulate_decision_cache(mid, rwx, addr, cache_entries : int, cache_policy : str = "fifo", cache_region_bits : int = 0, addr_last=None):
+    """Replay a request stream through the decision cache of the wrapper and return (hits, misses).
+
+    Each lane has its own cache of cache_entries (MID, x_enable, address region) tags, replaced in
+    insertion order ("fifo") or least recently used order ("lru"). Used to size the cache on a trace.
+    Bursts spanning several regions bypass the cache and count as misses. The cache_hits and cache_misses
+    counters of the wrapper count a request held on a lane once, give them a trace without repeats to compare.
+    """
+    caches = (OrderedDict(), OrderedDict())
+    hits : int = 0
+    misses : int = 0
+    addr_last = addr if addr_last is None else addr_last
+    for request_mid, request_rwx, request_addr, request_last in zip(np.asarray(mid).tolist(), np.asarray(rwx).tolist(), np.asarray(addr).tolist(), np.asarray(addr_last).tolist()):
+        cache = caches[request_rwx >> 2]
+        tag = (request_mid, request_rwx & 1, request_addr >> cache_region_bits)
+        if request_last >> cache_region_bits != request_addr >> cache_region_bits:
+            misses += 1
+        elif tag in cache:
+            hits += 1
+            if cache_policy == "lru":
+                cache.move_to_end(tag)
+        else:
+            misses += 1
+            if len(cache) == cache_entries:
+                cache.popitem(last=False)
+            cache[tag] = True
+    return hits, misses
+
+HEX_DIGITS = np.frombuffer(b"0123456789ABCDEF", dtype=np.uint8)
+
+def hex_columns(values, digits : int):
+    # (n, digits) array of the ASCII upper case hexadecimal digits of values
+    shifts = np.arange(digits - 1, -1, -1, dtype=np.int64) * 4
+    return HEX_DIGITS[(np.asarray(values, dtype=np.int64)[:, None] >> shifts) & 0xF]
+
+def write_requests(path : str, requests, responses, MEM_DEPTH : int = MEM_DEPTH, MEM_WIDTH : int = MEM_WIDTH, encoding : str = "range"):
+    """Write requests and their expected responses as a request file.
+
+    The lines have a fixed width and are built as one byte array, which keeps millions of
+    requests to a fraction of a second. The len, size and burst columns are only written
+    when the requests hold bursts.
+    """
+    ID_width, adress_width = field_widths(MEM_DEPTH, MEM_WIDTH, encoding)
+    count : int = len(responses)
+    space = np.full((count, 1), ord(' '), dtype=np.uint8)
+    columns = [
+        hex_columns(requests["mid"], max(1, math.ceil(ID_width/4))), space,
+        hex_columns(requests["rwx"], 1), space,
+        hex_columns(requests["addr"], max(2, math.ceil(adress_width/4))), space,
+        hex_columns(np.asarray(responses, dtype=np.int64), 1),
+    ]
+    header : bytes = b"# MID RWX addr response_expected"
+    bursts : bool = "len" in requests and (np.any(requests["len"] != 0) or np.any(requests["size"] != 0) or np.any(requests["burst"] != BURST_INCR))
+    if bursts:
+        columns += [space, hex_columns(requests["len"], 2), space, hex_columns(requests["size"], 1), space, hex_columns(requests["burst"], 1)]
+        header += b" len size burst"
+    columns.append(np.full((count, 1), ord('\n'), dtype=np.uint8))
+    lines = np.concatenate(columns, axis=1)
+    with open(path, 'wb') as f:
+        f.write(header + b"\n")
+        f.write(lines.tobytes())
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Evaluate a request file against a memory configuration with the wrapper reference model.')
+    parser.add_argument('--mem_depth','-d', type=int, default= MEM_DEPTH, required=False, help='Memory depth (number of memory cells)')
+    parser.add_argument('--mem_width','-w', type=int, default= MEM_WIDTH, required=False, help='Memory width (width of each memory cell)')
+    parser.add_argument('--encoding','-e', choices=ENCODINGS, default='range', help='Address field of the rules: addr_min/addr_max range or NAPOT region')
+    parser.add_argument('--rules', default="memory_configuration.txt", help='Memory configuration file')
+    parser.add_argument('--requests', default="request.txt", help='Request file')
+    parser.add_argument('--index', action='store_true', help='Look the requests up in the sorted interval index instead of scanning the rules')
+    parser.add_argument('--cache', type=int, metavar='ENTRIES', help='Also report the hit rate of a decision cache of this many entries per lane on the requests')
+    parser.add_argument('--cache_policy', choices=['fifo', 'lru'], default='fifo', help='Replacement policy of the simulated decision cache')
+    parser.add_argument('--annotate', metavar='OUTPUT', help='Write the requests with the expected responses computed by the model')
+
+    args = parser.parse_args()
+
+    rules = decode_rules(load_rules(args.rules, args.mem_depth, args.mem_width), args.mem_depth, args.mem_width, args.encoding)
+    requests = load_requests(args.requests, args.mem_depth, args.mem_width, args.encoding)
+    first, last, valid = burst_footprint(requests["addr"], requests["len"], requests["size"], requests["burst"], field_widths(args.mem_depth, args.mem_width, args.encoding)[1])
+    if args.index:
+        responses = evaluate_index(build_interval_index(rules), requests["mid"], requests["rwx"], first, last) & valid
+    else:
+        responses = evaluate(rules, requests["mid"], requests["rwx"], first, last) & valid
+
+    if args.annotate:
+        write_requests(args.annotate, requests, responses, args.mem_depth, args.mem_width, args.encoding)
+        print(f"{len(responses)} requests written to {args.annotate}")
+    else:
+        checked = requests["expected"] >= 0
+        mismatches = np.flatnonzero(checked & (requests["expected"] != responses))
+        for i in mismatches[:20].tolist():
+            print(f"request {i+1}: MID = {requests['mid'][i]:X} rwx = {requests['rwx'][i]:X} addr = {requests['addr'][i]:02X} expected {requests['expected'][i]} but the model returns {int(responses[i])}")
+        print(f"{int(checked.sum())} requests checked, {len(mismatches)} mismatches")
+
+    if args.cache:
+        hits, misses = simulate_decision_cache(requests["mid"], requests["rwx"], first, args.cache, args.cache_policy, addr_last=last)
+        print(f"decision cache of {args.cache} entries ({args.cache_policy}): {hits} hits, {misses} misses, hit rate {hits / max(hits + misses, 1):.1%}")
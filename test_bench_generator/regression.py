@@ -0,0 +1,160 @@
+import os
+import re
+import csv
+import time
+import argparse
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+from test_bench_generator import MEM_DEPTH, MEM_WIDTH, RESULTS_FILE, period, unite, generate_test_bench_file
+from results import summarize, write_summary
+from rule_image import load_rule_image
+from reference_model import ENCODINGS
+
+GHDL : str = "ghdl"
+TEST_BENCH_ENTITY_NAME : str = "generated_tb"
+
+# design sources, analysed in this order
+SOURCES : list = ["rules_array.vhd", "wrapper.vhd", "interface_AXI.vhd"]
+
+# the test bench never stops its clock, ghdl -r ends on --stop-time and reports it with this message
+STOP_TIME_MESSAGE : str = "simulation stopped by --stop-time"
+
+def split_requests(request_file : str, shards : int, work_dir : str):
+    """Split the request file into contiguous shards, return (shard directory, first test number, number of tests) per shard."""
+    with open(request_file, 'r') as f:
+        total : int = sum(1 for line in f if line.split('#')[0].strip())
+    shards = max(1, min(shards, total))
+    size : int = -(-total // shards)
+
+    plan : list = []
+    with open(request_file, 'r') as f:
+        requests = (line for line in f if line.split('#')[0].strip())
+        for k in range(shards):
+            shard_dir = os.path.join(work_dir, f"shard_{k}")
+            os.makedirs(shard_dir, exist_ok=True)
+            count : int = 0
+            with open(os.path.join(shard_dir, "request.txt"), 'w') as shard:
+                for line in requests:
+                    shard.write(line if line.endswith('\n') else line + '\n')
+                    count += 1
+                    if count == size:
+                        break
+            if count:
+                plan.append((shard_dir, k*size + 1, count))
+    return plan
+
+def run_shard(shard_dir : str, first_test : int, count : int, MEM_DEPTH : int, MEM_WIDTH : int, memory_file : str,
+              src_dir : str, latency : int, settle_cycles : int, vector_file : bool, shadow_bank : bool = False, preload : bool = False,
+              slots_per_mid : int = 0, encoding : str = "range", stream : bool = False):
+    """Generate, analyse, elaborate and run the test bench of one shard in its own work directory, see shard_results()."""
+    generate_test_bench_file(MEM_DEPTH, MEM_WIDTH, os.path.join(shard_dir, "vectors.txt") if vector_file else None, latency, settle_cycles,
+                             memory_file=memory_file, request_file=os.path.join(shard_dir, "request.txt"),
+                             output_file=os.path.join(shard_dir, "Interface_AXI_tb.vhd"), first_test=first_test, shadow_bank=shadow_bank, preload=preload,
+                             slots_per_mid=slots_per_mid, encoding=encoding, stream=stream)
+
+    # reset, rule programming (none when the rules are preloaded) and every request with some margin,
+    # streamed requests take at most one cycle each plus the latency of the last one
+    rules : int = 0 if preload else len(load_rule_image(memory_file, MEM_DEPTH, MEM_WIDTH))
+    request_cycles : int = count + latency if stream else count*latency
+    stop_time : int = 30 + period*(rules + settle_cycles + request_cycles + 10)
+
+    sources = [os.path.abspath(os.path.join(src_dir, source)) for source in SOURCES]
+    commands = [
+        [GHDL, "-a"] + sources + ["Interface_AXI_tb.vhd"],
+        [GHDL, "-e", TEST_BENCH_ENTITY_NAME],
+        [GHDL, "-r", TEST_BENCH_ENTITY_NAME, f"--stop-time={stop_time}{unite}"],
+    ]
+    start = time.perf_counter()
+    for command in commands:
+        try:
+            result = subprocess.run(command, cwd=shard_dir, capture_output=True, text=True)
+        except FileNotFoundError:
+            return {"shard": shard_dir, "tests": count, "failed": [], "error": f"{GHDL} not found"}
+        stopped : bool = command[1] == "-r" and STOP_TIME_MESSAGE in result.stdout + result.stderr
+        if result.returncode != 0 and not stopped:
+            return {"shard": shard_dir, "tests": count, "failed": [], "error": result.stderr.strip() or f"{' '.join(command[:2])} exited with status {result.returncode}"}
+
+    return dict(shard_results(shard_dir, first_test, count), seconds=time.perf_counter() - start)
+
+def shard_results(shard_dir : str, first_test : int, count : int):
+    """Read the log and the results records of a simulated shard.
+
+    The shard is in error when a test from first_test to first_test+count-1 has no results record, e.g. a simulation
+    that stopped before its last vector, otherwise its failed tests are those reported in the log.
+    """
+    failed : list = []
+    log_file = os.path.join(shard_dir, "test_bench.log")
+    results_file = os.path.join(shard_dir, RESULTS_FILE)
+    for path in (log_file, results_file):
+        if not os.path.exists(path):
+            return {"shard": shard_dir, "tests": count, "failed": [], "error": f"no {os.path.basename(path)} written"}
+    with open(results_file, 'r', newline='') as f:
+        recorded : set = {int(record["test_number"]) for record in csv.DictReader(f)}
+    missing : list = sorted(set(range(first_test, first_test + count)) - recorded)
+    if missing:
+        return {"shard": shard_dir, "tests": count, "failed": [],
+                "error": f"{len(missing)} of {count} tests have no result, from test number {missing[0]}"}
+    with open(log_file, 'r') as f:
+        for line in f:
+            match = re.match(r"ERROR : test number (\d+) FAILED", line)
+            if match:
+                failed.append(int(match.group(1)))
+    return {"shard": shard_dir, "tests": count, "failed": failed, "error": None}
+
+def write_report(report_file : str, results : list):
+    tests : int = sum(result["tests"] for result in results)
+    failed : list = sorted(test for result in results for test in result["failed"])
+    errors : list = [result for result in results if result["error"]]
+    with open(report_file, 'w') as f:
+        for result in results:
+            status = "ERROR" if result["error"] else ("FAILED" if result["failed"] else "PASSED")
+            f.write(f"{result['shard']} : {status} {result['tests']} tests, {len(result['failed'])} failed\n")
+            if result["error"]:
+                f.write(f"    {result['error']}\n")
+        for test in failed:
+            f.write(f"ERROR : test number {test} FAILED\n")
+        f.write(f"{'PASSED' if not failed and not errors else 'FAILED'} : {tests} tests, {len(failed)} failed, {len(errors)} shard(s) in error\n")
+        # per-vector records of every shard, as one run
+        results_files = [os.path.join(result["shard"], RESULTS_FILE) for result in results if os.path.exists(os.path.join(result["shard"], RESULTS_FILE))]
+        if results_files:
+            write_summary(f, summarize(results_files))
+    return tests, failed, errors
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Run the test bench of a large request file as parallel GHDL simulations.')
+    parser.add_argument('--mem_depth','-d', type=int, default= MEM_DEPTH, required=False, help='Memory depth (number of memory cells)')
+    parser.add_argument('--mem_width','-w', type=int, default= MEM_WIDTH, required=False, help='Memory width (width of each memory cell)')
+    parser.add_argument('--rules', default="memory_configuration.txt", help='Memory configuration file')
+    parser.add_argument('--requests', default="request.txt", help='Request file')
+    parser.add_argument('--shards','-n', type=int, default= os.cpu_count(), help='Number of shards (one test bench and one simulation each)')
+    parser.add_argument('--jobs','-j', type=int, default= os.cpu_count(), help='Number of simulations running at the same time')
+    parser.add_argument('--work_dir', default="regression", help='Directory holding one work directory per shard')
+    parser.add_argument('--src_dir', default="..", help='Directory of the generated design sources')
+    parser.add_argument('--latency','-l', type=int, default= 1, help='Response latency of the wrapper in clock cycles')
+    parser.add_argument('--settle_cycles','-s', type=int, default= 0, help='Extra clock cycles to wait after the rules are written')
+    parser.add_argument('--vector_file','-v', action='store_true', help='Read the vectors at simulation time instead of unrolling them in each test bench')
+    parser.add_argument('--shadow_bank', action='store_true', help='Design generated with --shadow_bank: swap the rules in before the requests')
+    parser.add_argument('--preload', action='store_true', help='Preload the rules at elaboration instead of programming them in each simulation')
+    parser.add_argument('--slots_per_mid', type=int, default= 0, help='Design generated with --slots_per_mid: program each rule into the bank of its ID')
+    parser.add_argument('--encoding','-e', choices=ENCODINGS, default='range', help='Design generated with --encoding: range or NAPOT address field of the rules')
+    parser.add_argument('--stream', action='store_true', help='Drive the requests back to back, one per cycle and per lane, and check them with a scoreboard')
+    parser.add_argument('--report', default=None, help='Merged report file (default: <work_dir>/regression_report.txt)')
+
+    args = parser.parse_args()
+
+    plan = split_requests(args.requests, args.shards, args.work_dir)
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [pool.submit(run_shard, shard_dir, first_test, count, args.mem_depth, args.mem_width, os.path.abspath(args.rules),
+                               args.src_dir, args.latency, args.settle_cycles, args.vector_file, args.shadow_bank, args.preload, args.slots_per_mid, args.encoding,
+                               args.stream)
+                   for shard_dir, first_test, count in plan]
+        results = [future.result() for future in futures]
+
+    report_file = args.report or os.path.join(args.work_dir, "regression_report.txt")
+    tests, failed, errors = write_report(report_file, results)
+    print(f"{tests} tests in {len(results)} shard(s): {len(failed)} failed, {len(errors)} shard(s) in error, report written to {report_file}")
+    if failed or errors:
+        raise SystemExit(1)
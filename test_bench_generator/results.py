@@ -0,0 +1,85 @@
+import csv
+import sys
+import json
+import argparse
+from collections import Counter
+
+from test_bench_generator import RESULTS_FILE
+
+def summarize(paths : list):
+    """Stream the results records of one run (one or several files, e.g. the shards of a regression) into its summary.
+
+    The sampling latency is response_cycle - request_cycle, the cycles the test bench waited before checking the response.
+    The settling latency is settled_cycle - request_cycle, the cycles the wrapper took to change its response, only known
+    for the vectors whose response changed. The throughput is the number of vectors over the cycles between the first
+    request and the last response.
+    """
+    vectors : int = 0
+    passed : int = 0
+    lanes : Counter = Counter()
+    sampling : Counter = Counter()
+    settling : Counter = Counter()
+    failed : list = []
+    first_cycle, last_cycle = None, None
+    for path in paths:
+        with open(path, 'r', newline='') as f:
+            for record in csv.DictReader(f):
+                request_cycle, response_cycle, settled_cycle = int(record["request_cycle"]), int(record["response_cycle"]), int(record["settled_cycle"])
+                vectors += 1
+                lanes["read" if record["lane"] == "1" else "write"] += 1
+                if record["expected"] == record["actual"]:
+                    passed += 1
+                else:
+                    failed.append(int(record["test_number"]))
+                sampling[response_cycle - request_cycle] += 1
+                if settled_cycle >= 0:
+                    settling[settled_cycle - request_cycle] += 1
+                first_cycle = request_cycle if first_cycle is None else min(first_cycle, request_cycle)
+                last_cycle = response_cycle if last_cycle is None else max(last_cycle, response_cycle)
+    cycles : int = 0 if vectors == 0 else last_cycle - first_cycle + 1
+    return {
+        "files"            : paths,
+        "vectors"          : vectors,
+        "passed"           : passed,
+        "pass_rate"        : passed / vectors if vectors else None,
+        "failed"           : sorted(failed),
+        "lanes"            : dict(lanes),
+        "sampling_latency" : dict(sorted(sampling.items())),
+        "settling_latency" : dict(sorted(settling.items())),
+        "cycles"           : cycles,
+        "vectors_per_cycle": vectors / cycles if cycles else None,
+    }
+
+def histogram(counts : dict):
+    return ", ".join(f"{latency}: {count}" for latency, count in counts.items()) or "-"
+
+def write_summary(f, summary : dict):
+    f.write(f"{' '.join(summary['files'])}\n")
+    if not summary["vectors"]:
+        f.write("    no vectors\n")
+        return
+    f.write(f"    {summary['passed']}/{summary['vectors']} vectors passed ({summary['pass_rate']:.1%}), "
+            f"{summary['lanes'].get('write', 0)} writes and {summary['lanes'].get('read', 0)} reads\n")
+    if summary["failed"]:
+        f.write(f"    failed : {' '.join(str(test) for test in summary['failed'][:20])}{' ...' if len(summary['failed']) > 20 else ''}\n")
+    f.write(f"    sampling latency (cycles: vectors) {histogram(summary['sampling_latency'])}\n")
+    f.write(f"    settling latency (cycles: vectors) {histogram(summary['settling_latency'])}\n")
+    f.write(f"    throughput {summary['vectors_per_cycle']:.3f} vectors per cycle over {summary['cycles']} cycles\n")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Aggregate the per-vector results records written by the generated test benches.')
+    parser.add_argument('results', nargs='*', default=[RESULTS_FILE], help=f'Results files, one run each (default: {RESULTS_FILE})')
+    parser.add_argument('--merge', action='store_true', help='Treat all the files as one run, e.g. the shards of a regression')
+    parser.add_argument('--json', action='store_true', help='Print the summaries as JSON')
+
+    args = parser.parse_args()
+
+    runs = [args.results] if args.merge else [[path] for path in args.results]
+    summaries = [summarize(paths) for paths in runs]
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+    else:
+        for summary in summaries:
+            write_summary(sys.stdout, summary)
@@ -0,0 +1,105 @@
+import os
+import math
+import argparse
+
+import numpy as np
+
+from reference_model import MEM_DEPTH, MEM_WIDTH, read_fields
+
+# packed binary image : magic, MEM_WIDTH (uint16), bytes per word (uint16), number of rules (uint32), then the words little-endian
+BINARY_MAGIC : bytes = b"RULEIMG1"
+BINARY_HEADER = np.dtype([("magic", "S8"), ("width", "<u2"), ("word_bytes", "<u2"), ("count", "<u4")])
+
+# extension of each rule image format, anything else is read as a hexadecimal memory configuration
+BINARY_EXTENSION : str = ".bin"
+NUMPY_EXTENSION : str = ".npy"
+INIT_EXTENSION : str = ".init"
+IMAGE_EXTENSIONS : tuple = (BINARY_EXTENSION, NUMPY_EXTENSION, INIT_EXTENSION)
+
+def load_hex(path : str, MEM_WIDTH : int):
+    return np.array([int(fields[0], 16) & ((1 << MEM_WIDTH) - 1) for fields in read_fields(path)], dtype=np.uint64)
+
+def load_binary(path : str, MEM_WIDTH : int):
+    # whole file read at once, the words are assembled from their bytes without a Python loop
+    data = np.fromfile(path, dtype=np.uint8)
+    header = np.frombuffer(data[:BINARY_HEADER.itemsize].tobytes(), dtype=BINARY_HEADER)[0]
+    if header["magic"] != BINARY_MAGIC:
+        raise ValueError(f"{path} is not a packed rule image")
+    if header["width"] != MEM_WIDTH:
+        raise ValueError(f"{path} holds {header['width']} bit rules but MEM_WIDTH is {MEM_WIDTH}")
+    word_bytes, count = int(header["word_bytes"]), int(header["count"])
+    words = data[BINARY_HEADER.itemsize:BINARY_HEADER.itemsize + word_bytes*count].reshape(count, word_bytes).astype(np.uint64)
+    return (words << (np.arange(word_bytes, dtype=np.uint64) * np.uint64(8))).sum(axis=1, dtype=np.uint64)
+
+def load_numpy(path : str, MEM_WIDTH : int):
+    # memory-mapped instead of read and parsed, the mask is one vectorised pass
+    return np.load(path, mmap_mode='r') & np.uint64((1 << MEM_WIDTH) - 1)
+
+def load_init(path : str, MEM_WIDTH : int):
+    with open(path, 'r') as f:
+        return np.array([int(line, 2) & ((1 << MEM_WIDTH) - 1) for line in f if line.strip()], dtype=np.uint64)
+
+def load_rule_image(path : str, MEM_DEPTH : int, MEM_WIDTH : int):
+    """Return the rule words of a rule image, in rule_number order, whatever its format (chosen by the extension)."""
+    loader = {BINARY_EXTENSION: load_binary, NUMPY_EXTENSION: load_numpy, INIT_EXTENSION: load_init}.get(os.path.splitext(path)[1], load_hex)
+    words = loader(path, MEM_WIDTH)
+    if len(words) > MEM_DEPTH:
+        raise ValueError(f"{path} contains {len(words)} rules but MEM_DEPTH is {MEM_DEPTH}")
+    return words
+
+def rule_words(source, MEM_DEPTH : int, MEM_WIDTH : int):
+    # source is the path of a rule image in any format, or the rule words themselves (rules given in memory)
+    if isinstance(source, (str, os.PathLike)):
+        return load_rule_image(source, MEM_DEPTH, MEM_WIDTH)
+    words = np.asarray(source, dtype=np.uint64) & np.uint64((1 << MEM_WIDTH) - 1)
+    if len(words) > MEM_DEPTH:
+        raise ValueError(f"{len(words)} rules given but MEM_DEPTH is {MEM_DEPTH}")
+    return words
+
+def init_image(words, MEM_DEPTH : int, MEM_WIDTH : int):
+    # .init image as bytes : one '0'/'1' byte per bit, built as one array like write_requests() does
+    cells = np.zeros(MEM_DEPTH, dtype=np.uint64)
+    cells[:len(words)] = np.asarray(words, dtype=np.uint64)
+    shifts = np.arange(MEM_WIDTH - 1, -1, -1, dtype=np.uint64)
+    bits = ((cells[:, None] >> shifts) & np.uint64(1)).astype(np.uint8) + ord('0')
+    return np.concatenate([bits, np.full((MEM_DEPTH, 1), ord('\n'), dtype=np.uint8)], axis=1).tobytes()
+
+def write_rule_image(path : str, words, MEM_DEPTH : int, MEM_WIDTH : int, extension : str = None):
+    """Write rule words in the format of extension, by default the extension of path.
+
+    The .init format is the one rules_array reads at elaboration (INIT_FILE generic) : one line of
+    MEM_WIDTH binary digits per memory cell, the cells without a rule are written as zeros.
+    """
+    words = np.asarray(words, dtype=np.uint64)
+    extension = os.path.splitext(path)[1] if extension is None else extension
+    if extension == BINARY_EXTENSION:
+        word_bytes : int = math.ceil(MEM_WIDTH/8)
+        header = np.array([(BINARY_MAGIC, MEM_WIDTH, word_bytes, len(words))], dtype=BINARY_HEADER)
+        data = ((words[:, None] >> (np.arange(word_bytes, dtype=np.uint64) * np.uint64(8))) & np.uint64(0xFF)).astype(np.uint8)
+        with open(path, 'wb') as f:
+            f.write(header.tobytes())
+            f.write(data.tobytes())
+    elif extension == NUMPY_EXTENSION:
+        np.save(path, words)
+    elif extension == INIT_EXTENSION:
+        with open(path, 'wb') as f:
+            f.write(init_image(words, MEM_DEPTH, MEM_WIDTH))
+    else:
+        with open(path, 'w') as f:
+            for word in words.tolist():
+                f.write(f"{word:0{math.ceil(MEM_WIDTH/4)}X}\n")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Convert a rule table between the hexadecimal, packed binary (.bin), NumPy (.npy) and VHDL init (.init) formats.')
+    parser.add_argument('input', help='Rule table read, format chosen by the extension (hexadecimal text otherwise)')
+    parser.add_argument('output', help='Rule table written, format chosen by the extension (hexadecimal text otherwise)')
+    parser.add_argument('--mem_depth','-d', type=int, default= MEM_DEPTH, required=False, help='Memory depth (number of memory cells)')
+    parser.add_argument('--mem_width','-w', type=int, default= MEM_WIDTH, required=False, help='Memory width (width of each memory cell)')
+
+    args = parser.parse_args()
+
+    words = load_rule_image(args.input, args.mem_depth, args.mem_width)
+    write_rule_image(args.output, words, args.mem_depth, args.mem_width)
+    print(f"{len(words)} rules converted from {args.input} to {args.output}")
@@ -0,0 +1,143 @@
+import math
+import argparse
+
+import numpy as np
+
+from reference_model import (MEM_DEPTH, MEM_WIDTH, ENCODINGS, rwx_width, field_widths, load_rules, decode_rules, evaluate,
+                             napot_region, napot_split)
+
+# rwx values a rule can match with : "01"&x on the write lane, "10"&x on the read lane
+MATCHABLE_RWX : tuple = (0b010, 0b011, 0b100, 0b101)
+
+def minimize_rules(rules, keep_bursts : bool = False):
+    """Return the (ID, rwx, addr_min, addr_max) tuples of a minimal rule table accepting the same requests as rules.
+
+    Empty ranges and rules whose rwx can not match a request are dropped. By default the ranges of each
+    (ID, rwx) pair are merged when they overlap or abut, which keeps every single beat response but lets a
+    burst span ranges that were separate rules. With keep_bursts the ranges are not merged, only the rules
+    contained in another rule of the same ID and rwx are dropped, so that bursts get the same responses too.
+    """
+    ranges = {}
+    for field_id, field_rwx, field_addr_min, field_addr_max in zip(rules["id"].tolist(), rules["rwx"].tolist(), rules["addr_min"].tolist(), rules["addr_max"].tolist()):
+        if field_rwx in MATCHABLE_RWX and field_addr_min < field_addr_max:
+            ranges.setdefault((field_id, field_rwx), set()).add((field_addr_min, field_addr_max))
+    minimized = []
+    for (field_id, field_rwx), intervals in sorted(ranges.items()):
+        if not keep_bursts:
+            # a range starting before the reach of the current one overlaps or abuts it and extends it
+            merged = []
+            for start, end in sorted(intervals):
+                if merged and start <= merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1], end)
+                else:
+                    merged.append([start, end])
+            minimized += [(field_id, field_rwx, start, end) for start, end in merged]
+            continue
+        # widest first for each start, a range is kept when it ends after every kept range starting before it
+        reach : int = -1
+        for start, end in sorted(intervals, key=lambda interval: (interval[0], -interval[1])):
+            if end > reach:
+                minimized.append((field_id, field_rwx, start, end))
+                reach = end
+    return minimized
+
+def napot_rules(minimized):
+    # each range split into the fewest NAPOT regions, a burst crossing two regions of a split range is then denied
+    return [(field_id, field_rwx, start, end) for field_id, field_rwx, addr_min, addr_max in minimized for start, end in napot_split(addr_min, addr_max)]
+
+def minimal_depth(minimized, MEM_DEPTH : int):
+    # smallest MEM_DEPTH holding the rules whose ID_width still holds every rule ID, at least 2 for a 1 bit ID
+    id_bits : int = max([field_id.bit_length() for field_id, _, _, _ in minimized], default=1)
+    return min(max(len(minimized), 2**(max(id_bits, 1)-1) + 1, 2), MEM_DEPTH)
+
+def encode_rules(minimized, MEM_DEPTH : int, MEM_WIDTH : int, encoding : str = "range"):
+    # rule words in the layout decode_rules() reads, ValueError when a range does not fit the address field
+    ID_width, adress_width = field_widths(MEM_DEPTH, MEM_WIDTH, encoding)
+    addr_max_width : int = MEM_WIDTH-ID_width-rwx_width-adress_width
+    if encoding == "napot":
+        return np.array([(field_id << rwx_width | field_rwx) << (adress_width+1) | int(napot_region(addr_min, addr_max, adress_width))
+                         for field_id, field_rwx, addr_min, addr_max in minimized], dtype=np.uint64)
+    if any(addr_max >= 2**addr_max_width for _, _, _, addr_max in minimized):
+        raise ValueError(f"addr_max does not fit in the {addr_max_width} bit field of a range rule")
+    return np.array([((field_id << rwx_width | field_rwx) << adress_width | addr_min) << addr_max_width | addr_max
+                     for field_id, field_rwx, addr_min, addr_max in minimized], dtype=np.uint64)
+
+def critical_addresses(tables, adress_width : int):
+    # every response is constant between two consecutive rule boundaries, so these addresses decide all of them
+    addresses = np.concatenate([[0]] + [np.concatenate([table["addr_min"], table["addr_max"], table["addr_max"] - 1]) for table in tables])
+    return np.unique(addresses[(addresses >= 0) & (addresses < 2**adress_width)])
+
+def prove_equivalence(original, minimized, ID_width : int, adress_width : int, bursts : bool = False):
+    """Compare the responses of two decoded rule tables with evaluate(), return the requests where they differ.
+
+    Every MID and rwx value is crossed with every critical address, which covers all single beat requests.
+    With bursts, every (first, last) pair of critical addresses is checked as well.
+    """
+    addresses = critical_addresses([original, minimized], adress_width)
+    if bursts:
+        first, last = np.meshgrid(addresses, addresses, indexing='ij')
+        keep = first <= last
+        first, last = first[keep], last[keep]
+    else:
+        first = last = addresses
+    mid, rwx, position = np.meshgrid(np.arange(2**ID_width), np.arange(2**rwx_width), np.arange(len(first)), indexing='ij')
+    mid, rwx, position = mid.ravel(), rwx.ravel(), position.ravel()
+    expected = evaluate(original, mid, rwx, first[position], last[position])
+    responses = evaluate(minimized, mid, rwx, first[position], last[position])
+    differ = np.flatnonzero(expected != responses)
+    return [(int(mid[i]), int(rwx[i]), int(first[position[i]]), int(last[position[i]]), bool(expected[i])) for i in differ], len(mid)
+
+def write_rules(path : str, words, MEM_WIDTH : int, header : str):
+    with open(path, 'w') as f:
+        f.write(header)
+        for word in words.tolist():
+            f.write(f"{word:0{math.ceil(MEM_WIDTH/4)}X}\n")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Minimise a memory configuration and prove it accepts the same requests with the reference model.')
+    parser.add_argument('--mem_depth','-d', type=int, default= MEM_DEPTH, required=False, help='Memory depth (number of memory cells)')
+    parser.add_argument('--mem_width','-w', type=int, default= MEM_WIDTH, required=False, help='Memory width (width of each memory cell)')
+    parser.add_argument('--encoding','-e', choices=ENCODINGS, default='range', help='Address field of the rules read: addr_min/addr_max range or NAPOT region')
+    parser.add_argument('--output_encoding', choices=ENCODINGS, default=None, help='Address field of the rules written, NAPOT splits each range into aligned power-of-two regions (default: --encoding)')
+    parser.add_argument('--rules', default="memory_configuration.txt", help='Memory configuration file')
+    parser.add_argument('--output','-o', default="memory_configuration_min.txt", help='Minimised memory configuration file written')
+    parser.add_argument('--keep_bursts', action='store_true', help='Do not merge ranges, so that bursts spanning two rules stay denied')
+    parser.add_argument('--shrink', action='store_true', help='Encode the minimised rules for the smallest MEM_DEPTH holding them, with the same address fields')
+
+    args = parser.parse_args()
+
+    output_encoding : str = args.output_encoding or args.encoding
+    ID_width, adress_width = field_widths(args.mem_depth, args.mem_width, args.encoding)
+    original = decode_rules(load_rules(args.rules, args.mem_depth, args.mem_width), args.mem_depth, args.mem_width, args.encoding)
+    minimized = minimize_rules(original, args.keep_bursts)
+    if output_encoding == "napot":
+        minimized = napot_rules(minimized)
+
+    depth, width = args.mem_depth, args.mem_width
+    if args.shrink:
+        depth = minimal_depth(minimized, args.mem_depth)
+        # the ID field shrinks, the rwx and address fields keep their width
+        width = math.ceil(math.log2(depth)) + args.mem_width - ID_width
+    if len(minimized) > depth:
+        raise SystemExit(f"{len(minimized)} rules do not fit in MEM_DEPTH = {depth}, {args.output} not written")
+    try:
+        words = encode_rules(minimized, depth, width, output_encoding)
+    except ValueError as error:
+        raise SystemExit(f"{error}, {args.output} not written")
+    differences, checked = prove_equivalence(original, decode_rules(words, depth, width, output_encoding), ID_width, adress_width, args.keep_bursts)
+
+    for mid, rwx, first, last, expected in differences[:20]:
+        print(f"MID = {mid:X} rwx = {rwx:X} addr = {first:02X}..{last:02X}: the original rules return {int(expected)}, the minimised ones {int(not expected)}")
+    if differences:
+        raise SystemExit(f"{len(differences)} of {checked} requests differ, {args.output} not written")
+
+    write_rules(args.output, words, width,
+                f"# {args.rules} minimised by rule_optimizer.py for MEM_DEPTH = {depth} and MEM_WIDTH = {width}"
+                f"{' (NAPOT encoding)' if output_encoding == 'napot' else ''}\n"
+                f"# {len(original['id'])} rules before, {len(minimized)} after, same responses on {checked} requests"
+                f"{' (bursts included)' if args.keep_bursts else ' (single beats)'}\n")
+    print(f"{len(original['id'])} rules minimised to {len(minimized)}, equivalence checked on {checked} requests, written to {args.output}")
+    if args.shrink or output_encoding != args.encoding:
+        print(f"generate the design with -d {depth} -w {width}{' -e napot' if output_encoding == 'napot' else ''}")
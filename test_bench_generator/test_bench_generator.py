@@ -1,5 +1,17 @@
+import io
+import os
+import sys
 import math
+import time
 import argparse
+import contextlib
+
+from manifest import MANIFEST_FILE, up_to_date, replace_if_changed, record, load_manifest
+from rule_image import rule_words, init_image
+from reference_model import ENCODINGS, field_widths
+
+# python sources the test bench depends on, keyed in the manifest by absolute path so that the working directory does not matter
+GENERATOR_SOURCES : list = [os.path.join(os.path.dirname(os.path.abspath(__file__)), name) for name in ("test_bench_generator.py", "rule_image.py", "reference_model.py")]
 
 MEM_DEPTH : int = 8
 MEM_WIDTH : int = 16
@@ -7,6 +19,18 @@ MEM_WIDTH : int = 16
 period : int = 10
 unite  : str = "us"
 
+# number of requests between two progress reports
+PROGRESS_STEP : int = 100000
+# size of the write buffer of the generated files
+WRITE_BUFFER_SIZE : int = 1 << 20
+# test bench written by default
+TEST_BENCH_FILE : str = "Interface_AXI_tb.vhd"
+# rule image preloaded into the rules array, written next to the test bench
+PRELOAD_FILE : str = "rules.init"
+# one CSV record per vector written by the test bench, read by results.py
+RESULTS_FILE : str = "test_bench_results.csv"
+RESULTS_HEADER : str = "test_number,lane,mid,x_enable,addr,len,size,burst,expected,actual,request_cycle,response_cycle,settled_cycle"
+
 def decimal_to_binary(decimal, number_of_bits):
     binary = bin(decimal)[2:]
     size = len(binary)
@@ -21,11 +45,849 @@ def hexa_to_binary(hexa, number_of_bits):
     decimal = int(hexa, 16)
     return decimal_to_binary(decimal, number_of_bits)
 
-def generate_test_bench_file(MEM_DEPTH : int, MEM_WIDTH : int):
+def report_progress(requests : int, start : float):
+    # start is the perf_counter() of the generation, kept by the caller so that concurrent generations do not share it
+    if requests % PROGRESS_STEP == 0:
+        seconds = time.perf_counter() - start
+        print(f"{requests} requests written ({requests / seconds:.0f} requests/s)", file=sys.stderr)
 
+def burst_fields(tab):
+    # optional len, size and burst columns of a request line, a single INCR beat without them
+    return (int(tab[4], 16) & 0xFF if len(tab) > 4 else 0,
+            int(tab[5], 16) & 0x7 if len(tab) > 5 else 0,
+            int(tab[6], 16) & 0x3 if len(tab) > 6 else 1)
+
+def rule_slots(words, MEM_DEPTH : int, MEM_WIDTH : int, slots_per_mid : int = 0):
+    """Return the (rule_number, word) pairs programming the rules and the number of rules_array cells.
+
+    Without partitioning rule i goes to cell i. With slots_per_mid the rules go to the bank of their ID field,
+    rule_number being that ID times slots_per_mid plus the next free slot of the bank.
+    """
+    if slots_per_mid == 0:
+        return list(enumerate(words)), MEM_DEPTH
     ID_width : int = math.ceil(math.log2(MEM_DEPTH))
+    used : dict = {}
+    slots : list = []
+    for word in words:
+        field_id : int = word >> (MEM_WIDTH-ID_width)
+        if used.get(field_id, 0) == slots_per_mid:
+            raise ValueError(f"more than {slots_per_mid} rules have the ID {field_id:X}, increase the number of slots per MID")
+        slots.append((field_id*slots_per_mid + used.get(field_id, 0), word))
+        used[field_id] = used.get(field_id, 0) + 1
+    return slots, 2**ID_width*slots_per_mid
+
+def request_lines(requests):
+    # requests is the path of a request file, read lazily, or its lines given in memory
+    if isinstance(requests, (str, os.PathLike)):
+        return open(requests, 'r')
+    return contextlib.nullcontext(requests)
+
+def unrolled_requests(requests, ID_width : int, adress_width : int, latency : int = 1, first_test : int = 1, progress : bool = False,
+                      period : int = period, unite : str = unite):
+    # yields one TEST block of VHDL per request, the request file is read lazily
+    rwx_width : int = 3
+    # burst currently driven on each address channel, only changes are written
+    bursts : dict = {"AW": (0, 0, 1), "AR": (0, 0, 1)}
+    start : float = time.perf_counter()
+    with request_lines(requests) as f:
+        i : int = first_test
+        for line in f:
+            # ignore comment lines and empty lines
+            line = line.split('#')[0].strip()
+            if not line:
+                continue
+            MID : str = None
+            ADD : str = None
+            channel : str = None
+            check_function : str = None
+            tab = line.split() # put the line in a table, each field in a column
+            # find in witch mode we are (read or write)
+            rwx = hexa_to_binary(tab[1], rwx_width)
+            if rwx[0] == '1':
+                MID = "MID_R"
+                ADD = "S_AXI_ARADDR"
+                channel = "AR"
+                check_function = "check_read_test"
+            else:
+                MID = "MID_W"
+                ADD = "S_AXI_AWADDR"
+                channel = "AW"
+                check_function = "check_write_test"
+            burst : str = ""
+            if burst_fields(tab) != bursts[channel]:
+                bursts[channel] = burst_fields(tab)
+                burst = f"""        S_AXI_{channel}LEN <= "{decimal_to_binary(bursts[channel][0], 8)}";
+        S_AXI_{channel}SIZE <= "{decimal_to_binary(bursts[channel][1], 3)}";
+        S_AXI_{channel}BURST <= "{decimal_to_binary(bursts[channel][2], 2)}";
+"""
+            yield f"""\t\t-----------------------------------TEST {i}------------------------------
+        {MID} <= "{hexa_to_binary(tab[0], ID_width)}";
+        x_enable <= '{rwx[2]}'; 
+        {ADD} <= "{hexa_to_binary(tab[2], adress_width)}";
+{burst}        request_cycle := cycle;
+        wait for {period*latency} {unite};
+        test_resp := {check_function}('{tab[3]}', {i});
+        write_result({i}, {rwx[0]}, {int(hexa_to_binary(tab[0], ID_width), 2)}, {rwx[2]}, {int(hexa_to_binary(tab[2], adress_width), 2)}, {bursts[channel][0]}, {bursts[channel][1]}, {bursts[channel][2]}, {tab[3]}, request_cycle);
+        if test_resp then
+            error_signal <= '0';
+        else
+            error_signal <= '1';
+            write(log_line, string'("{MID} = {tab[0]}"));
+            writeline(log_file, log_line);
+            write(log_line, string'("rwx = {tab[1]}"));
+            writeline(log_file, log_line);
+            write(log_line, string'("{ADD} = {tab[2]}"));
+            writeline(log_file, log_line);
+            write(log_line, string'("Expected {tab[3]} but the test return { 1 - int(tab[3])}"));
+            writeline(log_file, log_line);
+        end if;
+"""
+            if progress:
+                report_progress(i - first_test + 1, start)
+            i += 1
+
+def streamed_requests(requests, ID_width : int, adress_width : int, first_test : int = 1, progress : bool = False,
+                      period : int = period, unite : str = unite):
+    # yields one block of VHDL per clock cycle, each one driving up to one request per lane : the requests are issued in order,
+    # the next one waits for the next cycle when its lane is already driven or when it needs the other x_enable
     rwx_width : int = 3
-    adress_width : int = math.ceil((MEM_WIDTH-ID_width-rwx_width)/2)
+    bursts : dict = {"AW": (0, 0, 1), "AR": (0, 0, 1)}
+    start : float = time.perf_counter()
+    block : str = ""
+    lanes : list = []
+    x_enable : str = None
+    with request_lines(requests) as f:
+        i : int = first_test
+        for line in f:
+            # ignore comment lines and empty lines
+            line = line.split('#')[0].strip()
+            if not line:
+                continue
+            tab = line.split()
+            rwx = hexa_to_binary(tab[1], rwx_width)
+            lane : int = int(rwx[0])
+            if lane in lanes or (lanes and rwx[2] != x_enable):
+                yield block + f"""        next_cycle;
+"""
+                block, lanes = "", []
+            if not lanes:
+                block = f"""\t\t-----------------------------------CYCLE OF TEST {i}------------------------------
+        x_enable <= '{rwx[2]}';
+"""
+            lanes.append(lane)
+            x_enable = rwx[2]
+            MID, ADD, channel = ("MID_R", "S_AXI_ARADDR", "AR") if lane else ("MID_W", "S_AXI_AWADDR", "AW")
+            block += f"""        {MID} <= "{hexa_to_binary(tab[0], ID_width)}";
+        {ADD} <= "{hexa_to_binary(tab[2], adress_width)}";
+"""
+            if burst_fields(tab) != bursts[channel]:
+                bursts[channel] = burst_fields(tab)
+                block += f"""        S_AXI_{channel}LEN <= "{decimal_to_binary(bursts[channel][0], 8)}";
+        S_AXI_{channel}SIZE <= "{decimal_to_binary(bursts[channel][1], 3)}";
+        S_AXI_{channel}BURST <= "{decimal_to_binary(bursts[channel][2], 2)}";
+"""
+            block += f"""        expect({i}, {lane}, {int(hexa_to_binary(tab[0], ID_width), 2)}, {rwx[2]}, {int(hexa_to_binary(tab[2], adress_width), 2)}, {bursts[channel][0]}, {bursts[channel][1]}, {bursts[channel][2]}, {tab[3]});
+"""
+            if progress:
+                report_progress(i - first_test + 1, start)
+            i += 1
+    if lanes:
+        yield block + f"""        next_cycle;
+"""
+
+def write_vector_file(requests, vectors, ID_width : int, adress_width : int, first_test : int = 1, progress : bool = False):
+    # compact vector file read by file_driven_requests(), one "test_number lane MID x_enable addr expected len size burst" line per request,
+    # written to the text stream vectors
+    rwx_width : int = 3
+    start : float = time.perf_counter()
+    with request_lines(requests) as lines:
+        i : int = first_test
+        for line in lines:
+            # ignore comment lines and empty lines
+            line = line.split('#')[0].strip()
+            if not line:
+                continue
+            tab = line.split()
+            rwx = hexa_to_binary(tab[1], rwx_width)
+            MID = int(hexa_to_binary(tab[0], ID_width), 2)
+            ADD = int(hexa_to_binary(tab[2], adress_width), 2)
+            length, size, burst = burst_fields(tab)
+            vectors.write(f"{i} {rwx[0]} {MID} {rwx[2]} {ADD} {tab[3]} {length} {size} {burst}\n")
+            if progress:
+                report_progress(i - first_test + 1, start)
+            i += 1
+
+def file_driven_requests(vector_file : str, latency : int = 1, period : int = period, unite : str = unite):
+    # fixed size loop over the vector file, the test bench source no longer grows with the number of requests
+    # vector_file is the path the simulator opens, relative to the directory where the simulation runs
+    return f"""\t\tfile_open(vector_file, "{vector_file}", read_mode);
+        while not endfile(vector_file) loop
+            readline(vector_file, vector_line);
+            read(vector_line, test_number);
+            read(vector_line, lane);
+            read(vector_line, mid);
+            read(vector_line, x);
+            read(vector_line, addr);
+            read(vector_line, expected);
+            read(vector_line, len);
+            read(vector_line, size);
+            read(vector_line, burst);
+            if x = 1 then
+                x_enable <= '1';
+            else
+                x_enable <= '0';
+            end if;
+            if expected = 1 then
+                expected_response := '1';
+            else
+                expected_response := '0';
+            end if;
+            if lane = 1 then
+                MID_R <= std_logic_vector(to_unsigned(mid, MID_R'length));
+                S_AXI_ARADDR <= std_logic_vector(to_unsigned(addr, S_AXI_ARADDR'length));
+                S_AXI_ARLEN <= std_logic_vector(to_unsigned(len, 8));
+                S_AXI_ARSIZE <= std_logic_vector(to_unsigned(size, 3));
+                S_AXI_ARBURST <= std_logic_vector(to_unsigned(burst, 2));
+                request_cycle := cycle;
+                wait for {period*latency} {unite};
+                test_resp := check_read_test(expected_response, test_number);
+            else
+                MID_W <= std_logic_vector(to_unsigned(mid, MID_W'length));
+                S_AXI_AWADDR <= std_logic_vector(to_unsigned(addr, S_AXI_AWADDR'length));
+                S_AXI_AWLEN <= std_logic_vector(to_unsigned(len, 8));
+                S_AXI_AWSIZE <= std_logic_vector(to_unsigned(size, 3));
+                S_AXI_AWBURST <= std_logic_vector(to_unsigned(burst, 2));
+                request_cycle := cycle;
+                wait for {period*latency} {unite};
+                test_resp := check_write_test(expected_response, test_number);
+            end if;
+            write_result(test_number, lane, mid, x, addr, len, size, burst, expected, request_cycle);
+            if test_resp then
+                error_signal <= '0';
+            else
+                error_signal <= '1';
+                write(log_line, string'("lane = "));
+                write(log_line, lane);
+                write(log_line, string'(" MID = "));
+                write(log_line, mid);
+                write(log_line, string'(" x_enable = "));
+                write(log_line, x);
+                write(log_line, string'(" addr = "));
+                write(log_line, addr);
+                writeline(log_file, log_line);
+                write(log_line, string'("Expected "));
+                write(log_line, expected);
+                write(log_line, string'(" but the test return "));
+                write(log_line, 1 - expected);
+                writeline(log_file, log_line);
+            end if;
+        end loop;
+        file_close(vector_file);
+"""
+
+def file_streamed_requests(vector_file : str):
+    # same issue order as streamed_requests(), the vector read that cannot be driven in this cycle is kept for the next one
+    return f"""\t\tfile_open(vector_file, "{vector_file}", read_mode);
+        pending := false;
+        while pending or not endfile(vector_file) loop
+            used_w := false;
+            used_r := false;
+            loop
+                if not pending then
+                    exit when endfile(vector_file);
+                    readline(vector_file, vector_line);
+                    read(vector_line, test_number);
+                    read(vector_line, lane);
+                    read(vector_line, mid);
+                    read(vector_line, x);
+                    read(vector_line, addr);
+                    read(vector_line, expected);
+                    read(vector_line, len);
+                    read(vector_line, size);
+                    read(vector_line, burst);
+                    pending := true;
+                end if;
+                exit when (lane = 1 and used_r) or (lane = 0 and used_w) or ((used_w or used_r) and x /= cycle_x);
+                if x = 1 then
+                    x_enable <= '1';
+                else
+                    x_enable <= '0';
+                end if;
+                cycle_x := x;
+                if lane = 1 then
+                    MID_R <= std_logic_vector(to_unsigned(mid, MID_R'length));
+                    S_AXI_ARADDR <= std_logic_vector(to_unsigned(addr, S_AXI_ARADDR'length));
+                    S_AXI_ARLEN <= std_logic_vector(to_unsigned(len, 8));
+                    S_AXI_ARSIZE <= std_logic_vector(to_unsigned(size, 3));
+                    S_AXI_ARBURST <= std_logic_vector(to_unsigned(burst, 2));
+                    used_r := true;
+                else
+                    MID_W <= std_logic_vector(to_unsigned(mid, MID_W'length));
+                    S_AXI_AWADDR <= std_logic_vector(to_unsigned(addr, S_AXI_AWADDR'length));
+                    S_AXI_AWLEN <= std_logic_vector(to_unsigned(len, 8));
+                    S_AXI_AWSIZE <= std_logic_vector(to_unsigned(size, 3));
+                    S_AXI_AWBURST <= std_logic_vector(to_unsigned(burst, 2));
+                    used_w := true;
+                end if;
+                expect(test_number, lane, mid, x, addr, len, size, burst, expected);
+                pending := false;
+            end loop;
+            next_cycle;
+        end loop;
+        file_close(vector_file);
+"""
+
+def scoreboard_declarations(latency : int, period : int = period, unite : str = unite):
+    # FIFO of the expected responses of the streamed requests, checked latency clock cycles after the request is driven
+    depth : int = 2*(latency + 1)
+    return f"""        -- scoreboard : requests driven and not checked yet, oldest first
+        type ExpectedType is record
+            test_number, lane, mid, x, addr, len, size, burst, expected : integer;
+            request_cycle : natural;
+        end record;
+        type ScoreboardType is array (0 to {depth-1}) of ExpectedType;
+        variable scoreboard : ScoreboardType;
+        variable scoreboard_head : natural range 0 to {depth-1} := 0;
+        variable scoreboard_count : natural range 0 to {depth} := 0;
+
+        procedure expect(test_number, lane, mid, x, addr, len, size, burst, expected : integer) is
+        begin
+            scoreboard((scoreboard_head + scoreboard_count) mod {depth}) := (test_number, lane, mid, x, addr, len, size, burst, expected, cycle);
+            scoreboard_count := scoreboard_count + 1;
+        end procedure;
+
+        -- one clock cycle, then the check of the requests whose response is due
+        procedure next_cycle is
+            variable entry : ExpectedType;
+            variable expected_response : std_logic;
+        begin
+            wait for {period} {unite};
+            while scoreboard_count > 0 and cycle - scoreboard(scoreboard_head).request_cycle >= {latency} loop
+                entry := scoreboard(scoreboard_head);
+                scoreboard_head := (scoreboard_head + 1) mod {depth};
+                scoreboard_count := scoreboard_count - 1;
+                if entry.expected = 1 then
+                    expected_response := '1';
+                else
+                    expected_response := '0';
+                end if;
+                if entry.lane = 1 then
+                    test_resp := check_read_test(expected_response, entry.test_number);
+                else
+                    test_resp := check_write_test(expected_response, entry.test_number);
+                end if;
+                write_result(entry.test_number, entry.lane, entry.mid, entry.x, entry.addr, entry.len, entry.size, entry.burst, entry.expected, entry.request_cycle);
+                if test_resp then
+                    error_signal <= '0';
+                else
+                    error_signal <= '1';
+                    write(log_line, string'("lane = "));
+                    write(log_line, entry.lane);
+                    write(log_line, string'(" MID = "));
+                    write(log_line, entry.mid);
+                    write(log_line, string'(" x_enable = "));
+                    write(log_line, entry.x);
+                    write(log_line, string'(" addr = "));
+                    write(log_line, entry.addr);
+                    writeline(log_file, log_line);
+                    write(log_line, string'("Expected "));
+                    write(log_line, entry.expected);
+                    write(log_line, string'(" but the test return "));
+                    write(log_line, 1 - entry.expected);
+                    writeline(log_file, log_line);
+                end if;
+            end loop;
+        end procedure;
+"""
+
+# response of the firewall to a denied burst, given to the design as C_DENY_RESP (SLVERR)
+AXI_DENY_RESP : str = "10"
+
+def axi_transactions(requests, ID_width : int, adress_width : int, MEM_WIDTH : int, first_test : int = 1):
+    """Return the AXI transactions of the requests, one (test_number, lane, id, mid, x, addr, len, size, burst, expected, data) tuple each.
+
+    The AXI ID is the MID modulo the 3 bits of S_AXI_*ID, so that transactions of several IDs are outstanding at the same time.
+    data is the word of every data beat of the burst, its test number on MEM_WIDTH bits.
+    """
+    transactions : list = []
+    with request_lines(requests) as f:
+        i : int = first_test
+        for line in f:
+            line = line.split('#')[0].strip()
+            if not line:
+                continue
+            tab = line.split()
+            rwx : int = int(tab[1], 16) & 0x7
+            mid : int = int(hexa_to_binary(tab[0], ID_width), 2)
+            transactions.append((i, rwx >> 2, mid % 8, mid, rwx & 1, int(hexa_to_binary(tab[2], adress_width), 2), *burst_fields(tab),
+                                 int(tab[3]), i % 2**min(MEM_WIDTH, 31)))
+            i += 1
+    return transactions
+
+def axi_declarations(transactions : list):
+    # transaction table of the AXI test bench and the M_AXI side of the design, answered by the slave model
+    table : str = ",\n".join(f"        {k} => ({', '.join(map(str, transaction))})" for k, transaction in enumerate(transactions))
+    writes : int = sum(1 for transaction in transactions if transaction[1] == 0)
+    return f"""
+    -- AXI transactions, issued in this order on the AW and AR channels
+    type TransactionType is record
+        test_number, lane, id, mid, x, addr, len, size, burst, expected, data : integer;
+    end record;
+    type TransactionArrayType is array (natural range <>) of TransactionType;
+    type IntegerArrayType is array (natural range <>) of integer;
+    constant TRANSACTIONS : TransactionArrayType(0 to {len(transactions)-1}) := (
+{table}
+    );
+    constant WRITES : natural := {writes};
+    constant READS : natural := {len(transactions) - writes};
+    constant DENY_RESP : std_logic_vector(1 downto 0) := "{AXI_DENY_RESP}";
+
+    signal issue_cycle    : IntegerArrayType(0 to {len(transactions)-1}) := (others => -1); -- Cycle of the address handshake of each transaction
+    signal writes_done    : natural := 0; -- Write responses checked
+    signal reads_done     : natural := 0; -- Read bursts checked
+    signal simulation_done : boolean := false; -- Stops the clock once every transaction is answered
+
+    -- Protected slave side, answered by the slave model
+    signal M_AXI_AWID        : std_logic_vector(2 downto 0);
+    signal M_AXI_AWADDR      : std_logic_vector(C_S_AXI_ADDR_WIDTH-1 downto 0);
+    signal M_AXI_AWLEN       : std_logic_vector(7 downto 0);
+    signal M_AXI_AWVALID     : std_logic;
+    signal M_AXI_AWREADY     : std_logic := '1';
+    signal M_AXI_WDATA       : std_logic_vector(C_S_AXI_DATA_WIDTH-1 downto 0);
+    signal M_AXI_WLAST       : std_logic;
+    signal M_AXI_WVALID      : std_logic;
+    signal M_AXI_WREADY      : std_logic := '1';
+    signal M_AXI_BID         : std_logic_vector(2 downto 0) := (others => '0');
+    signal M_AXI_BRESP       : std_logic_vector(1 downto 0) := "00";
+    signal M_AXI_BVALID      : std_logic := '0';
+    signal M_AXI_BREADY      : std_logic;
+    signal M_AXI_ARID        : std_logic_vector(2 downto 0);
+    signal M_AXI_ARADDR      : std_logic_vector(C_S_AXI_ADDR_WIDTH-1 downto 0);
+    signal M_AXI_ARLEN       : std_logic_vector(7 downto 0);
+    signal M_AXI_ARVALID     : std_logic;
+    signal M_AXI_ARREADY     : std_logic := '1';
+    signal M_AXI_RID         : std_logic_vector(2 downto 0) := (others => '0');
+    signal M_AXI_RDATA       : std_logic_vector(C_S_AXI_DATA_WIDTH-1 downto 0) := (others => '0');
+    signal M_AXI_RRESP       : std_logic_vector(1 downto 0) := "00";
+    signal M_AXI_RLAST       : std_logic := '0';
+    signal M_AXI_RVALID      : std_logic := '0';
+    signal M_AXI_RREADY      : std_logic;
+
+    -- One results record per transaction : actual is 1 for an OKAY response, the request cycle is the address handshake
+    -- and the response cycle the write response or the last read beat
+    procedure transaction_result(t : TransactionType; actual, request_cycle, response_cycle : integer) is
+        variable result_line : line;
+    begin
+        write(result_line, integer'image(t.test_number) & "," & integer'image(t.lane) & "," & integer'image(t.mid) & "," & integer'image(t.x) & ","
+                           & integer'image(t.addr) & "," & integer'image(t.len) & "," & integer'image(t.size) & "," & integer'image(t.burst) & ","
+                           & integer'image(t.expected) & "," & integer'image(actual) & "," & integer'image(request_cycle) & ","
+                           & integer'image(response_cycle) & ",-1");
+        writeline(results_file, result_line);
+    end procedure;
+
+    procedure transaction_error(t : TransactionType; message : string) is
+        variable log_line : line;
+    begin
+        report "Test FAILED : " & message severity error;
+        write(log_line, string'("ERROR : test number "));
+        write(log_line, integer'image(t.test_number));
+        write(log_line, string'(" FAILED ") & message);
+        writeline(log_file, log_line);
+    end procedure;
+"""
+
+AXI_PORT_MAP : str = """        M_AXI_AWID => M_AXI_AWID,
+        M_AXI_AWADDR => M_AXI_AWADDR,
+        M_AXI_AWLEN => M_AXI_AWLEN,
+        M_AXI_AWVALID => M_AXI_AWVALID,
+        M_AXI_AWREADY => M_AXI_AWREADY,
+        M_AXI_WDATA => M_AXI_WDATA,
+        M_AXI_WLAST => M_AXI_WLAST,
+        M_AXI_WVALID => M_AXI_WVALID,
+        M_AXI_WREADY => M_AXI_WREADY,
+        M_AXI_BID => M_AXI_BID,
+        M_AXI_BRESP => M_AXI_BRESP,
+        M_AXI_BVALID => M_AXI_BVALID,
+        M_AXI_BREADY => M_AXI_BREADY,
+        M_AXI_ARID => M_AXI_ARID,
+        M_AXI_ARADDR => M_AXI_ARADDR,
+        M_AXI_ARLEN => M_AXI_ARLEN,
+        M_AXI_ARVALID => M_AXI_ARVALID,
+        M_AXI_ARREADY => M_AXI_ARREADY,
+        M_AXI_RID => M_AXI_RID,
+        M_AXI_RDATA => M_AXI_RDATA,
+        M_AXI_RRESP => M_AXI_RRESP,
+        M_AXI_RLAST => M_AXI_RLAST,
+        M_AXI_RVALID => M_AXI_RVALID,
+        M_AXI_RREADY => M_AXI_RREADY,
+"""
+
+def axi_processes(ID_width : int, adress_width : int, MEM_WIDTH : int, wait_cycles : int):
+    """Return the processes of the AXI test bench : master, write data, response checkers and the M_AXI slave model.
+
+    The master issues one address per clock cycle in the order of TRANSACTIONS, waiting only for AWREADY or ARREADY, after
+    wait_cycles cycles for the rules. The slave model is always ready, checks that the addresses and data reaching M_AXI are
+    those of the allowed transactions in order, so that a denied burst reaching the slave fails, and answers OKAY with data.
+    BRESP, RRESP, RDATA and RLAST are checked for every transaction, one results record is written when it completes.
+    """
+    return f"""\t-- AXI master : one address per cycle, back to back
+    wrapper_process : process
+        variable log_line : line;
+        variable t : TransactionType;
+    begin
+        file_open(log_file, "test_bench.log", write_mode);
+        file_open(results_file, "{RESULTS_FILE}", write_mode);
+        write(log_line, string'("{RESULTS_HEADER}"));
+        writeline(results_file, log_line);
+        S_AXI_AWVALID <= '0';
+        S_AXI_ARVALID <= '0';
+        S_AXI_BREADY <= '1';
+        S_AXI_RREADY <= '1';
+        S_AXI_AWID <= (others => '0');
+        S_AXI_AWADDR <= (others => '0');
+        S_AXI_AWLEN <= (others => '0');
+        S_AXI_AWSIZE <= "000";
+        S_AXI_AWBURST <= "01";
+        S_AXI_AWLOCK <= '0';
+        S_AXI_AWCACHE <= (others => '0');
+        S_AXI_AWPROT <= (others => '0');
+        S_AXI_AWQOS <= (others => '0');
+        S_AXI_AWREGION <= (others => '0');
+        S_AXI_ARID <= (others => '0');
+        S_AXI_ARADDR <= (others => '0');
+        S_AXI_ARLEN <= (others => '0');
+        S_AXI_ARSIZE <= "000";
+        S_AXI_ARBURST <= "01";
+        S_AXI_ARLOCK <= '0';
+        S_AXI_ARCACHE <= (others => '0');
+        S_AXI_ARPROT <= (others => '0');
+        S_AXI_ARQOS <= (others => '0');
+        S_AXI_ARREGION <= (others => '0');
+        MID_W <= (others => '0');
+        MID_R <= (others => '0');
+        x_enable <= '0';
+        wait until S_AXI_ARESETN = '1';
+        -- rules programming and settling
+        for i in 1 to {wait_cycles} loop
+            wait until rising_edge(S_AXI_ACLK);
+        end loop;
+        for k in TRANSACTIONS'range loop
+            t := TRANSACTIONS(k);
+            if t.x = 1 then
+                x_enable <= '1';
+            else
+                x_enable <= '0';
+            end if;
+            if t.lane = 0 then
+                MID_W <= std_logic_vector(to_unsigned(t.mid, {ID_width}));
+                S_AXI_AWID <= std_logic_vector(to_unsigned(t.id, 3));
+                S_AXI_AWADDR <= std_logic_vector(to_unsigned(t.addr, {adress_width}));
+                S_AXI_AWLEN <= std_logic_vector(to_unsigned(t.len, 8));
+                S_AXI_AWSIZE <= std_logic_vector(to_unsigned(t.size, 3));
+                S_AXI_AWBURST <= std_logic_vector(to_unsigned(t.burst, 2));
+                S_AXI_AWVALID <= '1';
+                loop
+                    wait until rising_edge(S_AXI_ACLK);
+                    exit when S_AXI_AWREADY = '1';
+                end loop;
+                S_AXI_AWVALID <= '0';
+            else
+                MID_R <= std_logic_vector(to_unsigned(t.mid, {ID_width}));
+                S_AXI_ARID <= std_logic_vector(to_unsigned(t.id, 3));
+                S_AXI_ARADDR <= std_logic_vector(to_unsigned(t.addr, {adress_width}));
+                S_AXI_ARLEN <= std_logic_vector(to_unsigned(t.len, 8));
+                S_AXI_ARSIZE <= std_logic_vector(to_unsigned(t.size, 3));
+                S_AXI_ARBURST <= std_logic_vector(to_unsigned(t.burst, 2));
+                S_AXI_ARVALID <= '1';
+                loop
+                    wait until rising_edge(S_AXI_ACLK);
+                    exit when S_AXI_ARREADY = '1';
+                end loop;
+                S_AXI_ARVALID <= '0';
+            end if;
+            issue_cycle(k) <= cycle;
+        end loop;
+        -- responses of the last transactions
+        while writes_done < WRITES or reads_done < READS loop
+            wait until rising_edge(S_AXI_ACLK);
+        end loop;
+        file_close(log_file);
+        file_close(results_file);
+        simulation_done <= true;
+        wait;
+    end process;
+
+    -- write data : len+1 beats per write in issue order, the test number in every beat
+    write_data_process : process
+    begin
+        S_AXI_WVALID <= '0';
+        S_AXI_WLAST <= '0';
+        S_AXI_WDATA <= (others => '0');
+        S_AXI_WSTRB <= (others => '1');
+        wait until S_AXI_ARESETN = '1';
+        for k in TRANSACTIONS'range loop
+            if TRANSACTIONS(k).lane = 0 then
+                for beat in 0 to TRANSACTIONS(k).len loop
+                    S_AXI_WDATA <= std_logic_vector(to_unsigned(TRANSACTIONS(k).data, {MEM_WIDTH}));
+                    if beat = TRANSACTIONS(k).len then
+                        S_AXI_WLAST <= '1';
+                    else
+                        S_AXI_WLAST <= '0';
+                    end if;
+                    S_AXI_WVALID <= '1';
+                    loop
+                        wait until rising_edge(S_AXI_ACLK);
+                        exit when S_AXI_WREADY = '1';
+                    end loop;
+                end loop;
+            end if;
+        end loop;
+        S_AXI_WVALID <= '0';
+        S_AXI_WLAST <= '0';
+        wait;
+    end process;
+
+    -- write responses : matched per ID with the writes in issue order, OKAY when allowed and DENY_RESP when denied
+    write_response_checker : process(S_AXI_ACLK)
+        variable next_write : IntegerArrayType(0 to 7) := (others => 0);
+        variable k, id, actual : integer;
+        variable t : TransactionType;
+    begin
+        if rising_edge(S_AXI_ACLK) and S_AXI_BVALID = '1' and S_AXI_BREADY = '1' then
+            id := to_integer(unsigned(S_AXI_BID));
+            k := next_write(id);
+            while k < TRANSACTIONS'length and (TRANSACTIONS(k).lane /= 0 or TRANSACTIONS(k).id /= id) loop
+                k := k + 1;
+            end loop;
+            assert k < TRANSACTIONS'length report "write response without an outstanding write of its ID" severity failure;
+            t := TRANSACTIONS(k);
+            next_write(id) := k + 1;
+            actual := 0;
+            if S_AXI_BRESP = "00" then
+                actual := 1;
+            end if;
+            if issue_cycle(k) < 0 then
+                transaction_error(t, "write response before its address");
+            elsif (t.expected = 1 and S_AXI_BRESP /= "00") or (t.expected = 0 and S_AXI_BRESP /= DENY_RESP) then
+                transaction_error(t, "BRESP");
+            end if;
+            transaction_result(t, actual, issue_cycle(k), cycle);
+            writes_done <= writes_done + 1;
+        end if;
+    end process;
+
+    -- read data : beats matched per ID with the reads in issue order, RRESP and RDATA on every beat, RLAST on the last one only
+    read_data_checker : process(S_AXI_ACLK)
+        variable next_read : IntegerArrayType(0 to 7) := (others => 0);
+        variable current : IntegerArrayType(0 to 7) := (others => -1);
+        variable beat : IntegerArrayType(0 to 7) := (others => 0);
+        variable faults : IntegerArrayType(0 to 7) := (others => 0);
+        variable k, id, actual : integer;
+        variable t : TransactionType;
+    begin
+        if rising_edge(S_AXI_ACLK) and S_AXI_RVALID = '1' and S_AXI_RREADY = '1' then
+            id := to_integer(unsigned(S_AXI_RID));
+            if current(id) < 0 then
+                k := next_read(id);
+                while k < TRANSACTIONS'length and (TRANSACTIONS(k).lane /= 1 or TRANSACTIONS(k).id /= id) loop
+                    k := k + 1;
+                end loop;
+                assert k < TRANSACTIONS'length report "read data without an outstanding read of its ID" severity failure;
+                current(id) := k;
+                next_read(id) := k + 1;
+                beat(id) := 0;
+                faults(id) := 0;
+                if issue_cycle(k) < 0 then
+                    faults(id) := 1;
+                end if;
+            end if;
+            t := TRANSACTIONS(current(id));
+            if t.expected = 1 and (S_AXI_RRESP /= "00" or S_AXI_RDATA /= std_logic_vector(to_unsigned(t.data, {MEM_WIDTH}))) then
+                faults(id) := faults(id) + 1;
+            elsif t.expected = 0 and S_AXI_RRESP /= DENY_RESP then
+                faults(id) := faults(id) + 1;
+            end if;
+            if (S_AXI_RLAST = '1') /= (beat(id) = t.len) then
+                faults(id) := faults(id) + 1;
+            end if;
+            if S_AXI_RLAST = '1' or beat(id) = t.len then
+                actual := 0;
+                if S_AXI_RRESP = "00" then
+                    actual := 1;
+                end if;
+                if faults(id) > 0 then
+                    transaction_error(t, "RRESP, RDATA or RLAST");
+                end if;
+                transaction_result(t, actual, issue_cycle(current(id)), cycle);
+                reads_done <= reads_done + 1;
+                current(id) := -1;
+            else
+                beat(id) := beat(id) + 1;
+            end if;
+        end if;
+    end process;
+
+    -- protected slave, write side : always ready, the forwarded writes must be the allowed ones in issue order
+    M_AXI_AWREADY <= '1';
+    M_AXI_WREADY <= '1';
+    write_slave_model : process(S_AXI_ACLK)
+        variable next_allowed : integer := 0;
+        variable forwarded : IntegerArrayType(0 to TRANSACTIONS'length-1); -- forwarded writes, their data then their response awaited
+        variable data_head, response_head, tail : natural := 0;
+        variable beat : natural := 0;
+        variable k : integer;
+    begin
+        if rising_edge(S_AXI_ACLK) then
+            if M_AXI_BVALID = '1' and M_AXI_BREADY = '1' then
+                response_head := response_head + 1;
+            end if;
+            if M_AXI_AWVALID = '1' and M_AXI_AWREADY = '1' then
+                k := next_allowed;
+                while k < TRANSACTIONS'length and (TRANSACTIONS(k).lane /= 0 or TRANSACTIONS(k).expected /= 1) loop
+                    k := k + 1;
+                end loop;
+                assert k < TRANSACTIONS'length report "denied write forwarded to M_AXI" severity failure;
+                if to_integer(unsigned(M_AXI_AWADDR)) /= TRANSACTIONS(k).addr or to_integer(unsigned(M_AXI_AWLEN)) /= TRANSACTIONS(k).len
+                   or to_integer(unsigned(M_AXI_AWID)) /= TRANSACTIONS(k).id then
+                    transaction_error(TRANSACTIONS(k), "the write reaching M_AXI is not the next allowed one");
+                end if;
+                next_allowed := k + 1;
+                forwarded(tail) := k;
+                tail := tail + 1;
+            end if;
+            if M_AXI_WVALID = '1' and M_AXI_WREADY = '1' then
+                assert data_head < tail report "write data forwarded to M_AXI without its address" severity failure;
+                k := forwarded(data_head);
+                if M_AXI_WDATA /= std_logic_vector(to_unsigned(TRANSACTIONS(k).data, {MEM_WIDTH})) or (M_AXI_WLAST = '1') /= (beat = TRANSACTIONS(k).len) then
+                    transaction_error(TRANSACTIONS(k), "write data reaching M_AXI");
+                end if;
+                if M_AXI_WLAST = '1' then
+                    data_head := data_head + 1;
+                    beat := 0;
+                else
+                    beat := beat + 1;
+                end if;
+            end if;
+            if response_head < data_head then
+                M_AXI_BVALID <= '1';
+                M_AXI_BID <= std_logic_vector(to_unsigned(TRANSACTIONS(forwarded(response_head)).id, 3));
+                M_AXI_BRESP <= "00";
+            else
+                M_AXI_BVALID <= '0';
+            end if;
+        end if;
+    end process;
+
+    -- protected slave, read side : always ready, the forwarded reads must be the allowed ones in issue order
+    M_AXI_ARREADY <= '1';
+    read_slave_model : process(S_AXI_ACLK)
+        variable next_allowed : integer := 0;
+        variable forwarded : IntegerArrayType(0 to TRANSACTIONS'length-1); -- forwarded reads, answered in order
+        variable head, tail : natural := 0;
+        variable beat : natural := 0;
+        variable k : integer;
+    begin
+        if rising_edge(S_AXI_ACLK) then
+            if M_AXI_RVALID = '1' and M_AXI_RREADY = '1' then
+                if M_AXI_RLAST = '1' then
+                    head := head + 1;
+                    beat := 0;
+                else
+                    beat := beat + 1;
+                end if;
+            end if;
+            if M_AXI_ARVALID = '1' and M_AXI_ARREADY = '1' then
+                k := next_allowed;
+                while k < TRANSACTIONS'length and (TRANSACTIONS(k).lane /= 1 or TRANSACTIONS(k).expected /= 1) loop
+                    k := k + 1;
+                end loop;
+                assert k < TRANSACTIONS'length report "denied read forwarded to M_AXI" severity failure;
+                if to_integer(unsigned(M_AXI_ARADDR)) /= TRANSACTIONS(k).addr or to_integer(unsigned(M_AXI_ARLEN)) /= TRANSACTIONS(k).len
+                   or to_integer(unsigned(M_AXI_ARID)) /= TRANSACTIONS(k).id then
+                    transaction_error(TRANSACTIONS(k), "the read reaching M_AXI is not the next allowed one");
+                end if;
+                next_allowed := k + 1;
+                forwarded(tail) := k;
+                tail := tail + 1;
+            end if;
+            if head < tail then
+                k := forwarded(head);
+                M_AXI_RVALID <= '1';
+                M_AXI_RID <= std_logic_vector(to_unsigned(TRANSACTIONS(k).id, 3));
+                M_AXI_RDATA <= std_logic_vector(to_unsigned(TRANSACTIONS(k).data, {MEM_WIDTH}));
+                M_AXI_RRESP <= "00";
+                if beat = TRANSACTIONS(k).len then
+                    M_AXI_RLAST <= '1';
+                else
+                    M_AXI_RLAST <= '0';
+                end if;
+            else
+                M_AXI_RVALID <= '0';
+                M_AXI_RLAST <= '0';
+            end if;
+        end if;
+    end process;
+
+end architecture;
+"""
+
+def write_test_bench(test, MEM_DEPTH : int, MEM_WIDTH : int, rules, requests, vector_file : str = None, vectors = None, latency : int = 1,
+                     settle_cycles : int = 0, first_test : int = 1, progress : bool = False, shadow_bank : bool = False, preload : bool = False,
+                     slots_per_mid : int = 0, encoding : str = "range", period : int = period, unite : str = unite, stream : bool = False,
+                     axi : bool = False):
+    """Write the test bench to the text stream test, return the rules_array cells to preload (None without preload).
+
+    rules is a rule image path or the rule words, requests a request file path or its lines, see rule_words() and
+    request_lines(). With vector_file the requests go to the text stream vectors, read at simulation time from the path vector_file,
+    relative to the directory where the simulation runs.
+    With stream a request is driven on each lane every clock cycle instead of one request every latency cycles, and a
+    scoreboard checks each response latency cycles after its request, see streamed_requests(); the design has to take
+    a request per cycle, which the bram architecture does not.
+    With axi the requests are issued as AXI transactions through S_AXI and answered by a slave model on M_AXI instead of
+    being checked on the wrapper responses, see axi_processes(); latency is then unused.
+    Everything is taken from the arguments, so several test benches can be written at the same time.
+    """
+    if axi and (vector_file is not None or stream):
+        raise ValueError("the AXI test bench holds its transactions in a table, it takes neither a vector file nor stream")
+    ID_width, adress_width = field_widths(MEM_DEPTH, MEM_WIDTH, encoding)
+    slots, rules_depth = rule_slots(rule_words(rules, MEM_DEPTH, MEM_WIDTH).tolist(), MEM_DEPTH, MEM_WIDTH, slots_per_mid)
+    rule_number_width : int = math.ceil(math.log2(rules_depth))
+    # the rule image is opened from the directory where the simulation runs
+    preload_generic : str = ""
+    cells : list = None
+    if preload:
+        cells = [0] * rules_depth
+        for rule_number, word in slots:
+            cells[rule_number] = word
+        preload_generic = f""",
+        C_RULES_INIT_FILE => "{PRELOAD_FILE}\""""
+
+    # design generated with --shadow_bank : the rules are written to the shadow bank then swapped in
+    shadow_signal : str = ""
+    shadow_port_map : str = ""
+    if shadow_bank:
+        shadow_signal = """    signal bank_swap              : std_logic := '0'; -- Makes the shadow rule bank the active one
+"""
+        shadow_port_map = """        bank_swap => bank_swap,
+"""
+
+    # AXI transactions : the M_AXI side is connected to the slave model and the clock stops after the last response
+    axi_signals : str = ""
+    axi_generic : str = ""
+    axi_port_map : str = ""
+    clock_stop : str = ""
+    if axi:
+        transactions : list = axi_transactions(requests, ID_width, adress_width, MEM_WIDTH, first_test)
+        if not transactions:
+            raise ValueError("the AXI test bench needs at least one request")
+        axi_signals = axi_declarations(transactions)
+        axi_generic = """,
+        C_DENY_RESP => DENY_RESP"""
+        axi_port_map = AXI_PORT_MAP
+        clock_stop = """            if simulation_done then
+                wait;
+            end if;
+"""
 
     test_bench : str = f"""library ieee;
 use ieee.std_logic_1164.all;
@@ -42,10 +904,10 @@ architecture arch_interface of generated_tb is
     signal C_S_AXI_ID_WIDTH       : integer := 3; -- Width of the AXI transaction ID
 
     -- AXI Data width in bits
-    signal C_S_AXI_DATA_WIDTH     : integer := 16; -- Width of AXI data in bits
+    signal C_S_AXI_DATA_WIDTH     : integer := {MEM_WIDTH}; -- Width of AXI data in bits
 
     -- AXI Address width in bits
-    signal C_S_AXI_ADDR_WIDTH     : integer := 5;  -- Width of AXI address in bits
+    signal C_S_AXI_ADDR_WIDTH     : integer := {adress_width};  -- Width of AXI address in bits
 
     -- Optional user signal widths for AW, AR, W, R, and B channels
     signal C_S_AXI_AWUSER_WIDTH   : integer := 0;  -- Width of user signals for write address channel (AW)
@@ -55,15 +917,15 @@ architecture arch_interface of generated_tb is
     signal C_S_AXI_BUSER_WIDTH    : integer := 0;  -- Width of user signals for write response channel (B)
 
     -- Master ID width
-    signal C_MASTER_ID_WIDTH      : integer := 3;  -- Width of the master ID
+    signal C_MASTER_ID_WIDTH      : integer := {ID_width};  -- Width of the master ID
 
     -- Master ID signals
     signal MID_R                  : std_logic_vector(C_MASTER_ID_WIDTH-1 downto 0); -- ID of the master requesting a read operation
     signal MID_W                  : std_logic_vector(C_MASTER_ID_WIDTH-1 downto 0); -- ID of the master requesting a write operation
 
     -- Rule-related signals
-    signal rule_number            : std_logic_vector(2 downto 0); -- Number representing the rule
-    signal data_rule              : std_logic_vector(15 downto 0); -- Data associated with the rule
+    signal rule_number            : std_logic_vector({rule_number_width-1} downto 0); -- Number representing the rule
+    signal data_rule              : std_logic_vector({MEM_WIDTH-1} downto 0); -- Data associated with the rule
     signal w_rule_enable          : std_logic; -- Signal to indicate that a rule is being written to memory
 
     -- Enable signal
@@ -74,10 +936,17 @@ architecture arch_interface of generated_tb is
     signal wrapper_read_response  : std_logic; -- Signal indicating the response to a read operation
 
     signal error_signal           : std_logic := '0';
+{shadow_signal}
+    -- Clock cycle counter and cycle of the last change of each response
+    signal cycle                  : natural := 0; -- Rising edges of S_AXI_ACLK since the start of the simulation
+    signal write_response_cycle   : integer := -1;
+    signal read_response_cycle    : integer := -1;
 
     -- Declaration of a global log file
     file log_file : text; -- Global log file for recording operations
-
+    -- Structured results, one CSV record per vector
+    file results_file : text;
+{axi_signals}
     -- Declaration of a function for write request verification 
     function check_write_test( wrapper_response : std_logic; test_number : integer) return boolean is
         variable log_line : line;
@@ -95,6 +964,34 @@ architecture arch_interface of generated_tb is
         end if;
     end function;
 
+    -- One results record : the request, the expected and actual responses, the cycle the request was driven,
+    -- the cycle the response was checked and the cycle the response last changed (-1 when it did not change since the request)
+    procedure write_result(test_number, lane, mid, x, addr, len, size, burst, expected : integer; request_cycle : natural) is
+        variable result_line : line;
+        variable actual : integer := 0;
+        variable settled_cycle : integer;
+    begin
+        if lane = 1 then
+            if wrapper_read_response = '1' then
+                actual := 1;
+            end if;
+            settled_cycle := read_response_cycle;
+        else
+            if wrapper_write_response = '1' then
+                actual := 1;
+            end if;
+            settled_cycle := write_response_cycle;
+        end if;
+        if settled_cycle < request_cycle then
+            settled_cycle := -1;
+        end if;
+        write(result_line, integer'image(test_number) & "," & integer'image(lane) & "," & integer'image(mid) & "," & integer'image(x) & ","
+                           & integer'image(addr) & "," & integer'image(len) & "," & integer'image(size) & "," & integer'image(burst) & ","
+                           & integer'image(expected) & "," & integer'image(actual) & "," & integer'image(request_cycle) & ","
+                           & integer'image(cycle) & "," & integer'image(settled_cycle));
+        writeline(results_file, result_line);
+    end procedure;
+
     -- Declaration of a function for read request verification
     function check_read_test( wrapper_response : std_logic; test_number : integer) return boolean is
         variable log_line : line;
@@ -197,7 +1094,7 @@ begin
         C_S_AXI_WUSER_WIDTH => C_S_AXI_WUSER_WIDTH,
         C_S_AXI_RUSER_WIDTH => C_S_AXI_RUSER_WIDTH,
         C_S_AXI_BUSER_WIDTH => C_S_AXI_BUSER_WIDTH,
-        C_MASTER_ID_WIDTH => C_MASTER_ID_WIDTH
+        C_MASTER_ID_WIDTH => C_MASTER_ID_WIDTH{preload_generic}{axi_generic}
     )
     port map(
         rule_number => rule_number,
@@ -208,7 +1105,7 @@ begin
         x_enable => x_enable,
         wrapper_write_response => wrapper_write_response,
         wrapper_read_response => wrapper_read_response,
-        S_AXI_ACLK => S_AXI_ACLK,
+{shadow_port_map}{axi_port_map}        S_AXI_ACLK => S_AXI_ACLK,
         S_AXI_ARESETN => S_AXI_ARESETN,
         S_AXI_AWID => S_AXI_AWID,
         S_AXI_AWADDR => S_AXI_AWADDR,
@@ -263,139 +1160,256 @@ begin
             wait for {period/2} {unite};
             S_AXI_ACLK <= '1';
             wait for {period/2} {unite};
-        end process;
+{clock_stop}        end process;
 
         -- S_AXI_ARESETN simulation
         reset_process : process
         begin
-            S_AXI_ARESETN <= '1';
-            wait for {period/2} {unite};
             S_AXI_ARESETN <= '0';
+            wait for {period/2} {unite};
+            S_AXI_ARESETN <= '1';
             wait;
         end process;
+
+        -- clock cycle counter for the results records
+        cycle_process : process(S_AXI_ACLK)
+        begin
+            if rising_edge(S_AXI_ACLK) then
+                cycle <= cycle + 1;
+            end if;
+        end process;
+
+        write_response_monitor : process(wrapper_write_response)
+        begin
+            write_response_cycle <= cycle;
+        end process;
+
+        read_response_monitor : process(wrapper_read_response)
+        begin
+            read_response_cycle <= cycle;
+        end process;
     """
 
-    mem_config = open("memory_configuration.txt", 'r')
-    lines = mem_config.readlines()
+    test.write(test_bench)
 
     # start of process
-    memory_process : str = f"""\t-- simulation of memory configuration 
+    test.write(f"""\t-- simulation of memory configuration 
         memory_process : process
         begin
             w_rule_enable <= '0';
             data_rule <= (others => '-');
-            rule_number <= "---";
+            rule_number <= "{'-'*rule_number_width}";
             wait for {period/2} {unite};
-    """
+    """)
 
-    i : int = 0 # for rules number
-    for line in lines:
-        # to ignore comments line
-        line = line.split('#')[0].strip()
-        if not line:
-            continue
-        memory_process += f"""\t\trule_number <= "{decimal_to_binary(i, ID_width)}";
+    # preloaded rules are already in both banks, nothing to program or swap
+    for rule_number, word in ([] if preload else slots):
+        test.write(f"""\t\trule_number <= "{decimal_to_binary(rule_number, rule_number_width)}";
             w_rule_enable <= '1';
-            data_rule <= "{hexa_to_binary(line, MEM_WIDTH)}";
+            data_rule <= "{decimal_to_binary(word, MEM_WIDTH)}";
             wait for {period} {unite};
-    """
-        i += 1
+    """)
+    if shadow_bank and not preload:
+        test.write(f"""\t\tw_rule_enable <= '0';
+            bank_swap <= '1';
+            wait for {period} {unite};
+            bank_swap <= '0';
+    """)
     # end of process
-    memory_process += """\t\tw_rule_enable <= '0';
+    test.write(f"""\t\tw_rule_enable <= '0';
             data_rule <= (others => '-');
-            rule_number <= "---";
+            rule_number <= "{'-'*rule_number_width}";
             wait;
         end process;
 
-    """
+    """)
+    if axi:
+        # reset edge, rules programming, bank swap and settling before the first address
+        wait_cycles : int = 2 + (0 if preload else len(slots) + (2 if shadow_bank else 0)) + settle_cycles
+        test.write(axi_processes(ID_width, adress_width, MEM_WIDTH, wait_cycles))
+        return cells
     # start of wrapper process simulation
-    wrapper_process = """\t-- request simulation
+    test.write("""\t-- request simulation
     wrapper_process : process
         variable log_line : line; -- Variable for writing lines to the file
         variable test_resp : boolean;
-    begin
+        variable request_cycle : natural;
+""")
+    if vector_file is not None:
+        test.write("""        -- requests read from the vector file
+        file vector_file : text;
+        variable vector_line : line;
+        variable test_number, lane, mid, x, addr, expected, len, size, burst : integer;
+        variable expected_response : std_logic;
+""")
+        if stream:
+            test.write("""        variable pending, used_w, used_r : boolean;
+        variable cycle_x : integer;
+""")
+    if stream:
+        test.write(scoreboard_declarations(latency, period, unite))
+    test.write(f"""    begin
         file_open(log_file, "test_bench.log", write_mode);
-        wait for 30 us;
-"""
-
-    f = open("request.txt", 'r')
-    lines = f.readlines()
-    i : int = 1
-    for line in lines:
-        # ignore comment lines and empty lines
-        line = line.split('#')[0].strip()
-        if not line:
-            continue
-        MID : str = None
-        ADD : str = None
-        check_function : str = None
-        tab = line.split() # put the line in a table, each field in a column
-        # find in witch mode we are (read or write)
-        rwx = hexa_to_binary(tab[1], rwx_width)
-        if rwx[0] == '1':
-            MID = "MID_R"
-            ADD = "S_AXI_ARADDR"
-            check_function = "check_read_test"
-        else:
-            MID = "MID_W"
-            ADD = "S_AXI_AWADDR"
-            check_function = "check_write_test"
-        info : str = f"""
-
+        file_open(results_file, "{RESULTS_FILE}", write_mode);
+        write(log_line, string'("{RESULTS_HEADER}"));
+        writeline(results_file, log_line);
+        -- single beat INCR requests unless the request file gives a burst
+        S_AXI_AWLEN <= (others => '0');
+        S_AXI_AWSIZE <= "000";
+        S_AXI_AWBURST <= "01";
+        S_AXI_ARLEN <= (others => '0');
+        S_AXI_ARSIZE <= "000";
+        S_AXI_ARBURST <= "01";
+""")
+    if shadow_bank and not preload:
+        # the active bank is empty until the swap, the requests keep their alignment on the clock
+        test.write(f"""        wait until bank_swap = '1';
+        wait for {period*3/2} {unite};
+""")
+    test.write("""        wait for 30 us;
+""")
+    if settle_cycles > 0:
+        # architectures that rebuild internal tables after the rules are written (bitmap)
+        test.write(f"""        wait for {period*settle_cycles} {unite};
+""")
 
-
-"""
-        wrapper_process += f"""\t\t-----------------------------------TEST {i}------------------------------
-        {MID} <= "{hexa_to_binary(tab[0], ID_width)}";
-        x_enable <= '{rwx[2]}'; 
-        {ADD} <= "{hexa_to_binary(tab[2], adress_width)}";
-        wait for 10 us;
-        test_resp := {check_function}('{tab[3]}', {i});
-        if test_resp then
-            error_signal <= '0';
-        else
-            error_signal <= '1';
-            write(log_line, string'("{MID} = {tab[0]}"));
-            writeline(log_file, log_line);
-            write(log_line, string'("rwx = {tab[1]}"));
-            writeline(log_file, log_line);
-            write(log_line, string'("{ADD} = {tab[2]}"));
-            writeline(log_file, log_line);
-            write(log_line, string'("Expected {tab[3]} but the test return { 1 - int(tab[3])}"));
-            writeline(log_file, log_line);
-        end if;
-"""
-        i += 1
+    if vector_file is None and stream:
+        test.writelines(streamed_requests(requests, ID_width, adress_width, first_test, progress, period, unite))
+    elif vector_file is None:
+        test.writelines(unrolled_requests(requests, ID_width, adress_width, latency, first_test, progress, period, unite))
+    else:
+        write_vector_file(requests, vectors, ID_width, adress_width, first_test, progress)
+        test.write(file_streamed_requests(vector_file) if stream else file_driven_requests(vector_file, latency, period, unite))
+    if stream:
+        test.write("""        -- responses of the last requests
+        while scoreboard_count > 0 loop
+            next_cycle;
+        end loop;
+""")
 
     # end of wrapper process simulation
-    wrapper_process += """\t\t-- close file
+    test.write("""\t\t-- close file
         file_close(log_file);
+        file_close(results_file);
         
         MID_W <= (others => '-');
         MID_R <= (others => '-');
         wait;
     end process;
 end architecture;
-"""
+""")
+    return cells
 
-    test_bench += memory_process
-    test_bench += wrapper_process
+def wrapper_timing(manifest_path : str):
+    # latency and settle cycles of the design recorded by wrapper.py in its generation manifest
+    entry = load_manifest(manifest_path).get("wrapper")
+    if entry is None or "latency" not in entry["parameters"]:
+        raise ValueError(f"{manifest_path} does not record the latency of a design generated by wrapper.py")
+    return entry["parameters"]["latency"], entry["parameters"]["settle_cycles"]
 
-    test = open("Interface_AXI_tb.vhd", 'w')
-    test.write(test_bench)
+def render_test_bench(MEM_DEPTH : int, MEM_WIDTH : int, rules, requests, vector_file : str = None, **options):
+    """Return the files of a test bench ({file name: content}) without writing anything, see write_test_bench() for the options.
 
+    The rules and the requests may be given in memory. The whole test bench is held in memory, generate_test_bench_file()
+    streams it to disk for millions of requests.
+    """
+    test = io.StringIO()
+    vectors = io.StringIO() if vector_file is not None else None
+    # the vector file is returned next to the test bench
+    cells = write_test_bench(test, MEM_DEPTH, MEM_WIDTH, rules, requests, None if vector_file is None else os.path.basename(vector_file), vectors, **options)
+    files : dict = {TEST_BENCH_FILE: test.getvalue()}
+    if vector_file is not None:
+        files[os.path.basename(vector_file)] = vectors.getvalue()
+    if cells is not None:
+        files[PRELOAD_FILE] = init_image(cells, len(cells), MEM_WIDTH).decode()
+    return files
+
+def generate_test_bench_file(MEM_DEPTH : int, MEM_WIDTH : int, vector_file : str = None, latency : int = 1, settle_cycles : int = 0,
+                             memory_file = "memory_configuration.txt", request_file = "request.txt",
+                             output_file : str = TEST_BENCH_FILE, first_test : int = 1, progress : bool = False,
+                             shadow_bank : bool = False, preload : bool = False, slots_per_mid : int = 0, incremental : bool = True,
+                             encoding : str = "range", period : int = period, unite : str = unite, stream : bool = False,
+                             axi : bool = False):
+    """Write the test bench, return False when incremental generation found it up to date.
+
+    The parameters, the hashes of the memory and request files and the hashes of the outputs are recorded
+    in the generation manifest next to output_file. Outputs are streamed to temporary files and only replace
+    the previous ones when their content changed.
+
+    memory_file may be any rule image format of rule_image.py. With preload the rules are written to
+    PRELOAD_FILE and loaded by rules_array at elaboration instead of being programmed one per clock cycle.
+    slots_per_mid matches a design generated with --slots_per_mid, see rule_slots(), and encoding one generated
+    with --encoding, whose NAPOT rules widen the addresses driven by the test bench. memory_file and request_file
+    may also be given in memory (rule words, request lines), the test bench is then always regenerated.
+    stream drives the requests back to back and checks them with a scoreboard, axi issues them as AXI transactions
+    answered by a slave model, see write_test_bench().
+    """
+
+    manifest_path : str = os.path.join(os.path.dirname(output_file), MANIFEST_FILE)
+    parameters : dict = {"MEM_DEPTH": MEM_DEPTH, "MEM_WIDTH": MEM_WIDTH, "vector_file": vector_file, "latency": latency,
+                         "settle_cycles": settle_cycles, "first_test": first_test, "shadow_bank": shadow_bank, "preload": preload,
+                         "slots_per_mid": slots_per_mid, "encoding": encoding, "period": period, "unite": unite, "stream": stream,
+                         "axi": axi}
+    # sources given in memory have no file to hash
+    sources : list = [source for source in (memory_file, request_file) if isinstance(source, (str, os.PathLike))]
+    inputs : list = sources + GENERATOR_SOURCES
+    preload_file : str = os.path.join(os.path.dirname(output_file), PRELOAD_FILE)
+    outputs : list = [output_file] + ([vector_file] if vector_file is not None else []) + ([preload_file] if preload else [])
+    if incremental and len(sources) == 2 and up_to_date(manifest_path, "test_bench", parameters, inputs):
+        return False
+
+    # the simulation runs in the directory of the test bench, which opens the vector file relative to it
+    vector_path : str = None
+    if vector_file is not None:
+        vector_path = os.path.relpath(vector_file, os.path.dirname(os.path.abspath(output_file))).replace(os.sep, "/")
+
+    # the test bench is written as it is generated, so memory stays flat whatever the number of requests
+    with open(output_file + ".tmp", 'w', buffering=WRITE_BUFFER_SIZE) as test, \
+         (open(vector_file + ".tmp", 'w', buffering=WRITE_BUFFER_SIZE) if vector_file is not None else contextlib.nullcontext()) as vectors:
+        cells = write_test_bench(test, MEM_DEPTH, MEM_WIDTH, memory_file, request_file, vector_path, vectors, latency, settle_cycles,
+                                 first_test, progress, shadow_bank, preload, slots_per_mid, encoding, period, unite, stream, axi)
+    if preload:
+        with open(preload_file + ".tmp", 'wb') as f:
+            f.write(init_image(cells, len(cells), MEM_WIDTH))
+
+    for path in outputs:
+        replace_if_changed(path + ".tmp", path)
+    record(manifest_path, "test_bench", parameters, inputs, outputs)
+    return True
 
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description='Generate VHDL test bench files for a wrapper with specified MEM_DEPTH and MEM_WIDTH.')
     parser.add_argument('--mem_depth','-d', type=int, default= MEM_DEPTH, required=False, help='Memory depth (number of memory cells)')
     parser.add_argument('--mem_width','-w', type=int, default= MEM_WIDTH, required=False, help='Memory width (width of each memory cell)')
+    parser.add_argument('--latency','-l', type=int, default= 1, required=False, help='Response latency of the wrapper in clock cycles (its number of pipeline stages)')
+    parser.add_argument('--settle_cycles','-s', type=int, default= 0, required=False, help='Extra clock cycles to wait after the rules are written before the first request')
+    parser.add_argument('--wrapper_manifest', default= None, required=False, help='Take --latency and --settle_cycles from the generation manifest written by wrapper.py with the design')
+    parser.add_argument('--vector_file','-v', default= None, required=False, help='Write the requests to this vector file and read it at simulation time instead of unrolling them in the test bench, the simulation runs in the directory of the test bench')
+    parser.add_argument('--shadow_bank', action='store_true', help='Design generated with --shadow_bank: pulse bank_swap after writing the rules and wait for it before the requests')
+    parser.add_argument('--preload', action='store_true', help=f'Load the rules into the rules array at elaboration from {PRELOAD_FILE} instead of programming them through data_rule')
+    parser.add_argument('--memory_file','-m', default= "memory_configuration.txt", required=False, help='Rule table, hexadecimal text or a rule image (.bin, .npy, .init)')
+    parser.add_argument('--request_file','-r', default= "request.txt", required=False, help='Requests, one "MID rwx addr expected [len size burst]" line each in hexadecimal')
+    parser.add_argument('--slots_per_mid', type=int, default= 0, required=False, help='Design generated with --slots_per_mid: program each rule into a slot of the bank of its ID')
+    parser.add_argument('--encoding','-e', choices=ENCODINGS, default='range', help='Design generated with --encoding: address field of the rules, addr_min/addr_max range or NAPOT region')
+    parser.add_argument('--stream', action='store_true', help='Drive one request per clock cycle on each lane and check the responses --latency cycles later with a scoreboard, instead of one request every --latency cycles')
+    parser.add_argument('--axi', action='store_true', help='Issue the requests as AXI bursts back to back through S_AXI, check BRESP, RRESP, RDATA and RLAST and that only allowed bursts reach the slave model on M_AXI')
+    parser.add_argument('--force', action='store_true', help='Regenerate the test bench even when the generation manifest says it is up to date')
+    parser.add_argument('--progress', action='store_true', help=f'Report progress every {PROGRESS_STEP} requests')
 
     args = parser.parse_args()
+    if args.wrapper_manifest is not None:
+        try:
+            args.latency, args.settle_cycles = wrapper_timing(args.wrapper_manifest)
+        except ValueError as error:
+            parser.error(str(error))
 
-    generate_test_bench_file( args.mem_depth, args.mem_width)
-
-    if MEM_DEPTH == args.mem_depth and MEM_WIDTH == args.mem_width:
+    generated = generate_test_bench_file( args.mem_depth, args.mem_width, args.vector_file, args.latency, args.settle_cycles, progress=args.progress,
+                                          memory_file=args.memory_file, request_file=args.request_file, shadow_bank=args.shadow_bank, preload=args.preload,
+                                          slots_per_mid=args.slots_per_mid, incremental=not args.force, encoding=args.encoding, stream=args.stream, axi=args.axi)
+    if not generated:
+        print(f"Test bench up to date (parameters and input files unchanged since the last run recorded in {MANIFEST_FILE}), use --force to regenerate it")
+    elif MEM_DEPTH == args.mem_depth and MEM_WIDTH == args.mem_width:
         print(f"VHDL test bench files generated with MEM_DEPTH = {MEM_DEPTH} and MEM_WIDTH = {MEM_WIDTH} to change this values use the -d and -w options")
     else:
         MEM_DEPTH = args.mem_depth
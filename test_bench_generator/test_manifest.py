@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from manifest import write_if_changed, replace_if_changed, up_to_date, record
+
+PARAMETERS : dict = {"MEM_DEPTH": 8, "MEM_WIDTH": 16}
+
+@pytest.fixture
+def run(tmp_path):
+    # one recorded run : an input and an output file, the manifest next to them
+    source = tmp_path / "source.txt"
+    output = tmp_path / "output.vhd"
+    source.write_text("081F\n")
+    output.write_text("entity e is end e;\n")
+    manifest = str(tmp_path / "manifest.json")
+    record(manifest, "test_bench", PARAMETERS, [str(source)], [str(output)])
+    return manifest, source, output
+
+def test_up_to_date_after_record(run):
+    manifest, source, _ = run
+    assert up_to_date(manifest, "test_bench", dict(PARAMETERS), [str(source)])
+
+def test_missing_manifest_or_generator(run, tmp_path):
+    manifest, source, _ = run
+    assert not up_to_date(str(tmp_path / "missing.json"), "test_bench", PARAMETERS, [str(source)])
+    assert not up_to_date(manifest, "wrapper", PARAMETERS, [str(source)])
+
+def test_changed_parameters(run):
+    manifest, source, _ = run
+    assert not up_to_date(manifest, "test_bench", dict(PARAMETERS, MEM_WIDTH=32), [str(source)])
+
+def test_changed_or_other_inputs(run, tmp_path):
+    manifest, source, _ = run
+    other = tmp_path / "other.txt"
+    other.write_text("907C\n")
+    assert not up_to_date(manifest, "test_bench", PARAMETERS, [str(source), str(other)])
+    source.write_text("907C\n")
+    assert not up_to_date(manifest, "test_bench", PARAMETERS, [str(source)])
+
+@pytest.mark.parametrize("edit", ["modified", "removed"])
+def test_touched_outputs(run, edit):
+    manifest, source, output = run
+    if edit == "removed":
+        os.remove(output)
+    else:
+        output.write_text("-- edited by hand\n")
+    assert not up_to_date(manifest, "test_bench", PARAMETERS, [str(source)])
+
+def test_corrupt_manifest(run):
+    manifest, source, _ = run
+    with open(manifest, 'w') as f:
+        f.write("{")
+    assert not up_to_date(manifest, "test_bench", PARAMETERS, [str(source)])
+
+def test_unchanged_files_are_not_rewritten(tmp_path):
+    path = str(tmp_path / "file.vhd")
+    assert write_if_changed(path, "a")
+    os.utime(path, (0, 0))
+    assert not write_if_changed(path, "a") and os.path.getmtime(path) == 0
+    with open(path + ".tmp", 'w') as f:
+        f.write("a")
+    assert not replace_if_changed(path + ".tmp", path)
+    assert os.path.getmtime(path) == 0 and not os.path.exists(path + ".tmp")
+    with open(path + ".tmp", 'w') as f:
+        f.write("b")
+    assert replace_if_changed(path + ".tmp", path)
+    with open(path) as f:
+        assert f.read() == "b"
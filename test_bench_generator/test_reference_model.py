@@ -0,0 +1,103 @@
+import os
+
+import numpy as np
+import pytest
+
+from reference_model import (BURST_FIXED, BURST_INCR, BURST_WRAP, field_widths, load_rules, decode_rules, request_key, evaluate,
+                             burst_footprint, napot_range, napot_region, build_interval_index, evaluate_index,
+                             build_permission_bitmap, evaluate_bitmap)
+
+HERE : str = os.path.dirname(os.path.abspath(__file__))
+MEM_DEPTH : int = 8
+MEM_WIDTH : int = 16
+
+def random_rules(rng, count : int = 16):
+    # decoded rules with overlapping, nested and empty ranges and rwx values that can not match
+    ID_width, adress_width = field_widths(MEM_DEPTH, MEM_WIDTH)
+    addr_min = rng.integers(0, 2**adress_width, count)
+    return {"id": rng.integers(0, 2**ID_width, count), "rwx": rng.integers(0, 8, count),
+            "addr_min": addr_min, "addr_max": np.minimum(addr_min + rng.integers(0, 12, count), 2**adress_width - 1)}
+
+def random_bursts(rng, count : int = 4000):
+    # MID, rwx, first and last address of requests, a quarter of them single beats
+    ID_width, adress_width = field_widths(MEM_DEPTH, MEM_WIDTH)
+    addr = rng.integers(0, 2**adress_width, count)
+    addr_last = np.where(rng.random(count) < 0.25, addr, np.minimum(addr + rng.integers(0, 8, count), 2**adress_width - 1))
+    return rng.integers(0, 2**ID_width, count), rng.integers(0, 8, count), addr, addr_last
+
+def default_rules():
+    return decode_rules(load_rules(os.path.join(HERE, "memory_configuration.txt"), MEM_DEPTH, MEM_WIDTH), MEM_DEPTH, MEM_WIDTH)
+
+def test_decode_rules():
+    rules = default_rules()
+    assert {name: column.tolist() for name, column in rules.items()} == {"id": [0, 4, 1], "rwx": [0b010, 0b100, 0b101],
+                                                                        "addr_min": [0, 3, 3], "addr_max": [31, 28, 30]}
+
+def test_request_key():
+    # write lane "01" & x, read lane "10" & x, whatever the middle bit of the request
+    assert request_key([0b000, 0b001, 0b010, 0b011, 0b100, 0b101, 0b110, 0b111]).tolist() == [2, 3, 2, 3, 4, 5, 4, 5]
+
+@pytest.mark.parametrize("mid, rwx, addr, allowed", [
+    (4, 0b100, 3, True),    # addr_min
+    (4, 0b100, 27, True),   # addr_max-1
+    (4, 0b100, 28, False),  # addr_max
+    (4, 0b100, 2, False),   # addr_min-1
+    (4, 0b101, 10, False),  # x_enable the rule does not have
+    (4, 0b000, 10, False),  # write lane of a read rule
+    (5, 0b100, 10, False),  # MID without rule
+    (1, 0b111, 10, True),   # the middle bit of the request is not compared
+])
+def test_evaluate(mid, rwx, addr, allowed):
+    assert evaluate(default_rules(), [mid], [rwx], [addr]).tolist() == [allowed]
+
+def test_evaluate_burst_must_fit_one_rule():
+    rules = decode_rules([0x081F, 0x0A1F], MEM_DEPTH, MEM_WIDTH)
+    assert rules["addr_max"].tolist() == [31, 31] and rules["addr_min"].tolist() == [0, 16]
+    # [0,31) then the same range from 16 : a burst crossing 16 fits the first rule, one up to 31 fits none
+    assert evaluate(rules, [0, 0], [0b010, 0b010], [10, 16], [20, 31]).tolist() == [True, False]
+
+def test_burst_footprint():
+    _, adress_width = field_widths(MEM_DEPTH, MEM_WIDTH)
+    first, last, valid = burst_footprint([5, 5, 5, 30, 5], [3, 3, 3, 3, 0], [0, 1, 1, 0, 0], [BURST_FIXED, BURST_INCR, BURST_WRAP, BURST_INCR, 3], adress_width)
+    # FIXED : one beat, INCR : 4 beats of 2 bytes from the aligned start, WRAP : the 8 byte window, then out of range and reserved
+    assert first.tolist() == [5, 5, 0, 30, 5]
+    assert last.tolist() == [5, 11, 7, 31, 31]
+    assert valid.tolist() == [True, True, True, False, False]
+
+def test_napot_round_trip():
+    _, adress_width = field_widths(MEM_DEPTH, MEM_WIDTH, "napot")
+    addr_min = np.array([0, 8, 12, 0])
+    addr_max = np.array([1, 16, 16, 2**adress_width])
+    assert [column.tolist() for column in napot_range(napot_region(addr_min, addr_max, adress_width), adress_width)] == [addr_min.tolist(), addr_max.tolist()]
+    with pytest.raises(ValueError):
+        napot_region([4], [10], adress_width)
+
+def test_decode_napot_rules():
+    _, adress_width = field_widths(MEM_DEPTH, MEM_WIDTH, "napot")
+    # ID 1, write rule on the region [8,16) : base 8 shifted left by one, 3 trailing ones
+    rules = decode_rules([(1 << 3 | 0b010) << (adress_width+1) | 8 << 1 | 0b111], MEM_DEPTH, MEM_WIDTH, "napot")
+    assert [rules[name].tolist() for name in ("id", "rwx", "addr_min", "addr_max")] == [[1], [0b010], [8], [16]]
+    assert evaluate(rules, [1, 1, 1], [0b010, 0b010, 0b010], [7, 8, 15], [7, 15, 16]).tolist() == [False, True, False]
+
+def test_interval_index_keeps_the_reach_of_each_start():
+    rules = {"id": np.array([1, 1, 1, 1]), "rwx": np.array([0b010, 0b010, 0b010, 0b010]),
+             "addr_min": np.array([10, 0, 5, 7]), "addr_max": np.array([20, 8, 6, 7])}
+    starts, ends = build_interval_index(rules)[(1, 0b010)]
+    # the empty range [7,7) is dropped, [5,6) does not reach past [0,8)
+    assert starts.tolist() == [0, 5, 10] and ends.tolist() == [8, 8, 20]
+
+@pytest.mark.parametrize("seed", range(5))
+def test_evaluate_index_matches_evaluate(seed):
+    rng = np.random.default_rng(seed)
+    rules = random_rules(rng)
+    mid, rwx, addr, addr_last = random_bursts(rng)
+    assert np.array_equal(evaluate_index(build_interval_index(rules), mid, rwx, addr, addr_last), evaluate(rules, mid, rwx, addr, addr_last))
+
+@pytest.mark.parametrize("seed", range(5))
+def test_evaluate_bitmap_matches_evaluate(seed):
+    rng = np.random.default_rng(seed)
+    rules = random_rules(rng)
+    mid, rwx, addr, addr_last = random_bursts(rng)
+    bitmap = build_permission_bitmap(rules, MEM_DEPTH, MEM_WIDTH)
+    assert np.array_equal(evaluate_bitmap(bitmap, mid, rwx, addr, MEM_DEPTH, MEM_WIDTH, addr_last), evaluate(rules, mid, rwx, addr, addr_last))
+    assert np.array_equal(evaluate_bitmap(bitmap, mid, rwx, addr, MEM_DEPTH, MEM_WIDTH), evaluate(rules, mid, rwx, addr))
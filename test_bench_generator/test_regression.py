@@ -0,0 +1,62 @@
+import os
+import subprocess
+
+import pytest
+
+import regression
+from test_bench_generator import RESULTS_FILE, RESULTS_HEADER
+
+HERE : str = os.path.dirname(os.path.abspath(__file__))
+
+def fake_ghdl(monkeypatch, returncode : int = 0, stderr : str = "", tests = range(0), failed = ()):
+    # ghdl stand-in : -a and -e succeed, -r writes the log and the results records of the given tests
+    def run(command, cwd, capture_output, text):
+        if command[1] == "-r":
+            with open(os.path.join(cwd, "test_bench.log"), 'w') as f:
+                f.writelines(f"ERROR : test number {test} FAILED \n" for test in failed)
+            with open(os.path.join(cwd, RESULTS_FILE), 'w') as f:
+                f.write(RESULTS_HEADER + "\n")
+                f.writelines(f"{test},0,1,0,2,0,0,1,1,{0 if test in failed else 1},10,11,11\n" for test in tests)
+            return subprocess.CompletedProcess(command, returncode, "", stderr)
+        return subprocess.CompletedProcess(command, 0, "", "")
+    monkeypatch.setattr(regression.subprocess, "run", run)
+
+def shard(tmp_path):
+    # the whole request file in one shard, from test number 1
+    [(shard_dir, _, count)] = regression.split_requests(os.path.join(HERE, "request.txt"), 1, str(tmp_path))
+    return shard_dir, count
+
+def run(shard_dir : str, count : int):
+    return regression.run_shard(shard_dir, 1, count, 8, 16, os.path.join(HERE, "memory_configuration.txt"), os.path.join(HERE, ".."),
+                                1, 0, False)
+
+def test_passed_when_every_test_has_a_result(tmp_path, monkeypatch):
+    shard_dir, count = shard(tmp_path)
+    fake_ghdl(monkeypatch, tests=range(1, count + 1))
+    result = run(shard_dir, count)
+    assert result["error"] is None and result["failed"] == []
+
+def test_stop_time_exit_is_not_an_error(tmp_path, monkeypatch):
+    shard_dir, count = shard(tmp_path)
+    fake_ghdl(monkeypatch, returncode=1, stderr=f"ghdl:info: {regression.STOP_TIME_MESSAGE} @1000us", tests=range(1, count + 1), failed=(2,))
+    result = run(shard_dir, count)
+    assert result["error"] is None and result["failed"] == [2]
+
+def test_crashed_simulation_is_an_error(tmp_path, monkeypatch):
+    shard_dir, count = shard(tmp_path)
+    fake_ghdl(monkeypatch, returncode=1, stderr="cannot open file \"vectors.txt\"", tests=range(1, count + 1))
+    assert "vectors.txt" in run(shard_dir, count)["error"]
+
+@pytest.mark.parametrize("recorded", [0, 1])
+def test_missing_results_are_an_error(tmp_path, monkeypatch, recorded):
+    # a simulation ending before its last vector, e.g. on --stop-time, without any FAILED line in its log
+    shard_dir, count = shard(tmp_path)
+    fake_ghdl(monkeypatch, stderr=regression.STOP_TIME_MESSAGE, tests=range(1, recorded + 1))
+    assert run(shard_dir, count)["error"] == f"{count - recorded} of {count} tests have no result, from test number {recorded + 1}"
+
+def test_missing_ghdl_is_an_error(tmp_path, monkeypatch):
+    shard_dir, count = shard(tmp_path)
+    def run_missing(command, cwd, capture_output, text):
+        raise FileNotFoundError(command[0])
+    monkeypatch.setattr(regression.subprocess, "run", run_missing)
+    assert run(shard_dir, count)["error"] == f"{regression.GHDL} not found"
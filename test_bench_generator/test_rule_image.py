@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from rule_image import IMAGE_EXTENSIONS, INIT_EXTENSION, load_rule_image, rule_words, init_image, write_rule_image
+
+HERE : str = os.path.dirname(os.path.abspath(__file__))
+MEM_DEPTH : int = 8
+
+@pytest.mark.parametrize("MEM_WIDTH, words", [(16, [0x081F, 0x907C, 0x347E]), (40, [0x12_3456_789A, 0xFF_FFFF_FFFF, 0])])
+@pytest.mark.parametrize("extension", (".txt",) + IMAGE_EXTENSIONS)
+def test_round_trip(tmp_path, MEM_WIDTH, words, extension):
+    path = str(tmp_path / f"rules{extension}")
+    write_rule_image(path, words, MEM_DEPTH, MEM_WIDTH)
+    # the .init image holds every memory cell, the cells without a rule are zeros
+    expected = words + [0]*(MEM_DEPTH - len(words)) if extension == INIT_EXTENSION else words
+    assert load_rule_image(path, MEM_DEPTH, MEM_WIDTH).tolist() == expected
+
+def test_default_memory_configuration():
+    words = rule_words(os.path.join(HERE, "memory_configuration.txt"), MEM_DEPTH, 16)
+    assert words.tolist() == [0x081F, 0x907C, 0x347E]
+
+def test_init_image():
+    assert init_image([0b1010, 0b0001], 3, 4) == b"1010\n0001\n0000\n"
+
+def test_words_in_memory_are_masked():
+    assert rule_words([0x1081F], MEM_DEPTH, 16).tolist() == [0x081F]
+
+def test_too_many_rules(tmp_path):
+    path = str(tmp_path / "rules.npy")
+    write_rule_image(path, list(range(MEM_DEPTH + 1)), MEM_DEPTH + 1, 16)
+    with pytest.raises(ValueError):
+        load_rule_image(path, MEM_DEPTH, 16)
+    with pytest.raises(ValueError):
+        rule_words(list(range(MEM_DEPTH + 1)), MEM_DEPTH, 16)
+
+def test_binary_image_of_another_width(tmp_path):
+    path = str(tmp_path / "rules.bin")
+    write_rule_image(path, [0x081F], MEM_DEPTH, 16)
+    with pytest.raises(ValueError):
+        load_rule_image(path, MEM_DEPTH, 32)
@@ -0,0 +1,39 @@
+import numpy as np
+
+from reference_model import field_widths, decode_rules
+from rule_optimizer import minimize_rules, encode_rules, prove_equivalence
+
+MEM_DEPTH : int = 8
+MEM_WIDTH : int = 16
+
+def decoded(rules):
+    # decoded rule table from (ID, rwx, addr_min, addr_max) tuples
+    columns = list(zip(*rules))
+    return {name: np.array(column, dtype=np.int64) for name, column in zip(("id", "rwx", "addr_min", "addr_max"), columns)}
+
+# one (ID, rwx) pair with overlapping, abutting and shadowed ranges, an empty range and a rule that can not match
+RULES : list = [(1, 0b010, 0, 10), (1, 0b010, 5, 8), (1, 0b010, 10, 20), (1, 0b010, 3, 15),
+                (1, 0b100, 4, 6), (1, 0b100, 6, 6), (2, 0b110, 0, 30)]
+
+def test_merges_overlapping_and_abutting_ranges():
+    assert minimize_rules(decoded(RULES)) == [(1, 0b010, 0, 20), (1, 0b100, 4, 6)]
+
+def test_keep_bursts_only_drops_shadowed_ranges():
+    assert minimize_rules(decoded(RULES), keep_bursts=True) == [(1, 0b010, 0, 10), (1, 0b010, 3, 15), (1, 0b010, 10, 20), (1, 0b100, 4, 6)]
+
+def test_minimized_rules_are_equivalent():
+    ID_width, adress_width = field_widths(MEM_DEPTH, MEM_WIDTH)
+    original = decoded(RULES)
+    for keep_bursts in (False, True):
+        minimized = minimize_rules(original, keep_bursts)
+        words = encode_rules(minimized, MEM_DEPTH, MEM_WIDTH)
+        differences, checked = prove_equivalence(original, decode_rules(words, MEM_DEPTH, MEM_WIDTH), ID_width, adress_width, keep_bursts)
+        assert checked > 0 and differences == []
+
+def test_merged_ranges_change_bursts_across_rules():
+    # the write burst from 0 to 19 spans [0,10) and [10,20) : denied by the original rules, allowed once they are merged
+    ID_width, adress_width = field_widths(MEM_DEPTH, MEM_WIDTH)
+    original = decoded([(1, 0b010, 0, 10), (1, 0b010, 10, 20)])
+    minimized = decode_rules(encode_rules(minimize_rules(original), MEM_DEPTH, MEM_WIDTH), MEM_DEPTH, MEM_WIDTH)
+    differences, _ = prove_equivalence(original, minimized, ID_width, adress_width, bursts=True)
+    assert (1, 0b000, 0, 19, False) in differences
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+from test_bench_generator import TEST_BENCH_FILE, render_test_bench, axi_transactions, wrapper_timing
+from manifest import MANIFEST_FILE
+
+HERE : str = os.path.dirname(os.path.abspath(__file__))
+# wrapper.py is one directory up, like for benchmark.py
+sys.path.insert(0, os.path.dirname(HERE))
+from wrapper import generate_vhdl
+
+MEMORY_FILE : str = os.path.join(HERE, "memory_configuration.txt")
+
+# an allowed and a denied write burst then an allowed and a denied read burst, see memory_configuration.txt
+REQUESTS : list = ["0 2 00 1 1E 0 1", "0 2 00 0 1F 0 1", "4 4 03 1 18 0 1", "4 4 03 0 19 0 1"]
+
+def test_axi_transactions():
+    assert axi_transactions(REQUESTS, 3, 5, 16, first_test=7) == [
+        (7, 0, 0, 0, 0, 0, 0x1E, 0, 1, 1, 7), (8, 0, 0, 0, 0, 0, 0x1F, 0, 1, 0, 8),
+        (9, 1, 4, 4, 0, 3, 0x18, 0, 1, 1, 9), (10, 1, 4, 4, 0, 3, 0x19, 0, 1, 0, 10)]
+
+def test_axi_test_bench_drives_the_axi_channels():
+    test_bench = render_test_bench(8, 16, MEMORY_FILE, REQUESTS, axi=True)[TEST_BENCH_FILE]
+    assert "constant TRANSACTIONS : TransactionArrayType(0 to 3)" in test_bench
+    assert "M_AXI_AWVALID => M_AXI_AWVALID" in test_bench and "C_DENY_RESP => DENY_RESP" in test_bench
+    for process in ("write_data_process", "write_response_checker", "read_data_checker", "write_slave_model", "read_slave_model"):
+        assert f"{process} : process" in test_bench
+
+def test_default_test_bench_leaves_m_axi_open():
+    test_bench = render_test_bench(8, 16, MEMORY_FILE, REQUESTS)[TEST_BENCH_FILE]
+    assert "M_AXI" not in test_bench and "simulation_done" not in test_bench
+
+@pytest.mark.parametrize("options", [{"stream": True}, {"vector_file": "vectors.txt"}])
+def test_axi_test_bench_takes_the_requests_from_its_table(options):
+    with pytest.raises(ValueError):
+        render_test_bench(8, 16, MEMORY_FILE, REQUESTS, axi=True, **options)
+
+@pytest.mark.parametrize("options, timing", [({"pipeline_stages": 3}, (3, 0)), ({"arch": "bram", "rules_per_cycle": 2}, (8, 0)),
+                                             ({"arch": "bitmap"}, (1, 8*(2*2**5+2)))])
+def test_wrapper_timing_of_the_generated_design(tmp_path, options, timing):
+    generate_vhdl(8, 16, output_dir=str(tmp_path), **options)
+    assert wrapper_timing(str(tmp_path / MANIFEST_FILE)) == timing
+
+def test_wrapper_timing_without_design(tmp_path):
+    with pytest.raises(ValueError):
+        wrapper_timing(str(tmp_path / MANIFEST_FILE))
@@ -0,0 +1,57 @@
+import gzip
+
+import pytest
+
+from vcd_checker import RuleReplay, check_dump
+
+SIGNALS : dict = {"s_axi_aclk": 1, "s_axi_aresetn": 1, "w_rule_enable": 1, "rule_number": 3, "data_rule": 16, "x_enable": 1,
+                  "mid_w": 3, "s_axi_awaddr": 5, "mid_r": 3, "s_axi_araddr": 5, "wrapper_write_response": 1, "wrapper_read_response": 1}
+
+# inputs and responses sampled at each rising edge : reset, the rule 081F (ID 0 writes to [0,31)) written, then two requests
+# per lane answered one edge later, the write response to the second one being wrong
+CYCLES : list = [
+    {"s_axi_aresetn": 0, "w_rule_enable": 0},
+    {"s_axi_aresetn": 1, "w_rule_enable": 1, "rule_number": 0, "data_rule": 0x081F},
+    {"w_rule_enable": 0, "x_enable": 0, "mid_w": 0, "s_axi_awaddr": 12, "mid_r": 4, "s_axi_araddr": 12,
+     "wrapper_write_response": 0, "wrapper_read_response": 0},
+    {"s_axi_awaddr": 31, "wrapper_write_response": 1},
+    {},
+]
+
+def write_dump(path : str, cycles : list, scope : str = "generated_tb"):
+    # one identifier code per signal, the inputs change with the falling edge and the clock rises half a period later
+    codes = {name: chr(ord('!') + i) for i, name in enumerate(SIGNALS)}
+    lines = ["$timescale 1 fs $end", f"$scope module {scope} $end"]
+    lines += [f"$var reg {width} {codes[name]} {name}{f' [{width-1}:0]' if width > 1 else ''} $end" for name, width in SIGNALS.items()]
+    lines += ["$upscope $end", "$enddefinitions $end"]
+    for k, changes in enumerate(cycles):
+        lines.append(f"#{10*k}")
+        for name, value in dict(changes, s_axi_aclk=0).items():
+            lines.append(f"b{value:0{SIGNALS[name]}b} {codes[name]}" if SIGNALS[name] > 1 else f"{value}{codes[name]}")
+        lines += [f"#{10*k + 5}", f"1{codes['s_axi_aclk']}"]
+    lines.append(f"#{10*len(cycles)}")
+    with (gzip.open(path, 'wt') if path.endswith(".gz") else open(path, 'w')) as f:
+        f.write("\n".join(lines) + "\n")
+
+@pytest.mark.parametrize("name", ["dump.vcd", "dump.vcd.gz"])
+def test_responses_checked_against_the_replayed_rules(tmp_path, name):
+    path = str(tmp_path / name)
+    write_dump(path, CYCLES)
+    reports = []
+    stats = check_dump(path, RuleReplay(8, 16), report=reports.append)
+    assert stats == {"edges": 5, "checks": 4, "mismatches": 1}
+    assert reports == ["#45: write response 1 but the reference model expects 0"]
+
+def test_responses_checked_latency_edges_later(tmp_path):
+    # with two cycles of latency the write response 1 answers the request to address 12 and the wrong one comes an edge later
+    path = str(tmp_path / "dump.vcd")
+    write_dump(path, CYCLES + [{}])
+    reports = []
+    assert check_dump(path, RuleReplay(8, 16), latency=2, report=reports.append) == {"edges": 6, "checks": 4, "mismatches": 1}
+    assert reports == ["#55: write response 1 but the reference model expects 0"]
+
+def test_dump_without_the_test_bench_scope(tmp_path):
+    path = str(tmp_path / "dump.vcd")
+    write_dump(path, CYCLES, scope="other_tb")
+    with pytest.raises(ValueError):
+        check_dump(path, RuleReplay(8, 16))
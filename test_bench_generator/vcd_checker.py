@@ -0,0 +1,192 @@
+import sys
+import gzip
+import argparse
+
+import numpy as np
+
+from reference_model import MEM_DEPTH, MEM_WIDTH, ENCODINGS, field_widths, decode_rules, burst_footprint, evaluate
+from rule_image import load_rule_image
+
+# test bench signals followed in the dump, every other signal is skipped without being decoded
+CLOCK : str = "s_axi_aclk"
+RESET : str = "s_axi_aresetn"
+FOLLOWED : tuple = (CLOCK, RESET, "w_rule_enable", "rule_number", "data_rule", "bank_swap", "x_enable",
+                    "mid_w", "s_axi_awaddr", "s_axi_awlen", "s_axi_awsize", "s_axi_awburst",
+                    "mid_r", "s_axi_araddr", "s_axi_arlen", "s_axi_arsize", "s_axi_arburst",
+                    "wrapper_write_response", "wrapper_read_response")
+
+# cached decisions, cleared when the rules change or when the cache is full
+DECISION_CACHE_SIZE : int = 1 << 16
+
+def open_dump(path : str):
+    # ghdl --vcdgz writes gzip compressed dumps, read as a stream like the plain ones
+    return gzip.open(path, 'rt') if path.endswith(".gz") else open(path, 'r')
+
+def value_of(text : str):
+    # integer value of a scalar or vector, None while it holds U, X, Z, '-' or any other non binary digit
+    try:
+        return int(text, 2)
+    except ValueError:
+        return None
+
+class RuleReplay:
+    """Rules array and decisions rebuilt from the rule writes seen at the clock edges.
+
+    rule_number is used as the cell index, which also covers the per-MID banks: a rule is placed in the bank of its ID.
+    With a shadow bank the writes go to the shadow cells and bank_swap copies them into the active ones.
+    """
+
+    def __init__(self, MEM_DEPTH : int, MEM_WIDTH : int, initial_words = (), shadow_bank : bool = False, encoding : str = "range"):
+        self.MEM_DEPTH = MEM_DEPTH
+        self.MEM_WIDTH = MEM_WIDTH
+        self.shadow_bank = shadow_bank
+        self.encoding = encoding
+        self.adress_width = field_widths(MEM_DEPTH, MEM_WIDTH, encoding)[1]
+        self.initial = dict(enumerate(int(word) for word in initial_words))
+        self.reset()
+
+    def reset(self):
+        self.active = dict(self.initial)
+        self.shadow = dict(self.initial)
+        self.changed()
+
+    def changed(self):
+        words = list(self.active.values())
+        self.rules = decode_rules(np.array(words, dtype=np.uint64), self.MEM_DEPTH, self.MEM_WIDTH, self.encoding)
+        self.decisions = {}
+
+    def write(self, rule_number : int, word : int, swap : bool):
+        if not self.shadow_bank:
+            self.active[rule_number] = word
+            self.changed()
+            return
+        self.shadow[rule_number] = word
+        if swap:
+            self.active = dict(self.shadow)
+            self.changed()
+
+    def swap(self):
+        self.active = dict(self.shadow)
+        self.changed()
+
+    def decide(self, lane : int, mid : int, x : int, addr : int, length : int, size : int, burst : int):
+        # the footprint and the evaluation only run for requests not seen since the last rule change
+        key = (lane, mid, x, addr, length, size, burst)
+        if key not in self.decisions:
+            if len(self.decisions) >= DECISION_CACHE_SIZE:
+                self.decisions = {}
+            first, last, valid = burst_footprint(addr, length, size, burst, self.adress_width)
+            self.decisions[key] = bool(valid) and bool(evaluate(self.rules, [mid], [lane << 2 | x], [int(first)], [int(last)])[0])
+        return self.decisions[key]
+
+def check_dump(path : str, replay : RuleReplay, latency : int = 1, scope : str = "generated_tb", report = None, max_reports : int = 20):
+    """Stream a VCD dump and compare both wrapper responses with the reference model at every rising clock edge.
+
+    The values sampled just before an edge are the inputs of that edge and the responses to the requests
+    sampled latency edges earlier. Edges with unknown inputs, in reset or while a rule is written (the
+    responses are forced to '0') are not checked. Memory stays constant whatever the size of the dump.
+    """
+    codes : dict = {}
+    values : dict = {name: None for name in FOLLOWED}
+    pending : dict = {}
+    # expected responses of the last latency edges, oldest first
+    expected : list = [None] * latency
+    stats = {"edges": 0, "checks": 0, "mismatches": 0}
+    time : int = 0
+
+    def lane_decision(lane : int):
+        prefix = "r" if lane else "w"
+        mid, addr, x = values[f"mid_{prefix}"], values[f"s_axi_a{prefix}addr"], values["x_enable"]
+        length, size, burst = values[f"s_axi_a{prefix}len"], values[f"s_axi_a{prefix}size"], values[f"s_axi_a{prefix}burst"]
+        if None in (mid, addr, x):
+            return None
+        # a test bench that never drives a burst field leaves it out of the dump : a single INCR beat
+        return replay.decide(lane, mid, x, addr, length or 0, size or 0, 1 if burst is None else burst)
+
+    def rising_edge():
+        stats["edges"] += 1
+        # responses produced by the edge latency edges ago
+        for lane, name in ((0, "wrapper_write_response"), (1, "wrapper_read_response")):
+            want = expected[0][lane] if expected[0] is not None else None
+            got = values[name]
+            if want is None or got is None:
+                continue
+            stats["checks"] += 1
+            if bool(got) != want:
+                stats["mismatches"] += 1
+                if report is not None and stats["mismatches"] <= max_reports:
+                    report(f"#{time}: {'read' if lane else 'write'} response {got} but the reference model expects {int(want)}")
+        blocked = values[RESET] != 1 or (values["w_rule_enable"] == 1 and not replay.shadow_bank)
+        expected.pop(0)
+        expected.append(None if blocked else (lane_decision(0), lane_decision(1)))
+        # state updated by this edge
+        if values[RESET] == 0:
+            replay.reset()
+        elif values["w_rule_enable"] == 1 and values["rule_number"] is not None and values["data_rule"] is not None:
+            replay.write(values["rule_number"], values["data_rule"], values["bank_swap"] == 1)
+        elif values["bank_swap"] == 1 and replay.shadow_bank:
+            replay.swap()
+
+    def apply_pending():
+        if CLOCK in pending and values[CLOCK] == 0 and pending[CLOCK] == 1:
+            rising_edge()
+        values.update(pending)
+        pending.clear()
+
+    with open_dump(path) as dump:
+        # header : codes of the followed signals of the test bench scope
+        scopes : list = []
+        for line in dump:
+            tokens = line.split()
+            if not tokens:
+                continue
+            if tokens[0] == "$scope":
+                scopes.append(tokens[2].lower())
+            elif tokens[0] == "$upscope":
+                scopes.pop()
+            elif tokens[0] == "$var" and scopes == [scope.lower()] and tokens[4].split('[')[0].lower() in values:
+                codes[tokens[3]] = tokens[4].split('[')[0].lower()
+            elif tokens[0] == "$enddefinitions":
+                break
+        if not codes:
+            raise ValueError(f"{path} has none of the test bench signals in the scope {scope}")
+
+        for line in dump:
+            head = line[:1]
+            if head == "#":
+                apply_pending()
+                time = int(line[1:])
+            elif head == "b" or head == "B":
+                bits, code = line[1:].split()
+                if code in codes:
+                    pending[codes[code]] = value_of(bits)
+            elif head in "01xXzZuUwWlLhH-":
+                code = line[1:].strip()
+                if code in codes:
+                    pending[codes[code]] = value_of(head)
+        apply_pending()
+    return stats
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Check the wrapper responses of a VCD dump of the generated test bench against the reference model, without a waveform viewer.')
+    parser.add_argument('dump', help='VCD file written by ghdl --vcd, or .gz written by ghdl --vcdgz (GHW files are not supported, their format is not documented)')
+    parser.add_argument('--mem_depth','-d', type=int, default= MEM_DEPTH, required=False, help='Memory depth (number of memory cells)')
+    parser.add_argument('--mem_width','-w', type=int, default= MEM_WIDTH, required=False, help='Memory width (width of each memory cell)')
+    parser.add_argument('--latency','-l', type=int, default= 1, required=False, help='Response latency of the wrapper in clock cycles (its number of pipeline stages)')
+    parser.add_argument('--shadow_bank', action='store_true', help='Design generated with --shadow_bank')
+    parser.add_argument('--encoding','-e', choices=ENCODINGS, default='range', help='Design generated with --encoding: range or NAPOT address field of the rules')
+    parser.add_argument('--preloaded', default=None, help='Rule image preloaded at elaboration, the rules.init written by test_bench_generator.py --preload')
+    parser.add_argument('--scope', default="generated_tb", help='Scope of the test bench signals in the dump')
+    parser.add_argument('--max_reports', type=int, default=20, help='Number of mismatches printed')
+
+    args = parser.parse_args()
+
+    # one word per rules_array cell, partitioned banks included
+    initial = load_rule_image(args.preloaded, sys.maxsize, args.mem_width) if args.preloaded else ()
+    replay = RuleReplay(args.mem_depth, args.mem_width, initial, args.shadow_bank, args.encoding)
+    stats = check_dump(args.dump, replay, args.latency, args.scope, print, args.max_reports)
+    print(f"{stats['edges']} clock edges, {stats['checks']} responses checked, {stats['mismatches']} mismatches")
+    if stats["mismatches"]:
+        sys.exit(1)
@@ -0,0 +1,118 @@
+import argparse
+
+import numpy as np
+
+from reference_model import MEM_DEPTH, MEM_WIDTH, ENCODINGS, rwx_width, BURST_INCR, field_widths, load_rules, decode_rules, request_key, burst_footprint, evaluate, write_requests
+
+# boundaries of a rule : addr_min-1, addr_min, addr_max-1 and addr_max, the wrapper checks addr >= addr_min and addr < addr_max
+BOUNDARIES : list = ["addr_min-1", "addr_min", "addr_max-1", "addr_max"]
+
+def boundary_addresses(rules, adress_width : int):
+    # (rules, 4) array of the boundary addresses of each rule, -1 where the boundary is outside the address space
+    addresses = np.stack([rules["addr_min"] - 1, rules["addr_min"], rules["addr_max"] - 1, rules["addr_max"]], axis=1)
+    return np.where((addresses >= 0) & (addresses < 2**adress_width), addresses, -1)
+
+def directed_requests(rules, MEM_DEPTH : int, MEM_WIDTH : int, encoding : str = "range"):
+    """Every boundary address of every rule crossed with every MID and every rwx value (lane and x_enable)."""
+    ID_width, adress_width = field_widths(MEM_DEPTH, MEM_WIDTH, encoding)
+    addresses = np.unique(boundary_addresses(rules, adress_width))
+    addresses = addresses[addresses >= 0]
+    mid, rwx, addr = np.meshgrid(np.arange(2**ID_width), np.arange(2**rwx_width), addresses, indexing='ij')
+    return mid.ravel(), rwx.ravel(), addr.ravel()
+
+def random_requests(count : int, MEM_DEPTH : int, MEM_WIDTH : int, rng, encoding : str = "range"):
+    ID_width, adress_width = field_widths(MEM_DEPTH, MEM_WIDTH, encoding)
+    return (rng.integers(0, 2**ID_width, count), rng.integers(0, 2**rwx_width, count), rng.integers(0, 2**adress_width, count))
+
+def directed_bursts(rules, MEM_DEPTH : int, MEM_WIDTH : int, encoding : str = "range"):
+    """INCR bursts of one byte beats around every matchable rule : exactly its range, one address past addr_max-1 and one before addr_min."""
+    _, adress_width = field_widths(MEM_DEPTH, MEM_WIDTH, encoding)
+    mid, rwx, addr, length = [], [], [], []
+    for field_id, field_rwx, field_addr_min, field_addr_max in zip(rules["id"].tolist(), rules["rwx"].tolist(), rules["addr_min"].tolist(), rules["addr_max"].tolist()):
+        if field_rwx >> 1 not in (0b01, 0b10) or field_addr_min >= field_addr_max:
+            continue
+        for first, last in ((field_addr_min, field_addr_max - 1), (field_addr_min, field_addr_max), (field_addr_min - 1, field_addr_max - 1)):
+            if 0 <= first <= last < 2**adress_width and last - first <= 0xFF:
+                mid.append(field_id)
+                rwx.append(field_rwx)
+                addr.append(first)
+                length.append(last - first)
+    count : int = len(mid)
+    return (np.array(mid, dtype=np.int64), np.array(rwx, dtype=np.int64), np.array(addr, dtype=np.int64),
+            np.array(length, dtype=np.int64), np.zeros(count, dtype=np.int64), np.full(count, BURST_INCR, dtype=np.int64))
+
+def random_bursts(count : int, MEM_DEPTH : int, MEM_WIDTH : int, rng, encoding : str = "range"):
+    # FIXED, INCR and WRAP bursts of up to 16 beats of up to 4 bytes, WRAP lengths restricted to 2, 4, 8 or 16 beats
+    mid, rwx, addr = random_requests(count, MEM_DEPTH, MEM_WIDTH, rng, encoding)
+    burst = rng.integers(0, 3, count)
+    length = np.where(burst == 2, rng.choice([1, 3, 7, 15], count), rng.integers(0, 16, count))
+    return mid, rwx, addr, length, rng.integers(0, 3, count), burst
+
+def coverage(rules, mid, rwx, addr, MEM_DEPTH : int, MEM_WIDTH : int, encoding : str = "range"):
+    """Per rule : number of requests it matches and, for each boundary, whether a request of its MID and rwx hit it."""
+    _, adress_width = field_widths(MEM_DEPTH, MEM_WIDTH, encoding)
+    key = request_key(rwx)
+    boundaries = boundary_addresses(rules, adress_width)
+    summary = []
+    for rule, (field_id, field_rwx, field_addr_min, field_addr_max) in enumerate(zip(rules["id"].tolist(), rules["rwx"].tolist(), rules["addr_min"].tolist(), rules["addr_max"].tolist())):
+        same_key = (mid == field_id) & (key == field_rwx)
+        addresses = np.unique(addr[same_key])
+        summary.append({
+            "rule": rule,
+            "can_match": field_rwx >> 1 in (0b01, 0b10) and field_addr_min < field_addr_max,
+            "matches": int(np.count_nonzero(same_key & (addr >= field_addr_min) & (addr < field_addr_max))),
+            "boundaries": {name: bool(boundary >= 0 and np.isin(boundary, addresses)) for name, boundary in zip(BOUNDARIES, boundaries[rule].tolist())},
+        })
+    return summary
+
+def write_coverage(f, summary):
+    f.write(f"{'rule':>6} {'matches':>10} " + " ".join(f"{name:>10}" for name in BOUNDARIES) + "\n")
+    for entry in summary:
+        boundaries = " ".join(f"{('hit' if hit else '-'):>10}" for hit in entry["boundaries"].values())
+        note = "" if entry["can_match"] else "  (never matches: rwx not 01x/10x or empty range)"
+        f.write(f"{entry['rule']:>6} {entry['matches']:>10} {boundaries}{note}\n")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Generate boundary-directed and random requests with expected responses from the reference model.')
+    parser.add_argument('--mem_depth','-d', type=int, default= MEM_DEPTH, required=False, help='Memory depth (number of memory cells)')
+    parser.add_argument('--mem_width','-w', type=int, default= MEM_WIDTH, required=False, help='Memory width (width of each memory cell)')
+    parser.add_argument('--encoding','-e', choices=ENCODINGS, default='range', help='Address field of the rules: addr_min/addr_max range or NAPOT region')
+    parser.add_argument('--rules', default="memory_configuration.txt", help='Memory configuration file')
+    parser.add_argument('--random','-n', type=int, default=0, help='Number of uniformly random requests added to the directed ones')
+    parser.add_argument('--no_directed', action='store_true', help='Only generate the random requests')
+    parser.add_argument('--bursts', action='store_true', help='Also generate directed bursts around each rule and make the random requests AXI bursts')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random requests')
+    parser.add_argument('--output','-o', default="request.txt", help='Request file written')
+    parser.add_argument('--coverage', default=None, help='Also write the per rule coverage summary to this file')
+
+    args = parser.parse_args()
+
+    rules = decode_rules(load_rules(args.rules, args.mem_depth, args.mem_width), args.mem_depth, args.mem_width, args.encoding)
+    rng = np.random.default_rng(args.seed)
+
+    def single_beats(mid, rwx, addr):
+        return mid, rwx, addr, np.zeros(len(mid), dtype=np.int64), np.zeros(len(mid), dtype=np.int64), np.full(len(mid), BURST_INCR, dtype=np.int64)
+
+    parts = [] if args.no_directed else [single_beats(*directed_requests(rules, args.mem_depth, args.mem_width, args.encoding))]
+    if args.bursts and not args.no_directed:
+        parts.append(directed_bursts(rules, args.mem_depth, args.mem_width, args.encoding))
+    if args.random:
+        parts.append(random_bursts(args.random, args.mem_depth, args.mem_width, rng, args.encoding) if args.bursts
+                     else single_beats(*random_requests(args.random, args.mem_depth, args.mem_width, rng, args.encoding)))
+    if not parts:
+        parser.error("nothing to generate, use --random with --no_directed")
+    mid, rwx, addr, length, size, burst = (np.concatenate(column) for column in zip(*parts))
+    first, last, valid = burst_footprint(addr, length, size, burst, field_widths(args.mem_depth, args.mem_width, args.encoding)[1])
+    expected = evaluate(rules, mid, rwx, first, last) & valid
+
+    write_requests(args.output, {"mid": mid, "rwx": rwx, "addr": addr, "len": length, "size": size, "burst": burst}, expected, args.mem_depth, args.mem_width, args.encoding)
+    print(f"{len(mid)} requests written to {args.output}, {int(expected.sum())} expected to be allowed")
+
+    summary = coverage(rules, mid, rwx, addr, args.mem_depth, args.mem_width, args.encoding)
+    if args.coverage:
+        with open(args.coverage, 'w') as f:
+            write_coverage(f, summary)
+    covered : int = sum(all(entry["boundaries"][name] for name in ("addr_min", "addr_max-1", "addr_max")) for entry in summary if entry["can_match"])
+    print(f"{covered}/{sum(entry['can_match'] for entry in summary)} matchable rules with addr_min, addr_max-1 and addr_max exercised")
@@ -1,15 +1,1900 @@
+import os
+import sys
 import math
 import argparse
 
+# python helpers shared with the test bench generator (reference model, rule file parsing)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_bench_generator"))
+
+from manifest import MANIFEST_FILE, write_if_changed, record
+
+# python sources the VHDL depends on (the interval architecture compiles the rules with the reference model),
+# keyed in the manifest by absolute path so that the working directory does not matter
+GENERATOR_SOURCES : list = [os.path.abspath(__file__)] + [os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_bench_generator", name)
+                                                          for name in ("rule_image.py", "reference_model.py")]
+
 
 MEM_DEPTH : int = 8
 MEM_WIDTH : int = 16
 
-def generate_vhdl(MEM_DEPTH : int, MEM_WIDTH : int):
+def or_tree_levels(MEM_DEPTH : int, pipeline_stages : int):
+    # sizes of the match vectors after the comparator stage and after each of the pipeline_stages-1 OR-tree levels,
+    # with the smallest fan-in that reduces MEM_DEPTH bits to one in that many levels
+    levels : int = pipeline_stages - 1
+    fan_in : int = 2
+    while fan_in ** levels < MEM_DEPTH:
+        fan_in += 1
+    sizes : list = [MEM_DEPTH]
+    for _ in range(levels):
+        sizes.append(math.ceil(sizes[-1] / fan_in))
+    return fan_in, sizes
+
+# address field of a rule : addr_min & addr_max, or one NAPOT region (naturally aligned power-of-two, RISC-V PMP style)
+ENCODINGS : list = ["range", "napot"]
+
+def rule_adress_width(MEM_WIDTH : int, ID_width : int, encoding : str = "range"):
+    # a range splits the bits left after ID and rwx between addr_min and addr_max, a NAPOT region field is one bit wider than the address
+    if encoding == "napot":
+        return MEM_WIDTH-ID_width-3-1
+    return math.ceil((MEM_WIDTH-ID_width-3)/2)
+
+def address_field_names(encoding : str, suffix : str = ""):
+    # variables holding the address field of the rule being checked
+    if encoding == "napot":
+        return f"field_region{suffix}", f"field_mask{suffix}"
+    return f"field_addr_min{suffix}", f"field_addr_max{suffix}"
+
+def address_field_strings(MEM_WIDTH : int, ID_width : int, adress_width : int, encoding : str, rule : str = "rules_array(i)",
+                          suffix : str = "", indent : str = "                    "):
+    # declarations and slicing of the address field of a rule : its two bounds, or its NAPOT region and the mask
+    # of the region bits, region xor (region+1) covers the trailing ones and the zero above them
+    low : int = MEM_WIDTH-ID_width-3
+    first, second = address_field_names(encoding, suffix)
+    if encoding == "napot":
+        return f"""        variable {first} : std_logic_vector({adress_width} DOWNTO 0);
+        variable {second} : std_logic_vector({adress_width} DOWNTO 0);
+""", f"""{indent}{first} := {rule}({low-1} DOWNTO 0);
+{indent}{second} := {first} XOR std_logic_vector(unsigned({first}) + 1);
+"""
+    return f"""        variable {first} : std_logic_vector( {adress_width - 1} DOWNTO 0);
+        variable {second} : std_logic_vector( {adress_width - 1} DOWNTO 0);
+""", f"""{indent}{first} := {rule}({low-1} DOWNTO {low-adress_width});
+{indent}{second} := {rule}({low-adress_width-1} DOWNTO 0);
+"""
+
+def address_match(addr : str, addr_last : str, encoding : str, suffix : str = ""):
+    # the footprint addr .. addr_last is inside the rule : between its bounds, or both ends equal to the region outside the mask
+    first, second = address_field_names(encoding, suffix)
+    if encoding == "napot":
+        ends : list = [addr] if addr_last == addr else [addr, addr_last]
+        return " AND ".join(f"unsigned((({end} & '0') XOR {first}) AND NOT {second}) = 0" for end in ends)
+    return f"{addr} >= {first} AND {addr_last} < {second}"
+
+def shadow_bank_strings(shadow_bank : bool):
+    # guard of the rule matching and extra rules_array port map : with a shadow bank the rules are written
+    # next to the active bank, which keeps answering, instead of blanking the responses while w_rule_enable is high
+    if shadow_bank:
+        return "TRUE", """,
+        swap => bank_swap"""
+    return "w_rule_enable /= '1'", ""
+
+def pipelined_wrapper_architecture(MEM_DEPTH : int, MEM_WIDTH : int, pipeline_stages : int, wrapper_file_name : str, rules_array_file_name : str, shadow_bank : bool = False,
+                                   encoding : str = "range"):
+
+    ID_width : int = math.ceil(math.log2(MEM_DEPTH))
+    rwx_width : int = 3
+    adress_width : int = rule_adress_width(MEM_WIDTH, ID_width, encoding)
+    address_variables, address_slicing = address_field_strings(MEM_WIDTH, ID_width, adress_width, encoding)
+
+    fan_in, sizes = or_tree_levels(MEM_DEPTH, pipeline_stages)
+    rules_guard, swap_map = shadow_bank_strings(shadow_bank)
+
+    match_signals : str = ""
+    for level, size in enumerate(sizes):
+        match_signals += f"""        signal match_w_{level} : std_logic_vector({size-1} DOWNTO 0) := (others => '0');
+        signal match_r_{level} : std_logic_vector({size-1} DOWNTO 0) := (others => '0');
+"""
+
+    or_tree : str = ""
+    for level in range(1, len(sizes)):
+        or_tree += f"""
+    -- OR-tree level {level} : each bit is the OR of {fan_in} bits of the previous level
+    process (clk)
+        variable res_w : std_logic;
+        variable res_r : std_logic;
+    begin
+        if rising_edge(clk) then
+            for i in 0 to {sizes[level]-1} loop
+                res_w := '0';
+                res_r := '0';
+                for j in i*{fan_in} to i*{fan_in}+{fan_in-1} loop
+                    if j < {sizes[level-1]} then
+                        res_w := res_w OR match_w_{level-1}(j);
+                        res_r := res_r OR match_r_{level-1}(j);
+                    end if;
+                end loop;
+                match_w_{level}(i) <= res_w;
+                match_r_{level}(i) <= res_r;
+            end loop;
+        end if;
+    end process;
+"""
+
+    return f"""-- pipelined rule matching : a registered comparator stage followed by {pipeline_stages-1} registered OR-tree level(s)
+-- one decision per clock cycle, the response to a request comes {pipeline_stages} clock cycles after it is sampled
+architecture {wrapper_file_name}_rtl of {wrapper_file_name} is
+        signal rules_array : MemoryArrayType;
+{match_signals}begin
+
+    -- instance of memory for rules
+    {rules_array_file_name}_inst: entity work.{rules_array_file_name}
+     generic map(
+        INIT_FILE => INIT_FILE
+    )
+     port map(
+        CLK => clk,
+        RESET => reset,
+        rule_number => rule_number,
+        w_enable => w_rule_enable,
+        data_in => data_rule,
+        data_out => rules_array{swap_map}
+    );
+
+    -- comparator stage : one match bit per rule and per request
+    process (clk)
+        variable field_id : std_logic_vector({ID_width-1} DOWNTO 0);
+        variable field_rwx : std_logic_vector({rwx_width-1} DOWNTO 0);
+{address_variables}    begin
+        if rising_edge(clk) then
+            if {rules_guard} then
+                myloop:for i in 0 to {MEM_DEPTH-1} loop
+                    field_id := rules_array(i)({MEM_WIDTH-1} DOWNTO {MEM_WIDTH-ID_width});
+                    field_rwx := rules_array(i)({MEM_WIDTH-ID_width-1} DOWNTO {MEM_WIDTH-ID_width-rwx_width});
+{address_slicing}                    if field_id = MID_W AND field_rwx = ("01" & x_enable) AND {address_match("addr_w", "addr_w_last", encoding)} then
+                        match_w_0(i) <= '1';
+                    else
+                        match_w_0(i) <= '0';
+                    end if;
+                    if field_id = MID_R AND field_rwx = ("10" & x_enable) AND {address_match("addr_r", "addr_r_last", encoding)} then
+                        match_r_0(i) <= '1';
+                    else
+                        match_r_0(i) <= '0';
+                    end if;
+                end loop;
+            else
+                match_w_0 <= (others => '0');
+                match_r_0 <= (others => '0');
+            end if;
+        end if;
+    end process;
+{or_tree}
+    wrapper_write_response <= match_w_{len(sizes)-1}(0);
+    wrapper_read_response <= match_r_{len(sizes)-1}(0);
+
+end architecture;
+"""
+
+def interval_wrapper_architecture(MEM_DEPTH : int, MEM_WIDTH : int, rules_file, wrapper_file_name : str, encoding : str = "range"):
+    from reference_model import decode_rules, build_interval_index
+    from rule_image import rule_words
+
+    ID_width : int = math.ceil(math.log2(MEM_DEPTH))
+    adress_width : int = rule_adress_width(MEM_WIDTH, ID_width, encoding)
+
+    # NAPOT regions are compiled into the intervals they cover
+    index = build_interval_index(decode_rules(rule_words(rules_file, MEM_DEPTH, MEM_WIDTH), MEM_DEPTH, MEM_WIDTH, encoding))
+    source : str = os.path.basename(rules_file) if isinstance(rules_file, (str, os.PathLike)) else "the rules given in memory"
+
+    # one row of the tables per (MID, lane, x_enable) key, rules with another rwx value can never match a request
+    keys : int = 2**(ID_width+2)
+    intervals : list = [([], []) for _ in range(keys)]
+    for (field_id, field_rwx), (starts, ends) in index.items():
+        if field_rwx >> 1 in (0b01, 0b10):
+            intervals[field_id*4 + (field_rwx >> 2)*2 + (field_rwx & 1)] = (starts.tolist(), ends.tolist())
+
+    # rows padded to a power of two with empty intervals starting after the last address
+    row_size : int = 1
+    while row_size < max(len(starts) for starts, _ in intervals):
+        row_size *= 2
+    search_steps : int = int(math.log2(row_size))
+    interval_min : list = []
+    interval_max : list = []
+    for starts, ends in intervals:
+        interval_min += starts + [2**adress_width] * (row_size - len(starts))
+        interval_max += ends + [0] * (row_size - len(ends))
+
+    def table(values):
+        return ",\n            ".join(", ".join(str(v) for v in values[i:i+16]) for i in range(0, len(values), 16))
+
+    return f"""-- static rule set compiled from {source} : the addr_min of the rules of each (MID, rwx) pair are sorted and stored
+-- in ROM with the running maximum of their addr_max, a request is checked with a {search_steps} step binary search of its row
+-- a burst has to fit in one rule, as in the scan architectures
+-- the rules array is not instantiated, w_rule_enable, data_rule, rule_number and INIT_FILE are ignored
+architecture {wrapper_file_name}_rtl of {wrapper_file_name} is
+
+    type IntervalTableType is array (0 to {keys*row_size-1}) of natural;
+
+    constant ROW_SIZE : natural := {row_size};
+    constant INTERVAL_MIN : IntervalTableType := (
+            {table(interval_min)}
+    );
+    constant INTERVAL_MAX : IntervalTableType := (
+            {table(interval_max)}
+    );
+
+    -- key : MID & lane ('0' write, '1' read) & x_enable, the footprint from addr to addr_last must fit in one rule :
+    -- among the rules starting at or before addr, the one ending last has to end after addr_last
+    function lookup(key : std_logic_vector; addr : std_logic_vector; addr_last : std_logic_vector) return std_logic is
+        variable row : natural := to_integer(unsigned(key)) * ROW_SIZE;
+        variable address : natural := to_integer(unsigned(addr));
+        variable address_last : natural := to_integer(unsigned(addr_last));
+        variable position : natural := 0;
+        variable step : natural := ROW_SIZE / 2;
+    begin
+        -- last rule of the row whose addr_min <= address
+        for i in 1 to {search_steps} loop
+            if INTERVAL_MIN(row + position + step) <= address then
+                position := position + step;
+            end if;
+            step := step / 2;
+        end loop;
+        if INTERVAL_MIN(row + position) <= address AND address_last < INTERVAL_MAX(row + position) then
+            return '1';
+        else
+            return '0';
+        end if;
+    end function;
+
+begin
+
+    process (clk)
+    begin
+        if rising_edge(clk) then
+            wrapper_write_response <= lookup(MID_W & '0' & x_enable, addr_w, addr_w_last);
+            wrapper_read_response <= lookup(MID_R & '1' & x_enable, addr_r, addr_r_last);
+        end if;
+    end process;
+
+end architecture;
+"""
+
+def bitmap_wrapper_architecture(MEM_DEPTH : int, MEM_WIDTH : int, wrapper_file_name : str):
+
+    ID_width : int = math.ceil(math.log2(MEM_DEPTH))
+    rwx_width : int = 3
+    adress_width : int = math.ceil((MEM_WIDTH-ID_width-rwx_width)/2)
+    lane_address_width : int = ID_width+1+adress_width
+
+    return f"""-- direct-mapped permission bitmap : one bit plane per rule holding one bit per (MID, lane, x_enable, address),
+-- a decision reads both ends of the burst footprint in every plane and ORs their AND, there are no comparators
+-- each plane is split per lane and kept in one copy per footprint end, so every copy is a simple dual-port RAM
+-- with one write port (the update) and one synchronous read port, which block or distributed RAM inference accepts
+-- a rule written through w_rule_enable/rule_number is marked pending with its latest word and its plane disabled,
+-- the pending planes are then redrawn one after the other : cleared over the range of the rule they hold and set over
+-- the new range, one bit per clock cycle; a rule written again while pending only replaces its word
+-- the rules of INIT_FILE are drawn at elaboration, every plane is then valid; the reset keeps the planes that still
+-- hold their INIT_FILE rule and redraws the others
+architecture {wrapper_file_name}_rtl of {wrapper_file_name} is
+
+    constant LANE_DEPTH : natural := {2**lane_address_width};
+    type PlaneType is array (0 to LANE_DEPTH-1) of std_logic;
+
+    constant INIT_RULES : MemoryArrayType := load_rule_image(INIT_FILE);
+
+    -- bits of one lane of the plane of a rule : MID & x_enable & address
+    function draw_plane(rule : std_logic_vector; lane : std_logic) return PlaneType is
+        variable res : PlaneType := (others => '0');
+        variable field_rwx : std_logic_vector({rwx_width-1} DOWNTO 0);
+        variable key : std_logic_vector({ID_width} DOWNTO 0);
+    begin
+        field_rwx := rule({MEM_WIDTH-ID_width-1} DOWNTO {MEM_WIDTH-ID_width-rwx_width});
+        key := rule({MEM_WIDTH-1} DOWNTO {MEM_WIDTH-ID_width}) & field_rwx(0);
+        if (field_rwx(2 DOWNTO 1) = "01" OR field_rwx(2 DOWNTO 1) = "10") AND field_rwx(2) = lane then
+            for a in to_integer(unsigned(rule({MEM_WIDTH-ID_width-rwx_width-1} DOWNTO {MEM_WIDTH-ID_width-rwx_width-adress_width}))) to
+                     to_integer(unsigned(rule({MEM_WIDTH-ID_width-rwx_width-adress_width-1} DOWNTO 0)))-1 loop
+                res(to_integer(unsigned(key & std_logic_vector(to_unsigned(a, {adress_width}))))) := '1';
+            end loop;
+        end if;
+        return res;
+    end function;
+
+    function planes_valid(file_name : string) return std_logic_vector is
+        variable res : std_logic_vector({MEM_DEPTH-1} DOWNTO 0) := (others => '0');
+    begin
+        if file_name'length > 0 then
+            res := (others => '1');
+        end if;
+        return res;
+    end function;
+
+    constant INIT_VALID : std_logic_vector({MEM_DEPTH-1} DOWNTO 0) := planes_valid(INIT_FILE);
+
+    -- rule drawn in each plane of the bitmap, and planes that are up to date
+    signal plane_rule : MemoryArrayType := INIT_RULES;
+    signal plane_valid : std_logic_vector({MEM_DEPTH-1} DOWNTO 0) := INIT_VALID;
+
+    -- rules written but not drawn yet, with the last word written to each of them
+    signal pending : std_logic_vector({MEM_DEPTH-1} DOWNTO 0) := (others => '0');
+    signal pending_word : MemoryArrayType := INIT_RULES;
+
+    type UpdateStateType is (IDLE, CLEAR_RANGE, SET_RANGE);
+    signal update_state : UpdateStateType := IDLE;
+    signal update_rule : natural range 0 to {MEM_DEPTH-1} := 0;
+    signal update_word : std_logic_vector({MEM_WIDTH-1} DOWNTO 0) := (others => '0');
+    signal update_key : std_logic_vector({ID_width+1} DOWNTO 0) := (others => '0');
+    signal cursor : unsigned({adress_width} DOWNTO 0) := (others => '0');
+    signal cursor_end : unsigned({adress_width} DOWNTO 0) := (others => '0');
+
+    -- bit written in the plane of update_rule this cycle
+    signal update_write : std_logic;
+    signal update_bit : std_logic;
+    signal update_lane : std_logic;
+    signal update_address : natural range 0 to LANE_DEPTH-1;
+
+    signal word_w : std_logic_vector({MEM_DEPTH-1} DOWNTO 0) := (others => '0');
+    signal word_r : std_logic_vector({MEM_DEPTH-1} DOWNTO 0) := (others => '0');
+    signal word_w_last : std_logic_vector({MEM_DEPTH-1} DOWNTO 0) := (others => '0');
+    signal word_r_last : std_logic_vector({MEM_DEPTH-1} DOWNTO 0) := (others => '0');
+    signal valid_w : std_logic_vector({MEM_DEPTH-1} DOWNTO 0) := (others => '0');
+    signal valid_r : std_logic_vector({MEM_DEPTH-1} DOWNTO 0) := (others => '0');
+
+    function any_bit(v : std_logic_vector) return std_logic is
+        variable res : std_logic := '0';
+    begin
+        for i in v'range loop
+            res := res OR v(i);
+        end loop;
+        return res;
+    end function;
+
+begin
+
+    update_write <= '1' when reset = '0' AND (update_state = CLEAR_RANGE OR update_state = SET_RANGE) AND cursor < cursor_end else '0';
+    update_bit <= '1' when update_state = SET_RANGE else '0';
+    update_lane <= update_key(1);
+    update_address <= to_integer(unsigned(update_key({ID_width+1} DOWNTO 2) & update_key(0) & std_logic_vector(cursor({adress_width-1} DOWNTO 0))));
+
+    -- decision : two reads per lane in every plane, a rule contains the footprint when its bit is set at both ends
+    planes : for p in 0 to {MEM_DEPTH-1} generate
+        signal plane_w : PlaneType := draw_plane(INIT_RULES(p), '0');
+        signal plane_w_last : PlaneType := draw_plane(INIT_RULES(p), '0');
+        signal plane_r : PlaneType := draw_plane(INIT_RULES(p), '1');
+        signal plane_r_last : PlaneType := draw_plane(INIT_RULES(p), '1');
+    begin
+        process (clk)
+        begin
+            if rising_edge(clk) then
+                if update_write = '1' AND update_rule = p then
+                    if update_lane = '0' then
+                        plane_w(update_address) <= update_bit;
+                        plane_w_last(update_address) <= update_bit;
+                    else
+                        plane_r(update_address) <= update_bit;
+                        plane_r_last(update_address) <= update_bit;
+                    end if;
+                end if;
+                word_w(p) <= plane_w(to_integer(unsigned(MID_W & x_enable & addr_w)));
+                word_w_last(p) <= plane_w_last(to_integer(unsigned(MID_W & x_enable & addr_w_last)));
+                word_r(p) <= plane_r(to_integer(unsigned(MID_R & x_enable & addr_r)));
+                word_r_last(p) <= plane_r_last(to_integer(unsigned(MID_R & x_enable & addr_r_last)));
+            end if;
+        end process;
+    end generate;
+
+    process (clk)
+    begin
+        if rising_edge(clk) then
+            valid_w <= plane_valid;
+            valid_r <= plane_valid;
+        end if;
+    end process;
+
+    wrapper_write_response <= any_bit(word_w AND word_w_last AND valid_w);
+    wrapper_read_response <= any_bit(word_r AND word_r_last AND valid_r);
+
+    -- incremental update of the bitmap
+    process (clk)
+        variable found : boolean;
+        variable next_rule : natural range 0 to {MEM_DEPTH-1};
+        variable rule : std_logic_vector({MEM_WIDTH-1} DOWNTO 0);
+        variable field_rwx : std_logic_vector({rwx_width-1} DOWNTO 0);
+    begin
+        if rising_edge(clk) then
+            if reset = '1' then
+                if INIT_FILE'length > 0 then
+                    -- a plane holding its INIT_FILE rule is up to date unless it was being redrawn
+                    for i in 0 to {MEM_DEPTH-1} loop
+                        if plane_rule(i) = INIT_RULES(i) AND NOT (update_state /= IDLE AND update_rule = i) then
+                            plane_valid(i) <= '1';
+                            pending(i) <= '0';
+                        else
+                            plane_valid(i) <= '0';
+                            pending(i) <= '1';
+                        end if;
+                    end loop;
+                    pending_word <= INIT_RULES;
+                else
+                    plane_valid <= (others => '0');
+                    pending <= (others => '0');
+                end if;
+                update_state <= IDLE;
+            else
+                case update_state is
+                    when IDLE =>
+                        -- next pending rule after the last one drawn
+                        found := false;
+                        next_rule := 0;
+                        for k in 1 to {MEM_DEPTH} loop
+                            if NOT found AND pending((update_rule + k) mod {MEM_DEPTH}) = '1' then
+                                found := true;
+                                next_rule := (update_rule + k) mod {MEM_DEPTH};
+                            end if;
+                        end loop;
+                        if found then
+                            pending(next_rule) <= '0';
+                            update_rule <= next_rule;
+                            update_word <= pending_word(next_rule);
+                            plane_valid(next_rule) <= '0';
+                            -- range of the rule currently drawn in the plane
+                            rule := plane_rule(next_rule);
+                            field_rwx := rule({MEM_WIDTH-ID_width-1} DOWNTO {MEM_WIDTH-ID_width-rwx_width});
+                            update_key <= rule({MEM_WIDTH-1} DOWNTO {MEM_WIDTH-ID_width}) & field_rwx(2) & field_rwx(0);
+                            cursor <= resize(unsigned(rule({MEM_WIDTH-ID_width-rwx_width-1} DOWNTO {MEM_WIDTH-ID_width-rwx_width-adress_width})), {adress_width+1});
+                            if field_rwx(2 DOWNTO 1) = "01" OR field_rwx(2 DOWNTO 1) = "10" then
+                                cursor_end <= resize(unsigned(rule({MEM_WIDTH-ID_width-rwx_width-adress_width-1} DOWNTO 0)), {adress_width+1});
+                            else
+                                cursor_end <= (others => '0');
+                            end if;
+                            update_state <= CLEAR_RANGE;
+                        end if;
+
+                    when CLEAR_RANGE =>
+                        if cursor < cursor_end then
+                            cursor <= cursor + 1;
+                        else
+                            -- range of the new rule
+                            plane_rule(update_rule) <= update_word;
+                            field_rwx := update_word({MEM_WIDTH-ID_width-1} DOWNTO {MEM_WIDTH-ID_width-rwx_width});
+                            update_key <= update_word({MEM_WIDTH-1} DOWNTO {MEM_WIDTH-ID_width}) & field_rwx(2) & field_rwx(0);
+                            cursor <= resize(unsigned(update_word({MEM_WIDTH-ID_width-rwx_width-1} DOWNTO {MEM_WIDTH-ID_width-rwx_width-adress_width})), {adress_width+1});
+                            if field_rwx(2 DOWNTO 1) = "01" OR field_rwx(2 DOWNTO 1) = "10" then
+                                cursor_end <= resize(unsigned(update_word({MEM_WIDTH-ID_width-rwx_width-adress_width-1} DOWNTO 0)), {adress_width+1});
+                            else
+                                cursor_end <= (others => '0');
+                            end if;
+                            update_state <= SET_RANGE;
+                        end if;
+
+                    when SET_RANGE =>
+                        if cursor < cursor_end then
+                            cursor <= cursor + 1;
+                        else
+                            -- a rule written again during its update stays disabled until it is redrawn
+                            if pending(update_rule) = '0' then
+                                plane_valid(update_rule) <= '1';
+                            end if;
+                            update_state <= IDLE;
+                        end if;
+                end case;
+
+                -- written last so that a write in the same cycle wins over the update
+                if w_rule_enable = '1' then
+                    pending(to_integer(unsigned(rule_number))) <= '1';
+                    pending_word(to_integer(unsigned(rule_number))) <= data_rule;
+                    plane_valid(to_integer(unsigned(rule_number))) <= '0';
+                end if;
+            end if;
+        end if;
+    end process;
+
+end architecture;
+"""
+
+def cached_wrapper_architecture(MEM_DEPTH : int, MEM_WIDTH : int, cache_entries : int, cache_policy : str, cache_region_bits : int, wrapper_file_name : str, rules_array_file_name : str,
+                                encoding : str = "range"):
+
+    ID_width : int = math.ceil(math.log2(MEM_DEPTH))
+    rwx_width : int = 3
+    adress_width : int = rule_adress_width(MEM_WIDTH, ID_width, encoding)
+    address_variables, address_slicing = address_field_strings(MEM_WIDTH, ID_width, adress_width, encoding)
+    # tag : MID & x_enable & address region
+    tag_width : int = ID_width+1+adress_width-cache_region_bits
+    # request of a lane : MID & x_enable & footprint, a lookup is counted when it changes
+    request_width : int = ID_width+1+2*adress_width
+
+    if cache_policy == "lru":
+        replacement : str = "least recently used entry (age counters)"
+        policy_signals : str = f"""    -- age of each entry, 0 for the most recently used one
+    type CacheAgeType is array (0 to {cache_entries-1}) of natural range 0 to {cache_entries-1};
+    function initial_ages return CacheAgeType is
+        variable ages : CacheAgeType;
+    begin
+        for e in 0 to {cache_entries-1} loop
+            ages(e) := e;
+        end loop;
+        return ages;
+    end function;
+    signal age_w : CacheAgeType := initial_ages;
+    signal age_r : CacheAgeType := initial_ages;
+"""
+        policy_variables : str = """        variable used_w : natural;
+        variable used_r : natural;
+"""
+        victim_w : str = "used_w"
+        victim_r : str = "used_r"
+        reset_policy : str = """                age_w <= initial_ages;
+                age_r <= initial_ages;
+"""
+        select_victims : str = f"""                for e in 0 to {cache_entries-1} loop
+                    if age_w(e) = {cache_entries-1} then
+                        used_w := e;
+                    end if;
+                    if age_r(e) = {cache_entries-1} then
+                        used_r := e;
+                    end if;
+                end loop;
+                if hit_w then
+                    used_w := entry_w;
+                end if;
+                if hit_r then
+                    used_r := entry_r;
+                end if;
+"""
+        update_policy : str = f"""                -- the used entry becomes the youngest, the entries younger than it get one cycle older
+                for e in 0 to {cache_entries-1} loop
+                    if hit_w OR single_w then
+                        if e = used_w then
+                            age_w(e) <= 0;
+                        elsif age_w(e) < age_w(used_w) then
+                            age_w(e) <= age_w(e) + 1;
+                        end if;
+                    end if;
+                    if hit_r OR single_r then
+                        if e = used_r then
+                            age_r(e) <= 0;
+                        elsif age_r(e) < age_r(used_r) then
+                            age_r(e) <= age_r(e) + 1;
+                        end if;
+                    end if;
+                end loop;
+"""
+    else:
+        replacement : str = "oldest inserted entry (round robin)"
+        policy_signals : str = f"""    signal next_w : natural range 0 to {cache_entries-1} := 0;
+    signal next_r : natural range 0 to {cache_entries-1} := 0;
+"""
+        policy_variables : str = ""
+        victim_w : str = "next_w"
+        victim_r : str = "next_r"
+        reset_policy : str = """                next_w <= 0;
+                next_r <= 0;
+"""
+        select_victims : str = ""
+        update_policy : str = f"""                if NOT hit_w AND single_w then
+                    next_w <= (next_w + 1) mod {cache_entries};
+                end if;
+                if NOT hit_r AND single_r then
+                    next_r <= (next_r + 1) mod {cache_entries};
+                end if;
+"""
+
+    return f"""-- rules array scan beside a decision cache of {cache_entries} entries per lane, replacing the {replacement}
+-- the scan and the tag lookup run in parallel, a hit answers with the cached decision and a miss with the scan, which is stored
+-- the cache holds one decision per address region of {2**cache_region_bits} address(es) : the regions must not be split by a rule bound
+-- a burst whose footprint spans several regions bypasses the cache
+-- every w_rule_enable write and reset invalidate the whole cache, cache_hits and cache_misses count the lookups of both lanes,
+-- one per request : a lane holding the same request is only counted once
+architecture {wrapper_file_name}_rtl of {wrapper_file_name} is
+        signal rules_array : MemoryArrayType;
+
+    type CacheTagType is array (0 to {cache_entries-1}) of std_logic_vector({tag_width-1} DOWNTO 0);
+    signal tag_w : CacheTagType := (others => (others => '0'));
+    signal tag_r : CacheTagType := (others => (others => '0'));
+    signal valid_w : std_logic_vector({cache_entries-1} DOWNTO 0) := (others => '0');
+    signal valid_r : std_logic_vector({cache_entries-1} DOWNTO 0) := (others => '0');
+    signal decision_w : std_logic_vector({cache_entries-1} DOWNTO 0) := (others => '0');
+    signal decision_r : std_logic_vector({cache_entries-1} DOWNTO 0) := (others => '0');
+{policy_signals}
+    signal hits : unsigned(31 DOWNTO 0) := (others => '0');
+    signal misses : unsigned(31 DOWNTO 0) := (others => '0');
+    -- last request of each lane, not counted again while it is held
+    signal last_request_w : std_logic_vector({request_width-1} DOWNTO 0) := (others => '0');
+    signal last_request_r : std_logic_vector({request_width-1} DOWNTO 0) := (others => '0');
+    signal last_valid_w : boolean := false;
+    signal last_valid_r : boolean := false;
+begin
+
+    -- instance of memory for rules
+    {rules_array_file_name}_inst: entity work.{rules_array_file_name}
+     generic map(
+        INIT_FILE => INIT_FILE
+    )
+     port map(
+        CLK => clk,
+        RESET => reset,
+        rule_number => rule_number,
+        w_enable => w_rule_enable,
+        data_in => data_rule,
+        data_out => rules_array
+    );
+
+    process (clk)
+        variable res_w : std_logic := '0';
+        variable res_r : std_logic := '0';
+        variable scan_w : std_logic;
+        variable scan_r : std_logic;
+        variable new_w : boolean;
+        variable new_r : boolean;
+        variable key_w : std_logic_vector({tag_width-1} DOWNTO 0);
+        variable key_r : std_logic_vector({tag_width-1} DOWNTO 0);
+        variable hit_w : boolean;
+        variable hit_r : boolean;
+        variable single_w : boolean;
+        variable single_r : boolean;
+        variable entry_w : natural range 0 to {cache_entries-1};
+        variable entry_r : natural range 0 to {cache_entries-1};
+{policy_variables}
+        variable field_id : std_logic_vector({ID_width-1} DOWNTO 0);
+        variable field_rwx : std_logic_vector({rwx_width-1} DOWNTO 0);
+{address_variables}
+    begin
+        if rising_edge(clk) then
+            if reset = '1' then
+                -- the rules array goes back to INIT_FILE : no cached decision is valid any more
+                hits <= (others => '0');
+                misses <= (others => '0');
+                valid_w <= (others => '0');
+                valid_r <= (others => '0');
+{reset_policy}                last_valid_w <= false;
+                last_valid_r <= false;
+                wrapper_write_response <= '0';
+                wrapper_read_response <= '0';
+            elsif w_rule_enable /= '1' then
+                key_w := MID_W & x_enable & addr_w({adress_width-1} DOWNTO {cache_region_bits});
+                key_r := MID_R & x_enable & addr_r({adress_width-1} DOWNTO {cache_region_bits});
+                hit_w := false;
+                hit_r := false;
+                entry_w := 0;
+                entry_r := 0;
+                single_w := addr_w_last({adress_width-1} DOWNTO {cache_region_bits}) = addr_w({adress_width-1} DOWNTO {cache_region_bits});
+                single_r := addr_r_last({adress_width-1} DOWNTO {cache_region_bits}) = addr_r({adress_width-1} DOWNTO {cache_region_bits});
+                for e in 0 to {cache_entries-1} loop
+                    if single_w AND valid_w(e) = '1' AND tag_w(e) = key_w then
+                        hit_w := true;
+                        entry_w := e;
+                    end if;
+                    if single_r AND valid_r(e) = '1' AND tag_r(e) = key_r then
+                        hit_r := true;
+                        entry_r := e;
+                    end if;
+                end loop;
+
+                -- scan of the rules array, in parallel with the lookup
+                scan_w := '0';
+                scan_r := '0';
+                myloop:for i in 0 to {MEM_DEPTH-1} loop
+                    field_id := rules_array(i)({MEM_WIDTH-1} DOWNTO {MEM_WIDTH-ID_width});
+                    field_rwx := rules_array(i)({MEM_WIDTH-ID_width-1} DOWNTO {MEM_WIDTH-ID_width-rwx_width});
+{address_slicing}                    if field_id = MID_W AND field_rwx = ("01" & x_enable) AND {address_match("addr_w", "addr_w_last", encoding)} then
+                        scan_w := '1';
+                    end if;
+                    if field_id = MID_R AND field_rwx = ("10" & x_enable) AND {address_match("addr_r", "addr_r_last", encoding)} then
+                        scan_r := '1';
+                    end if;
+                end loop;
+
+                -- the hit selects the cached decision
+                res_w := scan_w;
+                res_r := scan_r;
+                if hit_w then
+                    res_w := decision_w(entry_w);
+                end if;
+                if hit_r then
+                    res_r := decision_r(entry_r);
+                end if;
+{select_victims}
+                if NOT hit_w AND single_w then
+                    tag_w({victim_w}) <= key_w;
+                    decision_w({victim_w}) <= scan_w;
+                    valid_w({victim_w}) <= '1';
+                end if;
+                if NOT hit_r AND single_r then
+                    tag_r({victim_r}) <= key_r;
+                    decision_r({victim_r}) <= scan_r;
+                    valid_r({victim_r}) <= '1';
+                end if;
+{update_policy}
+                -- one lookup counted per request of each lane
+                new_w := NOT last_valid_w OR last_request_w /= (MID_W & x_enable & addr_w & addr_w_last);
+                new_r := NOT last_valid_r OR last_request_r /= (MID_R & x_enable & addr_r & addr_r_last);
+                last_request_w <= MID_W & x_enable & addr_w & addr_w_last;
+                last_request_r <= MID_R & x_enable & addr_r & addr_r_last;
+                last_valid_w <= true;
+                last_valid_r <= true;
+                if (new_w AND hit_w) AND (new_r AND hit_r) then
+                    hits <= hits + 2;
+                elsif (new_w AND hit_w) OR (new_r AND hit_r) then
+                    hits <= hits + 1;
+                end if;
+                if (new_w AND NOT hit_w) AND (new_r AND NOT hit_r) then
+                    misses <= misses + 2;
+                elsif (new_w AND NOT hit_w) OR (new_r AND NOT hit_r) then
+                    misses <= misses + 1;
+                end if;
+
+                wrapper_write_response <= res_w;
+                wrapper_read_response <= res_r;
+            else
+                -- the rules array is being written : the cached decisions are no longer valid
+                valid_w <= (others => '0');
+                valid_r <= (others => '0');
+                last_valid_w <= false;
+                last_valid_r <= false;
+                wrapper_write_response <= '0';
+                wrapper_read_response <= '0';
+            end if;
+        end if;
+    end process;
+
+    cache_hits <= std_logic_vector(hits);
+    cache_misses <= std_logic_vector(misses);
+
+end architecture;
+"""
+
+def partitioned_wrapper_architecture(MEM_DEPTH : int, MEM_WIDTH : int, slots_per_mid : int, wrapper_file_name : str, rules_array_file_name : str, shadow_bank : bool = False,
+                                     encoding : str = "range"):
+
+    ID_width : int = math.ceil(math.log2(MEM_DEPTH))
+    rwx_width : int = 3
+    adress_width : int = rule_adress_width(MEM_WIDTH, ID_width, encoding)
+    rules_guard, swap_map = shadow_bank_strings(shadow_bank)
+    address_variables_w, address_slicing_w = address_field_strings(MEM_WIDTH, ID_width, adress_width, encoding, "rule_w", "_w")
+    address_variables_r, address_slicing_r = address_field_strings(MEM_WIDTH, ID_width, adress_width, encoding, "rule_r", "_r")
+
+    return f"""-- rules partitioned in one bank of {slots_per_mid} slot(s) per MID : rule_number is MID & slot and the rule of slot s of bank m
+-- is rules_array(m*{slots_per_mid}+s), a request is only compared with the bank of its MID, whose ID field is not compared again
+architecture {wrapper_file_name}_rtl of {wrapper_file_name} is
+        signal rules_array : MemoryArrayType;
+begin
+
+    -- instance of memory for rules
+    {rules_array_file_name}_inst: entity work.{rules_array_file_name}
+     generic map(
+        INIT_FILE => INIT_FILE
+    )
+     port map(
+        CLK => clk,
+        RESET => reset,
+        rule_number => rule_number,
+        w_enable => w_rule_enable,
+        data_in => data_rule,
+        data_out => rules_array{swap_map}
+    );
+
+    process (clk)
+        variable res_w : std_logic := '0';
+        variable res_r : std_logic := '0';
+        variable rule_w : std_logic_vector({MEM_WIDTH-1} DOWNTO 0);
+        variable rule_r : std_logic_vector({MEM_WIDTH-1} DOWNTO 0);
+{address_variables_w}{address_variables_r}    begin
+        if rising_edge(clk) then
+            if {rules_guard} then
+                res_w := '0';
+                res_r := '0';
+                bankloop:for s in 0 to {slots_per_mid-1} loop
+                    rule_w := rules_array(to_integer(unsigned(MID_W))*{slots_per_mid} + s);
+                    rule_r := rules_array(to_integer(unsigned(MID_R))*{slots_per_mid} + s);
+{address_slicing_w}{address_slicing_r}                    if rule_w({MEM_WIDTH-ID_width-1} DOWNTO {MEM_WIDTH-ID_width-rwx_width}) = ("01" & x_enable)
+                       AND {address_match("addr_w", "addr_w_last", encoding, "_w")} then
+                        res_w := '1';
+                    end if;
+                    if rule_r({MEM_WIDTH-ID_width-1} DOWNTO {MEM_WIDTH-ID_width-rwx_width}) = ("10" & x_enable)
+                       AND {address_match("addr_r", "addr_r_last", encoding, "_r")} then
+                        res_r := '1';
+                    end if;
+                end loop;
+                wrapper_write_response <= res_w;
+                wrapper_read_response <= res_r;
+            else
+                wrapper_write_response <= '0';
+                wrapper_read_response <= '0';
+            end if;
+        end if;
+    end process;
+
+end architecture;
+"""
+
+def bram_scan_schedule(MEM_DEPTH : int, rules_per_cycle : int, scan_slots : int):
+    # rows of rules_per_cycle rules read one per clock cycle, first row of each of the scan_slots scans spread over the rows,
+    # cycles between the sampling of a request and its decision, and cycles a request has to be held to get its decision
+    rows : int = math.ceil(MEM_DEPTH / rules_per_cycle)
+    starts : list = [slot*rows // scan_slots for slot in range(scan_slots)]
+    decision_latency : int = rows + 1
+    hold_latency : int = rows + math.ceil(rows / scan_slots)
+    return rows, starts, decision_latency, hold_latency
+
+def bram_wrapper_architecture(MEM_DEPTH : int, MEM_WIDTH : int, rules_per_cycle : int, scan_slots : int, wrapper_file_name : str,
+                              encoding : str = "range"):
+
+    ID_width : int = math.ceil(math.log2(MEM_DEPTH))
+    rwx_width : int = 3
+    adress_width : int = rule_adress_width(MEM_WIDTH, ID_width, encoding)
+    address_variables, address_slicing = address_field_strings(MEM_WIDTH, ID_width, adress_width, encoding, "rule_q(k)")
+    rows, starts, decision_latency, hold_latency = bram_scan_schedule(MEM_DEPTH, rules_per_cycle, scan_slots)
+
+    def table(values):
+        return ", ".join(f"{i} => {value}" for i, value in enumerate(values))
+
+    return f"""-- sequential scan of the rules stored in {rules_per_cycle} inferrable block RAM(s) of {rows} word(s) : rule i is word i/{rules_per_cycle}
+-- of RAM i mod {rules_per_cycle}, one row of {rules_per_cycle} rule(s) is read per clock cycle and the rows are read in a loop
+-- {scan_slots} scan(s) are in flight, each one samples both requests when the loop reaches its first row and answers
+-- {decision_latency} clock cycles later, after comparing them with every row; request_ready is '1' when a scan samples at the next edge
+-- a request held without handshake is answered within {hold_latency} clock cycles
+-- the RAMs have no reset : they start from INIT_FILE and only change through w_rule_enable, a decision whose scan
+-- saw a rule written is a deny
+architecture {wrapper_file_name}_rtl of {wrapper_file_name} is
+
+    type RuleRowType is array (0 to {rules_per_cycle-1}) of std_logic_vector({MEM_WIDTH-1} DOWNTO 0);
+    type RuleRamType is array (0 to {rows-1}) of std_logic_vector({MEM_WIDTH-1} DOWNTO 0);
+    type RowArrayType is array (0 to {scan_slots-1}) of natural range 0 to {rows-1};
+    type IdArrayType is array (0 to {scan_slots-1}) of std_logic_vector({ID_width-1} DOWNTO 0);
+    type AddressArrayType is array (0 to {scan_slots-1}) of std_logic_vector({adress_width-1} DOWNTO 0);
+
+    constant INIT_RULES : MemoryArrayType := load_rule_image(INIT_FILE);
+
+    -- rules of RAM k in row order
+    function ram_rules(k : natural) return RuleRamType is
+        variable res : RuleRamType := (others => (others => '0'));
+    begin
+        for row in 0 to {rows-1} loop
+            if row*{rules_per_cycle} + k < {MEM_DEPTH} then
+                res(row) := INIT_RULES(row*{rules_per_cycle} + k);
+            end if;
+        end loop;
+        return res;
+    end function;
+
+    -- first and last row of each scan
+    constant SCAN_FIRST : RowArrayType := ({table(starts)});
+    constant SCAN_LAST : RowArrayType := ({table([(start + rows - 1) % rows for start in starts])});
+
+    signal scan_row : natural range 0 to {rows-1} := 0; -- row read at the next edge
+    signal rule_row : natural range 0 to {rows-1} := 0; -- row held by rule_q
+    signal rule_q : RuleRowType;
+
+    -- requests of each scan, their partial decisions and the scans that saw a rule written
+    signal scan_MID_W : IdArrayType := (others => (others => '0'));
+    signal scan_MID_R : IdArrayType := (others => (others => '0'));
+    signal scan_x : std_logic_vector({scan_slots-1} DOWNTO 0) := (others => '0');
+    signal scan_addr_w : AddressArrayType := (others => (others => '0'));
+    signal scan_addr_r : AddressArrayType := (others => (others => '0'));
+    signal scan_addr_w_last : AddressArrayType := (others => (others => '0'));
+    signal scan_addr_r_last : AddressArrayType := (others => (others => '0'));
+    signal scan_w : std_logic_vector({scan_slots-1} DOWNTO 0) := (others => '0');
+    signal scan_r : std_logic_vector({scan_slots-1} DOWNTO 0) := (others => '0');
+    signal scan_written : std_logic_vector({scan_slots-1} DOWNTO 0) := (others => '1');
+
+    function first_row(row : natural) return std_logic is
+    begin
+        for s in 0 to {scan_slots-1} loop
+            if SCAN_FIRST(s) = row then
+                return '1';
+            end if;
+        end loop;
+        return '0';
+    end function;
+
+begin
+
+    -- one simple dual port RAM per rule of a row : written by rule_number, read by the scan
+    rams: for k in 0 to {rules_per_cycle-1} generate
+        signal ram : RuleRamType := ram_rules(k);
+    begin
+        process (clk)
+        begin
+            if rising_edge(clk) then
+                if w_rule_enable = '1' AND to_integer(unsigned(rule_number)) mod {rules_per_cycle} = k
+                   AND to_integer(unsigned(rule_number)) < {MEM_DEPTH} then
+                    ram(to_integer(unsigned(rule_number)) / {rules_per_cycle}) <= data_rule;
+                end if;
+                rule_q(k) <= ram(scan_row);
+            end if;
+        end process;
+    end generate;
+
+    request_ready <= first_row(scan_row);
+
+    process (clk)
+        variable res_w : std_logic;
+        variable res_r : std_logic;
+        variable field_id : std_logic_vector({ID_width-1} DOWNTO 0);
+        variable field_rwx : std_logic_vector({rwx_width-1} DOWNTO 0);
+{address_variables}    begin
+        if rising_edge(clk) then
+            scan_row <= (scan_row + 1) mod {rows};
+            rule_row <= scan_row;
+            for s in 0 to {scan_slots-1} loop
+                -- row of rule_q against the request of the scan, ORed with the rows already compared
+                res_w := '0';
+                res_r := '0';
+                if rule_row /= SCAN_FIRST(s) then
+                    res_w := scan_w(s);
+                    res_r := scan_r(s);
+                end if;
+                rowloop:for k in 0 to {rules_per_cycle-1} loop
+                    field_id := rule_q(k)({MEM_WIDTH-1} DOWNTO {MEM_WIDTH-ID_width});
+                    field_rwx := rule_q(k)({MEM_WIDTH-ID_width-1} DOWNTO {MEM_WIDTH-ID_width-rwx_width});
+{address_slicing}                    if field_id = scan_MID_W(s) AND field_rwx = ("01" & scan_x(s)) AND {address_match("scan_addr_w(s)", "scan_addr_w_last(s)", encoding)} then
+                        res_w := '1';
+                    end if;
+                    if field_id = scan_MID_R(s) AND field_rwx = ("10" & scan_x(s)) AND {address_match("scan_addr_r(s)", "scan_addr_r_last(s)", encoding)} then
+                        res_r := '1';
+                    end if;
+                end loop;
+                scan_w(s) <= res_w;
+                scan_r(s) <= res_r;
+                if rule_row = SCAN_LAST(s) then
+                    wrapper_write_response <= res_w AND NOT scan_written(s);
+                    wrapper_read_response <= res_r AND NOT scan_written(s);
+                end if;
+
+                -- requests sampled when the scan reads its first row
+                if scan_row = SCAN_FIRST(s) then
+                    scan_MID_W(s) <= MID_W;
+                    scan_MID_R(s) <= MID_R;
+                    scan_x(s) <= x_enable;
+                    scan_addr_w(s) <= addr_w;
+                    scan_addr_r(s) <= addr_r;
+                    scan_addr_w_last(s) <= addr_w_last;
+                    scan_addr_r_last(s) <= addr_r_last;
+                    scan_written(s) <= w_rule_enable;
+                elsif w_rule_enable = '1' then
+                    scan_written(s) <= '1';
+                end if;
+            end loop;
+        end if;
+    end process;
+
+end architecture;
+"""
+
+def axi_datapath_architecture(interface_AXI_file_name : str, wrapper_file_name : str, port_map : str, request_ready : bool = False):
+    # AXI4 firewall between the S_AXI master side and the M_AXI protected slave side : every address is checked by the wrapper,
+    # allowed transactions are passed through, denied ones never reach the slave and are answered with C_DENY_RESP
+    # with request_ready the wrapper only samples the addresses in some cycles, the others are held on the address channels
+    ready_signal : str = ""
+    ready_guard : str = ""
+    if request_ready:
+        ready_signal = """
+    -- the wrapper samples the addresses at the next edge
+    signal request_ready : std_logic;
+"""
+        ready_guard = " and request_ready = '1'"
+        port_map += """,
+        request_ready => request_ready"""
+    return f"""architecture {interface_AXI_file_name}_arch of {interface_AXI_file_name} is
+
+    type ChannelOwnerType is (NONE, SLAVE, LOCAL); -- source of the response currently presented on the B or R channel
+    type CounterArrayType is array (0 to 2**C_S_AXI_ID_WIDTH-1) of natural range 0 to C_MAX_OUTSTANDING; -- one counter per AXI ID
+    type IdArrayType is array (natural range <>) of std_logic_vector(C_S_AXI_ID_WIDTH-1 downto 0);
+
+    -- address and control of a transaction, allowed is the wrapper decision
+    type WriteAddressType is record
+        id      : std_logic_vector(C_S_AXI_ID_WIDTH-1 downto 0);
+        addr    : std_logic_vector(C_S_AXI_ADDR_WIDTH-1 downto 0);
+        len     : std_logic_vector(7 downto 0);
+        size    : std_logic_vector(2 downto 0);
+        burst   : std_logic_vector(1 downto 0);
+        lock    : std_logic;
+        cache   : std_logic_vector(3 downto 0);
+        prot    : std_logic_vector(2 downto 0);
+        qos     : std_logic_vector(3 downto 0);
+        region  : std_logic_vector(3 downto 0);
+        user    : std_logic_vector(C_S_AXI_AWUSER_WIDTH-1 downto 0);
+        allowed : std_logic;
+    end record;
+    type WriteAddressArrayType is array (natural range <>) of WriteAddressType;
+
+    type ReadAddressType is record
+        id      : std_logic_vector(C_S_AXI_ID_WIDTH-1 downto 0);
+        addr    : std_logic_vector(C_S_AXI_ADDR_WIDTH-1 downto 0);
+        len     : std_logic_vector(7 downto 0);
+        size    : std_logic_vector(2 downto 0);
+        burst   : std_logic_vector(1 downto 0);
+        lock    : std_logic;
+        cache   : std_logic_vector(3 downto 0);
+        prot    : std_logic_vector(2 downto 0);
+        qos     : std_logic_vector(3 downto 0);
+        region  : std_logic_vector(3 downto 0);
+        user    : std_logic_vector(C_S_AXI_ARUSER_WIDTH-1 downto 0);
+        allowed : std_logic;
+    end record;
+    type ReadAddressArrayType is array (natural range <>) of ReadAddressType;
+
+    -- destination of a write data burst : the protected slave or the bit bucket
+    type RouteType is record
+        forward : std_logic;
+        id      : std_logic_vector(C_S_AXI_ID_WIDTH-1 downto 0);
+    end record;
+    type RouteArrayType is array (natural range <>) of RouteType;
+
+    -- denied read answered locally with len+1 error beats
+    type BurstType is record
+        id  : std_logic_vector(C_S_AXI_ID_WIDTH-1 downto 0);
+        len : std_logic_vector(7 downto 0);
+    end record;
+    type BurstArrayType is array (natural range <>) of BurstType;
+
+    -- lowest and highest address of the burst footprint : one beat for FIXED, len+1 beats from the aligned address for INCR,
+    -- the whole wrap window for WRAP; the highest address saturates to all ones when the burst leaves the address space
+    -- or has the reserved burst type, burst_invalid flags these bursts, which are denied whatever the rules
+    -- (a NAPOT region at the top of the address space contains the all ones address)
+    function burst_first(addr : std_logic_vector; len : std_logic_vector; size : std_logic_vector; burst : std_logic_vector) return std_logic_vector is
+        variable total : unsigned(C_S_AXI_ADDR_WIDTH+15 downto 0);
+        variable first : unsigned(C_S_AXI_ADDR_WIDTH+15 downto 0);
+    begin
+        first := resize(unsigned(addr), C_S_AXI_ADDR_WIDTH+16);
+        if burst = "10" then
+            total := shift_left(resize(unsigned(len), C_S_AXI_ADDR_WIDTH+16) + 1, to_integer(unsigned(size)));
+            first := first and not (total - 1);
+        end if;
+        return std_logic_vector(first(C_S_AXI_ADDR_WIDTH-1 downto 0));
+    end function;
+
+    -- highest address of the burst on 16 more bits, the reserved burst type overflows them
+    function burst_end(addr : std_logic_vector; len : std_logic_vector; size : std_logic_vector; burst : std_logic_vector) return unsigned is
+        variable beat : unsigned(C_S_AXI_ADDR_WIDTH+15 downto 0);
+        variable total : unsigned(C_S_AXI_ADDR_WIDTH+15 downto 0);
+        variable start : unsigned(C_S_AXI_ADDR_WIDTH+15 downto 0);
+    begin
+        beat := shift_left(to_unsigned(1, C_S_AXI_ADDR_WIDTH+16), to_integer(unsigned(size)));
+        total := shift_left(resize(unsigned(len), C_S_AXI_ADDR_WIDTH+16) + 1, to_integer(unsigned(size)));
+        start := resize(unsigned(addr), C_S_AXI_ADDR_WIDTH+16);
+        case burst is
+            when "00" => return (start and not (beat - 1)) + beat - 1;  -- FIXED
+            when "01" => return (start and not (beat - 1)) + total - 1; -- INCR
+            when "10" => return (start and not (total - 1)) + total - 1; -- WRAP
+            when others => return (C_S_AXI_ADDR_WIDTH+15 downto 0 => '1');
+        end case;
+    end function;
+
+    function burst_invalid(addr : std_logic_vector; len : std_logic_vector; size : std_logic_vector; burst : std_logic_vector) return std_logic is
+        variable last : unsigned(C_S_AXI_ADDR_WIDTH+15 downto 0);
+    begin
+        last := burst_end(addr, len, size, burst);
+        if last(C_S_AXI_ADDR_WIDTH+15 downto C_S_AXI_ADDR_WIDTH) /= 0 then
+            return '1';
+        end if;
+        return '0';
+    end function;
+
+    function burst_last(addr : std_logic_vector; len : std_logic_vector; size : std_logic_vector; burst : std_logic_vector) return std_logic_vector is
+        variable last : unsigned(C_S_AXI_ADDR_WIDTH+15 downto 0);
+    begin
+        last := burst_end(addr, len, size, burst);
+        if last(C_S_AXI_ADDR_WIDTH+15 downto C_S_AXI_ADDR_WIDTH) /= 0 then
+            return (C_S_AXI_ADDR_WIDTH-1 downto 0 => '1');
+        end if;
+        return std_logic_vector(last(C_S_AXI_ADDR_WIDTH-1 downto 0));
+    end function;
+
+    -- active high reset of the wrapper, S_AXI_ARESETN is active low
+    signal reset : std_logic;
+
+    -- footprints checked by the wrapper, one decision per burst
+    signal aw_first : std_logic_vector(C_S_AXI_ADDR_WIDTH-1 downto 0);
+    signal aw_last  : std_logic_vector(C_S_AXI_ADDR_WIDTH-1 downto 0);
+    signal ar_first : std_logic_vector(C_S_AXI_ADDR_WIDTH-1 downto 0);
+    signal ar_last  : std_logic_vector(C_S_AXI_ADDR_WIDTH-1 downto 0);
+
+    signal write_response : std_logic;
+    signal read_response : std_logic;
+
+    -- invalid bursts, delayed like the wrapper decision, and the decisions once they are denied
+    signal aw_invalid : std_logic_vector(0 to C_DECISION_LATENCY-1) := (others => '0');
+    signal ar_invalid : std_logic_vector(0 to C_DECISION_LATENCY-1) := (others => '0');
+    signal write_decision : std_logic;
+    signal read_decision : std_logic;
+{ready_signal}
+    -- write address : delay line aligned with the wrapper decision, then FIFO of decided addresses
+    signal aw_pipe       : WriteAddressArrayType(0 to C_DECISION_LATENCY-1);
+    signal aw_pipe_valid : std_logic_vector(0 to C_DECISION_LATENCY-1) := (others => '0');
+    signal aw_fifo       : WriteAddressArrayType(0 to C_FIFO_DEPTH-1);
+    signal aw_head       : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal aw_tail       : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal aw_count      : natural range 0 to C_FIFO_DEPTH := 0; -- decided addresses
+    signal aw_credits    : natural range 0 to C_FIFO_DEPTH := 0; -- accepted addresses not yet forwarded or dropped
+    signal aw_ready      : std_logic;
+    signal aw_forward    : std_logic; -- allowed head presented to the protected slave
+    signal aw_drop       : std_logic; -- denied head dropped
+    signal aw_pop        : std_logic;
+
+    -- write data : one route per decided address, in address order
+    signal w_route       : RouteArrayType(0 to C_FIFO_DEPTH-1);
+    signal w_route_head  : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal w_route_tail  : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal w_route_count : natural range 0 to C_FIFO_DEPTH := 0;
+    signal w_forward     : std_logic;
+    signal w_drop        : std_logic;
+    signal w_ready       : std_logic;
+
+    -- write response : IDs of the denied writes whose data has been swallowed
+    signal b_local       : IdArrayType(0 to C_FIFO_DEPTH-1);
+    signal b_local_head  : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal b_local_tail  : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal b_local_count : natural range 0 to C_FIFO_DEPTH := 0;
+    signal b_local_valid : std_logic;
+    signal b_owner       : ChannelOwnerType := NONE;
+    signal b_select      : ChannelOwnerType;
+    signal b_valid       : std_logic;
+    signal w_outstanding : CounterArrayType := (others => 0); -- writes forwarded and not yet answered by the slave
+    signal w_denied      : CounterArrayType := (others => 0); -- denied writes not yet answered
+    signal w_denied_total : natural range 0 to C_FIFO_DEPTH := 0;
+
+    -- read address : same structure as the write address
+    signal ar_pipe       : ReadAddressArrayType(0 to C_DECISION_LATENCY-1);
+    signal ar_pipe_valid : std_logic_vector(0 to C_DECISION_LATENCY-1) := (others => '0');
+    signal ar_fifo       : ReadAddressArrayType(0 to C_FIFO_DEPTH-1);
+    signal ar_head       : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal ar_tail       : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal ar_count      : natural range 0 to C_FIFO_DEPTH := 0;
+    signal ar_credits    : natural range 0 to C_FIFO_DEPTH := 0;
+    signal ar_ready      : std_logic;
+    signal ar_forward    : std_logic;
+    signal ar_drop       : std_logic;
+    signal ar_pop        : std_logic;
+
+    -- read data : denied reads waiting for their error beats
+    signal r_local       : BurstArrayType(0 to C_FIFO_DEPTH-1);
+    signal r_local_head  : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal r_local_tail  : natural range 0 to C_FIFO_DEPTH-1 := 0;
+    signal r_local_count : natural range 0 to C_FIFO_DEPTH := 0;
+    signal r_local_valid : std_logic;
+    signal r_local_last  : std_logic;
+    signal r_beat        : unsigned(7 downto 0) := (others => '0');
+    signal r_owner       : ChannelOwnerType := NONE;
+    signal r_select      : ChannelOwnerType;
+    signal r_valid       : std_logic;
+    signal r_last        : std_logic;
+    signal r_outstanding : CounterArrayType := (others => 0); -- reads forwarded and not yet completed by the slave
+    signal r_denied      : CounterArrayType := (others => 0); -- denied reads not yet completed
+
+begin
+
+    reset <= not S_AXI_ARESETN;
+
+    aw_first <= burst_first(S_AXI_AWADDR, S_AXI_AWLEN, S_AXI_AWSIZE, S_AXI_AWBURST);
+    aw_last <= burst_last(S_AXI_AWADDR, S_AXI_AWLEN, S_AXI_AWSIZE, S_AXI_AWBURST);
+    ar_first <= burst_first(S_AXI_ARADDR, S_AXI_ARLEN, S_AXI_ARSIZE, S_AXI_ARBURST);
+    ar_last <= burst_last(S_AXI_ARADDR, S_AXI_ARLEN, S_AXI_ARSIZE, S_AXI_ARBURST);
+
+    {wrapper_file_name}_inst: entity work.{wrapper_file_name}
+     generic map(
+        INIT_FILE => C_RULES_INIT_FILE
+    )
+     port map(
+        clk => S_AXI_ACLK,
+        reset => reset,
+        w_rule_enable => w_rule_enable,
+        data_rule => data_rule,
+        rule_number => rule_number,
+        MID_W => MID_W,
+        MID_R => MID_R,
+        x_enable => x_enable,
+        addr_w => aw_first,
+        addr_r => ar_first,
+        addr_w_last => aw_last,
+        addr_r_last => ar_last,
+        wrapper_write_response => write_response,
+        wrapper_read_response => read_response{port_map}
+    );
+
+    -- the wrapper sees the all ones address of an invalid burst, its decision is overridden
+    process (S_AXI_ACLK)
+    begin
+        if rising_edge(S_AXI_ACLK) then
+            aw_invalid(0) <= burst_invalid(S_AXI_AWADDR, S_AXI_AWLEN, S_AXI_AWSIZE, S_AXI_AWBURST);
+            ar_invalid(0) <= burst_invalid(S_AXI_ARADDR, S_AXI_ARLEN, S_AXI_ARSIZE, S_AXI_ARBURST);
+            for i in 1 to C_DECISION_LATENCY-1 loop
+                aw_invalid(i) <= aw_invalid(i-1);
+                ar_invalid(i) <= ar_invalid(i-1);
+            end loop;
+        end if;
+    end process;
+
+    write_decision <= write_response and not aw_invalid(C_DECISION_LATENCY-1);
+    read_decision <= read_response and not ar_invalid(C_DECISION_LATENCY-1);
+
+    wrapper_write_response <= write_decision;
+    wrapper_read_response <= read_decision;
+
+    ------------------------------------------- write address channel -------------------------------------------
+    -- one address accepted per cycle as long as every accepted address has a place in the decided FIFO
+    aw_ready <= '1' when aw_credits < C_FIFO_DEPTH and reset /= '1'{ready_guard} else '0';
+    S_AXI_AWREADY <= aw_ready;
+
+    -- an allowed write waits for the local responses of the denied writes of its ID so that the B responses stay in order
+    aw_forward <= '1' when aw_count > 0 and aw_fifo(aw_head).allowed = '1' and w_route_count < C_FIFO_DEPTH
+                           and w_denied(to_integer(unsigned(aw_fifo(aw_head).id))) = 0
+                           and w_outstanding(to_integer(unsigned(aw_fifo(aw_head).id))) < C_MAX_OUTSTANDING else '0';
+    aw_drop <= '1' when aw_count > 0 and aw_fifo(aw_head).allowed = '0' and w_route_count < C_FIFO_DEPTH
+                        and w_denied_total < C_FIFO_DEPTH else '0';
+    aw_pop <= (aw_forward and M_AXI_AWREADY) or aw_drop;
+
+    M_AXI_AWID <= aw_fifo(aw_head).id;
+    M_AXI_AWADDR <= aw_fifo(aw_head).addr;
+    M_AXI_AWLEN <= aw_fifo(aw_head).len;
+    M_AXI_AWSIZE <= aw_fifo(aw_head).size;
+    M_AXI_AWBURST <= aw_fifo(aw_head).burst;
+    M_AXI_AWLOCK <= aw_fifo(aw_head).lock;
+    M_AXI_AWCACHE <= aw_fifo(aw_head).cache;
+    M_AXI_AWPROT <= aw_fifo(aw_head).prot;
+    M_AXI_AWQOS <= aw_fifo(aw_head).qos;
+    M_AXI_AWREGION <= aw_fifo(aw_head).region;
+    M_AXI_AWUSER <= aw_fifo(aw_head).user;
+    M_AXI_AWVALID <= aw_forward;
+
+    process (S_AXI_ACLK)
+        variable entry : WriteAddressType;
+        variable accept : boolean;
+        variable decided : boolean;
+    begin
+        if rising_edge(S_AXI_ACLK) then
+            if reset = '1' then
+                aw_pipe_valid <= (others => '0');
+                aw_head <= 0;
+                aw_tail <= 0;
+                aw_count <= 0;
+                aw_credits <= 0;
+            else
+                -- the wrapper samples S_AXI_AWADDR and MID_W on the same edge, its decision comes C_DECISION_LATENCY cycles later
+                accept := S_AXI_AWVALID = '1' and aw_ready = '1';
+                aw_pipe(0) <= (S_AXI_AWID, S_AXI_AWADDR, S_AXI_AWLEN, S_AXI_AWSIZE, S_AXI_AWBURST, S_AXI_AWLOCK,
+                               S_AXI_AWCACHE, S_AXI_AWPROT, S_AXI_AWQOS, S_AXI_AWREGION, S_AXI_AWUSER, '0');
+                if accept then
+                    aw_pipe_valid(0) <= '1';
+                else
+                    aw_pipe_valid(0) <= '0';
+                end if;
+                for i in 1 to C_DECISION_LATENCY-1 loop
+                    aw_pipe(i) <= aw_pipe(i-1);
+                    aw_pipe_valid(i) <= aw_pipe_valid(i-1);
+                end loop;
+
+                decided := aw_pipe_valid(C_DECISION_LATENCY-1) = '1';
+                if decided then
+                    entry := aw_pipe(C_DECISION_LATENCY-1);
+                    entry.allowed := write_decision;
+                    aw_fifo(aw_tail) <= entry;
+                    aw_tail <= (aw_tail + 1) mod C_FIFO_DEPTH;
+                end if;
+                if aw_pop = '1' then
+                    aw_head <= (aw_head + 1) mod C_FIFO_DEPTH;
+                end if;
+
+                if decided and aw_pop /= '1' then
+                    aw_count <= aw_count + 1;
+                elsif not decided and aw_pop = '1' then
+                    aw_count <= aw_count - 1;
+                end if;
+                if accept and aw_pop /= '1' then
+                    aw_credits <= aw_credits + 1;
+                elsif not accept and aw_pop = '1' then
+                    aw_credits <= aw_credits - 1;
+                end if;
+            end if;
+        end if;
+    end process;
+
+    ------------------------------------------- write data channel -------------------------------------------
+    -- the beats of a denied burst are accepted and dropped, its response is queued after the last beat
+    w_forward <= '1' when w_route_count > 0 and w_route(w_route_head).forward = '1' else '0';
+    w_drop <= '1' when w_route_count > 0 and w_route(w_route_head).forward = '0' and b_local_count < C_FIFO_DEPTH else '0';
+    w_ready <= (w_forward and M_AXI_WREADY) or w_drop;
+    S_AXI_WREADY <= w_ready;
+
+    M_AXI_WDATA <= S_AXI_WDATA;
+    M_AXI_WSTRB <= S_AXI_WSTRB;
+    M_AXI_WLAST <= S_AXI_WLAST;
+    M_AXI_WUSER <= S_AXI_WUSER;
+    M_AXI_WVALID <= S_AXI_WVALID and w_forward;
+
+    ------------------------------------------- write response channel -------------------------------------------
+    -- a denied write is answered once the writes of its ID forwarded before it have been answered by the slave
+    b_local_valid <= '1' when b_local_count > 0 and w_outstanding(to_integer(unsigned(b_local(b_local_head)))) = 0 else '0';
+
+    -- the slave responses have priority, the selected source is kept until the handshake
+    b_select <= b_owner when b_owner /= NONE else
+                SLAVE when M_AXI_BVALID = '1' else
+                LOCAL when b_local_valid = '1' else
+                NONE;
+    b_valid <= M_AXI_BVALID when b_select = SLAVE else
+               b_local_valid when b_select = LOCAL else
+               '0';
+
+    S_AXI_BVALID <= b_valid;
+    S_AXI_BID <= M_AXI_BID when b_select = SLAVE else b_local(b_local_head);
+    S_AXI_BRESP <= M_AXI_BRESP when b_select = SLAVE else C_DENY_RESP;
+    S_AXI_BUSER <= M_AXI_BUSER when b_select = SLAVE else (others => '0');
+    M_AXI_BREADY <= S_AXI_BREADY when b_select = SLAVE else '0';
+
+    process (S_AXI_ACLK)
+        variable outstanding : CounterArrayType;
+        variable denied : CounterArrayType;
+        variable denied_total : natural range 0 to C_FIFO_DEPTH;
+        variable id : natural range 0 to 2**C_S_AXI_ID_WIDTH-1;
+        variable route_push : boolean;
+        variable route_pop : boolean;
+        variable local_push : boolean;
+        variable local_pop : boolean;
+    begin
+        if rising_edge(S_AXI_ACLK) then
+            if reset = '1' then
+                w_route_head <= 0;
+                w_route_tail <= 0;
+                w_route_count <= 0;
+                b_local_head <= 0;
+                b_local_tail <= 0;
+                b_local_count <= 0;
+                b_owner <= NONE;
+                w_outstanding <= (others => 0);
+                w_denied <= (others => 0);
+                w_denied_total <= 0;
+            else
+                outstanding := w_outstanding;
+                denied := w_denied;
+                denied_total := w_denied_total;
+
+                -- route of the decided head of the write address FIFO
+                route_push := aw_pop = '1';
+                if route_push then
+                    id := to_integer(unsigned(aw_fifo(aw_head).id));
+                    w_route(w_route_tail) <= (aw_fifo(aw_head).allowed, aw_fifo(aw_head).id);
+                    w_route_tail <= (w_route_tail + 1) mod C_FIFO_DEPTH;
+                    if aw_fifo(aw_head).allowed = '1' then
+                        outstanding(id) := outstanding(id) + 1;
+                    else
+                        denied(id) := denied(id) + 1;
+                        denied_total := denied_total + 1;
+                    end if;
+                end if;
+
+                -- end of a data burst
+                route_pop := S_AXI_WVALID = '1' and w_ready = '1' and S_AXI_WLAST = '1';
+                local_push := route_pop and w_drop = '1';
+                if route_pop then
+                    w_route_head <= (w_route_head + 1) mod C_FIFO_DEPTH;
+                end if;
+                if local_push then
+                    b_local(b_local_tail) <= w_route(w_route_head).id;
+                    b_local_tail <= (b_local_tail + 1) mod C_FIFO_DEPTH;
+                end if;
+
+                if route_push and not route_pop then
+                    w_route_count <= w_route_count + 1;
+                elsif not route_push and route_pop then
+                    w_route_count <= w_route_count - 1;
+                end if;
+
+                -- responses
+                local_pop := false;
+                if b_valid = '1' and S_AXI_BREADY = '1' then
+                    b_owner <= NONE;
+                    if b_select = SLAVE then
+                        id := to_integer(unsigned(M_AXI_BID));
+                        outstanding(id) := outstanding(id) - 1;
+                    else
+                        id := to_integer(unsigned(b_local(b_local_head)));
+                        denied(id) := denied(id) - 1;
+                        denied_total := denied_total - 1;
+                        b_local_head <= (b_local_head + 1) mod C_FIFO_DEPTH;
+                        local_pop := true;
+                    end if;
+                elsif b_valid = '1' then
+                    b_owner <= b_select;
+                end if;
+
+                if local_push and not local_pop then
+                    b_local_count <= b_local_count + 1;
+                elsif not local_push and local_pop then
+                    b_local_count <= b_local_count - 1;
+                end if;
+
+                w_outstanding <= outstanding;
+                w_denied <= denied;
+                w_denied_total <= denied_total;
+            end if;
+        end if;
+    end process;
+
+    ------------------------------------------- read address channel -------------------------------------------
+    ar_ready <= '1' when ar_credits < C_FIFO_DEPTH and reset /= '1'{ready_guard} else '0';
+    S_AXI_ARREADY <= ar_ready;
+
+    -- an allowed read waits for the local responses of the denied reads of its ID so that the R bursts stay in order
+    ar_forward <= '1' when ar_count > 0 and ar_fifo(ar_head).allowed = '1'
+                           and r_denied(to_integer(unsigned(ar_fifo(ar_head).id))) = 0
+                           and r_outstanding(to_integer(unsigned(ar_fifo(ar_head).id))) < C_MAX_OUTSTANDING else '0';
+    ar_drop <= '1' when ar_count > 0 and ar_fifo(ar_head).allowed = '0' and r_local_count < C_FIFO_DEPTH else '0';
+    ar_pop <= (ar_forward and M_AXI_ARREADY) or ar_drop;
+
+    M_AXI_ARID <= ar_fifo(ar_head).id;
+    M_AXI_ARADDR <= ar_fifo(ar_head).addr;
+    M_AXI_ARLEN <= ar_fifo(ar_head).len;
+    M_AXI_ARSIZE <= ar_fifo(ar_head).size;
+    M_AXI_ARBURST <= ar_fifo(ar_head).burst;
+    M_AXI_ARLOCK <= ar_fifo(ar_head).lock;
+    M_AXI_ARCACHE <= ar_fifo(ar_head).cache;
+    M_AXI_ARPROT <= ar_fifo(ar_head).prot;
+    M_AXI_ARQOS <= ar_fifo(ar_head).qos;
+    M_AXI_ARREGION <= ar_fifo(ar_head).region;
+    M_AXI_ARUSER <= ar_fifo(ar_head).user;
+    M_AXI_ARVALID <= ar_forward;
+
+    process (S_AXI_ACLK)
+        variable entry : ReadAddressType;
+        variable accept : boolean;
+        variable decided : boolean;
+    begin
+        if rising_edge(S_AXI_ACLK) then
+            if reset = '1' then
+                ar_pipe_valid <= (others => '0');
+                ar_head <= 0;
+                ar_tail <= 0;
+                ar_count <= 0;
+                ar_credits <= 0;
+            else
+                accept := S_AXI_ARVALID = '1' and ar_ready = '1';
+                ar_pipe(0) <= (S_AXI_ARID, S_AXI_ARADDR, S_AXI_ARLEN, S_AXI_ARSIZE, S_AXI_ARBURST, S_AXI_ARLOCK,
+                               S_AXI_ARCACHE, S_AXI_ARPROT, S_AXI_ARQOS, S_AXI_ARREGION, S_AXI_ARUSER, '0');
+                if accept then
+                    ar_pipe_valid(0) <= '1';
+                else
+                    ar_pipe_valid(0) <= '0';
+                end if;
+                for i in 1 to C_DECISION_LATENCY-1 loop
+                    ar_pipe(i) <= ar_pipe(i-1);
+                    ar_pipe_valid(i) <= ar_pipe_valid(i-1);
+                end loop;
+
+                decided := ar_pipe_valid(C_DECISION_LATENCY-1) = '1';
+                if decided then
+                    entry := ar_pipe(C_DECISION_LATENCY-1);
+                    entry.allowed := read_decision;
+                    ar_fifo(ar_tail) <= entry;
+                    ar_tail <= (ar_tail + 1) mod C_FIFO_DEPTH;
+                end if;
+                if ar_pop = '1' then
+                    ar_head <= (ar_head + 1) mod C_FIFO_DEPTH;
+                end if;
+
+                if decided and ar_pop /= '1' then
+                    ar_count <= ar_count + 1;
+                elsif not decided and ar_pop = '1' then
+                    ar_count <= ar_count - 1;
+                end if;
+                if accept and ar_pop /= '1' then
+                    ar_credits <= ar_credits + 1;
+                elsif not accept and ar_pop = '1' then
+                    ar_credits <= ar_credits - 1;
+                end if;
+            end if;
+        end if;
+    end process;
+
+    ------------------------------------------- read data channel -------------------------------------------
+    -- a denied read is answered once the reads of its ID forwarded before it have been completed by the slave
+    r_local_valid <= '1' when r_local_count > 0 and r_outstanding(to_integer(unsigned(r_local(r_local_head).id))) = 0 else '0';
+    r_local_last <= '1' when r_beat = unsigned(r_local(r_local_head).len) else '0';
+
+    -- bursts are not interleaved : the selected source is kept until the last beat
+    r_select <= r_owner when r_owner /= NONE else
+                SLAVE when M_AXI_RVALID = '1' else
+                LOCAL when r_local_valid = '1' else
+                NONE;
+    r_valid <= M_AXI_RVALID when r_select = SLAVE else
+               r_local_valid when r_select = LOCAL else
+               '0';
+    r_last <= M_AXI_RLAST when r_select = SLAVE else r_local_last;
+
+    S_AXI_RVALID <= r_valid;
+    S_AXI_RID <= M_AXI_RID when r_select = SLAVE else r_local(r_local_head).id;
+    S_AXI_RDATA <= M_AXI_RDATA when r_select = SLAVE else (others => '0');
+    S_AXI_RRESP <= M_AXI_RRESP when r_select = SLAVE else C_DENY_RESP;
+    S_AXI_RLAST <= r_last;
+    S_AXI_RUSER <= M_AXI_RUSER when r_select = SLAVE else (others => '0');
+    M_AXI_RREADY <= S_AXI_RREADY when r_select = SLAVE else '0';
+
+    process (S_AXI_ACLK)
+        variable outstanding : CounterArrayType;
+        variable denied : CounterArrayType;
+        variable id : natural range 0 to 2**C_S_AXI_ID_WIDTH-1;
+        variable local_push : boolean;
+        variable local_pop : boolean;
+    begin
+        if rising_edge(S_AXI_ACLK) then
+            if reset = '1' then
+                r_local_head <= 0;
+                r_local_tail <= 0;
+                r_local_count <= 0;
+                r_beat <= (others => '0');
+                r_owner <= NONE;
+                r_outstanding <= (others => 0);
+                r_denied <= (others => 0);
+            else
+                outstanding := r_outstanding;
+                denied := r_denied;
+
+                local_push := ar_pop = '1' and ar_fifo(ar_head).allowed = '0';
+                if ar_pop = '1' then
+                    id := to_integer(unsigned(ar_fifo(ar_head).id));
+                    if ar_fifo(ar_head).allowed = '1' then
+                        outstanding(id) := outstanding(id) + 1;
+                    else
+                        denied(id) := denied(id) + 1;
+                        r_local(r_local_tail) <= (ar_fifo(ar_head).id, ar_fifo(ar_head).len);
+                        r_local_tail <= (r_local_tail + 1) mod C_FIFO_DEPTH;
+                    end if;
+                end if;
+
+                local_pop := false;
+                if r_valid = '1' and S_AXI_RREADY = '1' then
+                    if r_last = '1' then
+                        r_owner <= NONE;
+                    else
+                        r_owner <= r_select;
+                    end if;
+                    if r_select = SLAVE then
+                        if M_AXI_RLAST = '1' then
+                            id := to_integer(unsigned(M_AXI_RID));
+                            outstanding(id) := outstanding(id) - 1;
+                        end if;
+                    elsif r_local_last = '1' then
+                        id := to_integer(unsigned(r_local(r_local_head).id));
+                        denied(id) := denied(id) - 1;
+                        r_local_head <= (r_local_head + 1) mod C_FIFO_DEPTH;
+                        r_beat <= (others => '0');
+                        local_pop := true;
+                    else
+                        r_beat <= r_beat + 1;
+                    end if;
+                elsif r_valid = '1' then
+                    r_owner <= r_select;
+                end if;
+
+                if local_push and not local_pop then
+                    r_local_count <= r_local_count + 1;
+                elsif not local_push and local_pop then
+                    r_local_count <= r_local_count - 1;
+                end if;
+
+                r_outstanding <= outstanding;
+                r_denied <= denied;
+            end if;
+        end if;
+    end process;
+
+end architecture;
+"""
+
+ARCHITECTURES : list = ["scan", "interval", "bitmap", "bram"]
+
+# architectures that follow the rules written at run time, the interval one is compiled from a static rule file
+AUTO_ARCHITECTURES : list = ["scan", "bitmap"]
+
+def clog2(n : int):
+    return math.ceil(math.log2(n)) if n > 1 else 0
+
+def equality_levels(bits : int):
+    # XNOR of each bit then AND tree
+    return 1 + clog2(bits)
+
+def magnitude_levels(bits : int):
+    # generate/propagate, prefix carry tree, final comparison
+    return 2 + clog2(bits)
+
+def napot_levels(bits : int):
+    # mask : prefix AND of the trailing ones then XOR, in parallel with the XOR of the address, AND NOT mask and NOR tree
+    return 1 + clog2(bits) + 1 + clog2(bits)
 
+def cost_model(MEM_DEPTH : int, MEM_WIDTH : int, pipeline_stages : int = 1, arch : str = "scan", rules_file = None,
+               cache_entries : int = 0, cache_policy : str = "fifo", cache_region_bits : int = 0, ports : int = 0, shadow_bank : bool = False,
+               slots_per_mid : int = 0, encoding : str = "range", rules_per_cycle : int = 1, scan_slots : int = 1):
+    """Analytical cost of the rule matching of the wrapper generate_vhdl() emits with these parameters.
+
+    Counts the equality and magnitude comparators (and their input bits), the storage bits, the depth of the
+    OR-reduction over the rules and the logic levels of the longest path between two registers, in 2-input gates.
+    area_units adds the storage bits and the comparator input bits. The AXI datapath is the same for every
+    architecture and is not counted. A NAPOT rule replaces the two magnitude comparators of a range by two
+    masked equalities (one per footprint end) of the region field. The block RAM bits of the bram architecture
+    are counted as storage bits like the registers, decisions_per_cycle is its throughput.
+    """
     ID_width : int = math.ceil(math.log2(MEM_DEPTH))
     rwx_width : int = 3
-    adress_width : int = math.ceil((MEM_WIDTH-ID_width-rwx_width)/2)
+    adress_width : int = rule_adress_width(MEM_WIDTH, ID_width, encoding)
+    lanes : int = 2 + ports
+
+    # one rule checked against one request : ID and rwx equalities, addr >= addr_min and addr_last < addr_max
+    # (or both ends in the NAPOT region), AND of the four
+    address_levels : int = napot_levels(adress_width+1) if encoding == "napot" else magnitude_levels(adress_width)
+    rule_levels : int = max(equality_levels(ID_width), equality_levels(rwx_width), address_levels) + 2
+    or_depth : int = clog2(MEM_DEPTH)
+    rules_bits : int = MEM_DEPTH*MEM_WIDTH*(2 if shadow_bank else 1)
+    reprogram_cycles : int = 1
+    decisions_per_cycle : float = 1
+
+    if arch == "interval":
+        if rules_file is not None:
+            from reference_model import decode_rules, build_interval_index
+            from rule_image import rule_words
+            index = build_interval_index(decode_rules(rule_words(rules_file, MEM_DEPTH, MEM_WIDTH), MEM_DEPTH, MEM_WIDTH, encoding))
+            longest : int = max([len(starts) for starts, _ in index.values()], default=1)
+        else:
+            longest : int = MEM_DEPTH
+        row_size : int = 2**clog2(longest)
+        search_steps : int = clog2(row_size)
+        equality : list = []
+        magnitude : list = [adress_width+1] * (2*(search_steps + 2))
+        storage_bits : int = 2 * 2**(ID_width+2) * row_size * (adress_width+1)
+        or_depth = 0
+        latency : int = 1
+        logic_levels : int = search_steps*(magnitude_levels(adress_width+1) + 1) + magnitude_levels(adress_width+1) + 1
+        reprogram_cycles = None
+    elif arch == "bitmap":
+        equality : list = []
+        magnitude : list = [adress_width+1]
+        # two copies of the bitmap (one per footprint end), plane_rule, pending_word, pending and plane_valid
+        storage_bits : int = 2*2**(ID_width+2+adress_width)*MEM_DEPTH + 2*MEM_DEPTH*MEM_WIDTH + 2*MEM_DEPTH
+        latency : int = 1
+        # word of each footprint end read from the bitmap, AND with the valid planes, OR of the rules
+        logic_levels : int = 1 + 2 + or_depth
+        reprogram_cycles = 2*2**adress_width + 2
+    elif arch == "bram":
+        # every scan compares both requests with the rules_per_cycle rules of the row read, then ORs them with its partial decision
+        rows, _, latency, _ = bram_scan_schedule(MEM_DEPTH, rules_per_cycle, scan_slots)
+        equality : list = [ID_width, rwx_width] * (2*rules_per_cycle*scan_slots)
+        magnitude : list = [adress_width] * (2*2*rules_per_cycle*scan_slots)
+        if encoding == "napot":
+            equality += [adress_width+1] * (2*2*rules_per_cycle*scan_slots)
+            magnitude = []
+        request_bits : int = 2*ID_width + 1 + 4*adress_width
+        storage_bits : int = rows*rules_per_cycle*MEM_WIDTH + rules_per_cycle*MEM_WIDTH + scan_slots*(request_bits + 3) + 2*clog2(rows)
+        or_depth = clog2(rules_per_cycle)
+        logic_levels : int = rule_levels + or_depth + 1
+        decisions_per_cycle = scan_slots / rows
+    else:
+        equality : list = [ID_width, rwx_width] * (MEM_DEPTH*lanes)
+        magnitude : list = [adress_width] * (2*MEM_DEPTH*lanes)
+        if encoding == "napot":
+            equality += [adress_width+1] * (2*MEM_DEPTH*lanes)
+            magnitude = []
+        storage_bits : int = rules_bits
+        latency : int = pipeline_stages
+        logic_levels : int = rule_levels + or_depth
+        if pipeline_stages > 1:
+            fan_in, sizes = or_tree_levels(MEM_DEPTH, pipeline_stages)
+            storage_bits += lanes*sum(sizes)
+            logic_levels = max(rule_levels, clog2(fan_in))
+        if slots_per_mid > 0:
+            # bank of the MID selected by a {2**ID_width}:1 multiplexer, no ID comparator, OR over the slots of the bank
+            equality = [rwx_width] * (slots_per_mid*lanes)
+            magnitude = [adress_width] * (2*slots_per_mid*lanes)
+            if encoding == "napot":
+                equality += [adress_width+1] * (2*slots_per_mid*lanes)
+                magnitude = []
+            storage_bits = 2**ID_width*slots_per_mid*MEM_WIDTH*(2 if shadow_bank else 1)
+            or_depth = clog2(slots_per_mid)
+            logic_levels = ID_width + max(equality_levels(rwx_width), address_levels) + 2 + or_depth
+        if cache_entries > 0:
+            # tag lookup in parallel with the scan, the hit then selects the decision; the last request of each lane
+            # is kept to count one lookup per request
+            tag_width : int = ID_width+1+adress_width-cache_region_bits
+            request_width : int = ID_width+1+2*adress_width
+            equality += [tag_width] * (lanes*cache_entries) + [request_width] * lanes
+            storage_bits += lanes*cache_entries*(tag_width+2) + 64 + lanes*(request_width+1)
+            if cache_policy == "lru":
+                storage_bits += lanes*cache_entries*clog2(cache_entries)
+            logic_levels = max(logic_levels, equality_levels(tag_width) + clog2(cache_entries)) + 1
+
+    return {
+        "arch"                  : arch,
+        "encoding"              : encoding,
+        "ID_width"              : ID_width,
+        "adress_width"          : adress_width,
+        "latency_cycles"        : latency,
+        "equality_comparators"  : len(equality),
+        "magnitude_comparators" : len(magnitude),
+        "comparator_bits"       : sum(equality) + sum(magnitude),
+        "storage_bits"          : storage_bits,
+        "or_depth"              : or_depth,
+        "logic_levels"          : logic_levels,
+        "area_units"            : storage_bits + sum(equality) + sum(magnitude),
+        "reprogram_cycles"      : reprogram_cycles,
+        "decisions_per_cycle"   : decisions_per_cycle,
+    }
+
+def select_architecture(MEM_DEPTH : int, MEM_WIDTH : int, target : str = "latency", max_storage_bits : int = 1 << 20, **options):
+    """Pick the rule matching architecture for a target with cost_model().
+
+    "latency" takes the fewest clock cycles then the fewest logic levels, "area" the fewest area units.
+    Architectures over max_storage_bits are left out, and only the scan supports the pipeline, the cache,
+    the extra ports, the shadow bank and the NAPOT encoding.
+    """
+    scan_only : bool = (options.get("pipeline_stages", 1) > 1 or options.get("cache_entries", 0) > 0 or options.get("ports", 0) > 0
+                        or options.get("shadow_bank", False) or options.get("slots_per_mid", 0) > 0 or options.get("encoding", "range") == "napot")
+    costs : list = [cost_model(MEM_DEPTH, MEM_WIDTH, arch=arch, **options) for arch in (["scan"] if scan_only else AUTO_ARCHITECTURES)]
+    costs = [cost for cost in costs if cost["arch"] == "scan" or cost["storage_bits"] <= max_storage_bits]
+    if target == "area":
+        return min(costs, key=lambda cost: (cost["area_units"], cost["logic_levels"]))["arch"]
+    return min(costs, key=lambda cost: (cost["latency_cycles"], cost["logic_levels"], cost["area_units"]))["arch"]
+
+def test_bench_timing(MEM_DEPTH : int, cost : dict, pipeline_stages : int = 1, rules_per_cycle : int = 1, scan_slots : int = 1):
+    """Return the --latency and --settle_cycles of the test bench of a design, cost is its cost_model().
+
+    The bram architecture answers a request held without handshake within its hold latency, see bram_scan_schedule(),
+    and the bitmap one redraws the rules written together one after the other before answering them.
+    """
+    latency : int = cost["latency_cycles"]
+    if cost["arch"] == "bram":
+        latency = bram_scan_schedule(MEM_DEPTH, rules_per_cycle, scan_slots)[3]
+    settle_cycles : int = MEM_DEPTH*cost["reprogram_cycles"] if cost["arch"] == "bitmap" else 0
+    return latency, settle_cycles
+
+def validate_options(MEM_DEPTH : int, arch : str = "scan", pipeline_stages : int = 1, rules_file = None, cache_entries : int = 0,
+                     cache_policy : str = "fifo", cache_region_bits : int = 0, ports : int = 0, shadow_bank : bool = False,
+                     slots_per_mid : int = 0, encoding : str = "range", rules_per_cycle : int = 1, scan_slots : int = 1):
+    """Raise ValueError when render_vhdl() cannot generate this combination of options, arch is the chosen architecture, not "auto"."""
+
+    if arch not in ARCHITECTURES:
+        raise ValueError(f"unknown architecture {arch}, choose one of {', '.join(ARCHITECTURES)}")
+    if encoding not in ENCODINGS:
+        raise ValueError(f"unknown rule encoding {encoding}, choose one of {', '.join(ENCODINGS)}")
+    if cache_policy not in ("fifo", "lru"):
+        raise ValueError(f"unknown cache replacement policy {cache_policy}, choose fifo or lru")
+    if pipeline_stages < 1:
+        raise ValueError("the number of pipeline stages must be at least 1")
+    if arch != "scan" and pipeline_stages > 1:
+        raise ValueError(f"the {arch} architecture is not pipelined")
+    if cache_entries < 0 or cache_region_bits < 0:
+        raise ValueError("the number of cache entries and of cache region bits cannot be negative")
+    if cache_entries > 0 and (arch != "scan" or pipeline_stages > 1):
+        raise ValueError("the decision cache is only available in front of the single cycle scan architecture")
+    if shadow_bank and (arch != "scan" or cache_entries > 0):
+        raise ValueError("the shadow rule bank is only available with the scan architecture, pipelined or not, without decision cache")
+    if ports < 0:
+        raise ValueError("the number of extra request ports cannot be negative")
+    if ports > 0 and (arch != "scan" or pipeline_stages > 1 or cache_entries > 0):
+        raise ValueError("the extra request ports are only available with the single cycle scan architecture, without decision cache")
+    if slots_per_mid < 0 or slots_per_mid & (slots_per_mid - 1):
+        raise ValueError("the number of slots per MID must be a power of two (or 0 for no partitioning)")
+    if slots_per_mid > 0 and (arch != "scan" or pipeline_stages > 1 or cache_entries > 0 or ports > 0):
+        raise ValueError("the per-MID rule banks are only available with the single cycle scan architecture, without cache or extra ports")
+    if encoding == "napot" and arch == "bitmap":
+        raise ValueError("the NAPOT encoding is not available with the bitmap architecture, which draws addr_min to addr_max ranges")
+    if arch == "interval" and rules_file is None:
+        raise ValueError("the interval architecture is compiled from a static rule file, give rules_file")
+    if rules_per_cycle < 1 or rules_per_cycle & (rules_per_cycle - 1) or rules_per_cycle > MEM_DEPTH:
+        raise ValueError("the number of rules per cycle must be a power of two no larger than the memory depth")
+    if not 1 <= scan_slots <= math.ceil(MEM_DEPTH / rules_per_cycle):
+        raise ValueError("the number of scan slots must be between 1 and the number of rows of the rule RAMs (MEM_DEPTH/rules_per_cycle)")
+
+def render_vhdl(MEM_DEPTH : int, MEM_WIDTH : int, pipeline_stages : int = 1, arch : str = "scan", rules_file = None,
+                cache_entries : int = 0, cache_policy : str = "fifo", cache_region_bits : int = 0, ports : int = 0,
+                shadow_bank : bool = False, target : str = "latency", slots_per_mid : int = 0, encoding : str = "range",
+                rules_per_cycle : int = 1, scan_slots : int = 1):
+    """Return rules_array.vhd, wrapper.vhd and interface_AXI.vhd ({file name: VHDL}) and the cost_model() of the rule matching.
+
+    Nothing is written and no global state is used, so configurations can be rendered concurrently. The interval
+    architecture compiles rules_file, a rule image path or the rule words themselves (see rule_image.rule_words()).
+    arch "auto" picks the architecture for target ("latency" or "area") with select_architecture().
+    Unsupported combinations of options raise ValueError, see validate_options().
+    slots_per_mid > 0 (a power of two) partitions the rules array of the scan in one bank per MID.
+    encoding "napot" reads the address field of the rules as one NAPOT region instead of addr_min and addr_max,
+    see reference_model.napot_range(); it is not available with the bitmap architecture.
+    arch "bram" keeps the rules in block RAMs scanned rules_per_cycle (a power of two) rules per clock cycle,
+    with scan_slots scans in flight, see bram_scan_schedule().
+    """
+
+    options : dict = {"pipeline_stages": pipeline_stages, "rules_file": rules_file, "cache_entries": cache_entries, "cache_policy": cache_policy,
+                      "cache_region_bits": cache_region_bits, "ports": ports, "shadow_bank": shadow_bank, "slots_per_mid": slots_per_mid,
+                      "encoding": encoding, "rules_per_cycle": rules_per_cycle, "scan_slots": scan_slots}
+    if arch == "auto":
+        arch = select_architecture(MEM_DEPTH, MEM_WIDTH, target, **options)
+    validate_options(MEM_DEPTH, arch, **options)
+
+    ID_width : int = math.ceil(math.log2(MEM_DEPTH))
+    rwx_width : int = 3
+    adress_width : int = rule_adress_width(MEM_WIDTH, ID_width, encoding)
+    address_variables, address_slicing = address_field_strings(MEM_WIDTH, ID_width, adress_width, encoding)
+
+    # clock cycles between an address and the wrapper decision, the AXI datapath delays the transaction by as much
+    decision_latency : int = pipeline_stages if arch == "scan" else 1
+    if arch == "bram":
+        decision_latency = bram_scan_schedule(MEM_DEPTH, rules_per_cycle, scan_slots)[2]
+
+    # cells of the rules array and width of rule_number : MID & slot when the rules are partitioned per MID
+    rules_depth : int = 2**ID_width*slots_per_mid if slots_per_mid > 0 else MEM_DEPTH
+    rule_number_width : int = math.ceil(math.log2(rules_depth))
+
+    # optional ports added to the wrapper entity, to the interface_AXI entity and to the wrapper port map
+    wrapper_ports : str = ""
+    interface_ports : str = ""
+    port_map : str = ""
+    if cache_entries > 0:
+        wrapper_ports += """;
+        -- decision cache statistics
+        cache_hits      : out std_logic_vector(31 DOWNTO 0);
+        cache_misses    : out std_logic_vector(31 DOWNTO 0)"""
+        interface_ports += """        cache_hits              : out std_logic_vector(31 downto 0); -- Number of decisions answered by the cache
+        cache_misses            : out std_logic_vector(31 downto 0); -- Number of decisions answered by the rules array
+"""
+        port_map += """,
+        cache_hits => cache_hits,
+        cache_misses => cache_misses"""
+
+    if arch == "bram":
+        wrapper_ports += """;
+        -- the requests are sampled at the next rising edge
+        request_ready   : out std_logic"""
+
+    # double-buffered rules : w_rule_enable writes the shadow bank, bank_swap makes it the active bank in one cycle
+    rules_guard, swap_map = shadow_bank_strings(shadow_bank)
+    rules_array_ports : str = ""
+    if shadow_bank:
+        wrapper_ports += """;
+        -- copy the shadow rule bank into the active one
+        bank_swap   : in std_logic"""
+        interface_ports += """        bank_swap          : in std_logic := '0'; -- Makes the shadow rule bank, written through data_rule, the active one
+"""
+        port_map += """,
+        bank_swap => bank_swap"""
+        rules_array_ports = """
+        swap        : in std_logic;"""
+
+    # extra request lanes checked against the same rules array, port p uses the slice p of each vector
+    port_variables : str = ""
+    port_clear : str = ""
+    port_checks : str = ""
+    port_responses : str = ""
+    port_disabled : str = ""
+    if ports > 0:
+        wrapper_ports += f""";
+        -- {ports} extra request lanes : MID, lane ('1' read, '0' write), x_enable and address of each port
+        port_MID    : in std_logic_vector({ports*ID_width-1} DOWNTO 0);
+        port_read   : in std_logic_vector({ports-1} DOWNTO 0);
+        port_x      : in std_logic_vector({ports-1} DOWNTO 0);
+        port_addr   : in std_logic_vector({ports*adress_width-1} DOWNTO 0);
+        port_response : out std_logic_vector({ports-1} DOWNTO 0) := (others => '0')"""
+        interface_ports += f"""        port_MID           : in std_logic_vector({ports*ID_width-1} downto 0) := (others => '0'); -- MID of each extra request port
+        port_read          : in std_logic_vector({ports-1} downto 0) := (others => '0'); -- '1' for a read, '0' for a write
+        port_x             : in std_logic_vector({ports-1} downto 0) := (others => '0'); -- x_enable of each extra request port
+        port_addr          : in std_logic_vector({ports*adress_width-1} downto 0) := (others => '0'); -- Address of each extra request port
+        port_response      : out std_logic_vector({ports-1} downto 0); -- Decision of each extra request port
+"""
+        port_map += """,
+        port_MID => port_MID,
+        port_read => port_read,
+        port_x => port_x,
+        port_addr => port_addr,
+        port_response => port_response"""
+        port_address : str = f"port_addr(p*{adress_width}+{adress_width-1} DOWNTO p*{adress_width})"
+        port_variables = f"""        variable res_p : std_logic_vector({ports-1} DOWNTO 0) := (others => '0');
+"""
+        port_clear = """                res_p := (others => '0');
+"""
+        port_checks = f"""                    for p in 0 to {ports-1} loop
+                        if field_id = port_MID(p*{ID_width}+{ID_width-1} DOWNTO p*{ID_width}) AND field_rwx = (port_read(p) & NOT port_read(p) & port_x(p))
+                           AND {address_match(port_address, port_address, encoding)} then
+                            res_p(p) := '1';
+                        end if;
+                    end loop;
+"""
+        port_responses = """                port_response <= res_p;
+"""
+        port_disabled = """                port_response <= (others => '0');
+"""
 
     ################################################## Files names ##################################################
 
@@ -21,11 +1906,40 @@ def generate_vhdl(MEM_DEPTH : int, MEM_WIDTH : int):
 
     rules_array : str = f"""library ieee;
 use ieee.std_logic_1164.all;
+use std.textio.all;
 
 package Memory_type is
-    type MemoryArrayType is array (0 to {MEM_DEPTH-1}) of std_logic_vector({MEM_WIDTH-1} DOWNTO 0);
+    type MemoryArrayType is array (0 to {rules_depth-1}) of std_logic_vector({MEM_WIDTH-1} DOWNTO 0);
+    -- rules of a rule image file : one line of {MEM_WIDTH} '0'/'1' per rule in rule_number order, the missing rules are zeros,
+    -- an empty file name gives an empty rules array
+    impure function load_rule_image(file_name : string) return MemoryArrayType;
 end package Memory_type;
 
+package body Memory_type is
+
+    impure function load_rule_image(file_name : string) return MemoryArrayType is
+        file image : text;
+        variable image_line : line;
+        variable word : bit_vector({MEM_WIDTH-1} DOWNTO 0);
+        variable rules : MemoryArrayType := (others => (others => '0'));
+        variable i : natural := 0;
+    begin
+        if file_name'length = 0 then
+            return rules;
+        end if;
+        file_open(image, file_name, read_mode);
+        while not endfile(image) and i < {rules_depth} loop
+            readline(image, image_line);
+            read(image_line, word);
+            rules(i) := to_stdlogicvector(word);
+            i := i + 1;
+        end loop;
+        file_close(image);
+        return rules;
+    end function;
+
+end package body Memory_type;
+
 ----------------------------------------------------------------------------------------------------
 
 library ieee;
@@ -34,26 +1948,66 @@ use ieee.numeric_std.all;
 use work.Memory_type.all;
 
 entity {rules_array_file_name} is
+    generic(
+        -- rule image loaded at elaboration and restored by reset, see load_rule_image
+        INIT_FILE   : string := ""
+    );
     port(
         clk         : in std_logic;
         reset       : in std_logic;
-        rule_number : in std_logic_vector({ID_width-1} DOWNTO 0);
+        rule_number : in std_logic_vector({rule_number_width-1} DOWNTO 0);
         w_enable    : in std_logic;
-        data_in     : in std_logic_vector({MEM_WIDTH - 1} DOWNTO 0);
+        data_in     : in std_logic_vector({MEM_WIDTH - 1} DOWNTO 0);{rules_array_ports}
 
         data_out    : out MemoryArrayType
     );
 end {rules_array_file_name};
 
+"""
+    if shadow_bank:
+        rules_array += f"""-- double-buffered rules : w_enable writes the shadow bank while data_out keeps showing the active one,
+-- swap copies the shadow bank (with the rule written in the same cycle) into the active bank
 architecture {rules_array_file_name}_rtl of {rules_array_file_name} is
-    signal memory_array : MemoryArrayType := (others => (others => '0') );
+    constant INIT_RULES : MemoryArrayType := load_rule_image(INIT_FILE);
+    signal memory_array : MemoryArrayType := INIT_RULES;
+    signal shadow_array : MemoryArrayType := INIT_RULES;
+begin
+
+    process(CLK)
+        variable shadow : MemoryArrayType;
+    begin
+        if rising_edge(CLK) then
+            if RESET = '1' then
+                memory_array <= INIT_RULES;
+                shadow_array <= INIT_RULES;
+            else
+                shadow := shadow_array;
+                if w_enable = '1' then
+                    shadow(to_integer(unsigned(rule_number))) := data_in;
+                end if;
+                shadow_array <= shadow;
+                if swap = '1' then
+                    memory_array <= shadow;
+                end if;
+            end if;
+        end if;
+    end process;
+
+    data_out <= memory_array;
+
+end architecture;
+"""
+    else:
+        rules_array += f"""architecture {rules_array_file_name}_rtl of {rules_array_file_name} is
+    constant INIT_RULES : MemoryArrayType := load_rule_image(INIT_FILE);
+    signal memory_array : MemoryArrayType := INIT_RULES;
 begin
 
     process(CLK)
     begin
         if rising_edge(CLK) then
             if RESET = '1' then
-                memory_array <= (others => (others => '0'));
+                memory_array <= INIT_RULES;
             else
                 if w_enable = '1' then
                     memory_array(to_integer(unsigned(rule_number))) <= data_in;
@@ -74,75 +2028,94 @@ use ieee.numeric_std.all;
 use work.Memory_type.all;
 
 entity {wrapper_file_name} is
-
+    generic (
+        -- rule image the rules start from, see load_rule_image in rules_array.vhd
+        INIT_FILE : string := ""
+    );
     port (
         clk     : in std_logic;
         reset   : in std_logic;
         -- for rules array
         w_rule_enable   : in std_logic;
         data_rule       : in std_logic_vector({MEM_WIDTH-1} downto 0);
-        rule_number     : in std_logic_vector({rwx_width-1} downto 0);
+        rule_number     : in std_logic_vector({rule_number_width-1} downto 0);
         -- for wrapper
-        MID_W   : in std_logic_vector({rwx_width-1} DOWNTO 0);
-        MID_R   : in std_logic_vector({rwx_width-1} DOWNTO 0);
+        MID_W   : in std_logic_vector({ID_width-1} DOWNTO 0);
+        MID_R   : in std_logic_vector({ID_width-1} DOWNTO 0);
         x_enable : in std_logic;
         addr_w  : in std_logic_vector({adress_width-1} DOWNTO 0);
         addr_r  : in std_logic_vector({adress_width-1} DOWNTO 0);
+        -- highest address of the burst footprint starting at addr_w / addr_r, a request is allowed when one rule contains the footprint
+        addr_w_last : in std_logic_vector({adress_width-1} DOWNTO 0);
+        addr_r_last : in std_logic_vector({adress_width-1} DOWNTO 0);
         -- output
         wrapper_write_response  : out std_logic := '0';
-        wrapper_read_response   : out std_logic := '0'
+        wrapper_read_response   : out std_logic := '0'{wrapper_ports}
     );
 end {wrapper_file_name};
 
 
-architecture {wrapper_file_name}_rtl of {wrapper_file_name} is
+"""
+    if arch == "interval":
+        wrapper += interval_wrapper_architecture(MEM_DEPTH, MEM_WIDTH, rules_file, wrapper_file_name, encoding)
+    elif arch == "bitmap":
+        wrapper += bitmap_wrapper_architecture(MEM_DEPTH, MEM_WIDTH, wrapper_file_name)
+    elif arch == "bram":
+        wrapper += bram_wrapper_architecture(MEM_DEPTH, MEM_WIDTH, rules_per_cycle, scan_slots, wrapper_file_name, encoding)
+    elif cache_entries > 0:
+        wrapper += cached_wrapper_architecture(MEM_DEPTH, MEM_WIDTH, cache_entries, cache_policy, cache_region_bits, wrapper_file_name, rules_array_file_name, encoding)
+    elif slots_per_mid > 0:
+        wrapper += partitioned_wrapper_architecture(MEM_DEPTH, MEM_WIDTH, slots_per_mid, wrapper_file_name, rules_array_file_name, shadow_bank, encoding)
+    elif pipeline_stages > 1:
+        wrapper += pipelined_wrapper_architecture(MEM_DEPTH, MEM_WIDTH, pipeline_stages, wrapper_file_name, rules_array_file_name, shadow_bank, encoding)
+    else:
+        wrapper += f"""architecture {wrapper_file_name}_rtl of {wrapper_file_name} is
         signal rules_array : MemoryArrayType;
 begin
 
     -- instance of memory for rules
     {rules_array_file_name}_inst: entity work.{rules_array_file_name}
+     generic map(
+        INIT_FILE => INIT_FILE
+    )
      port map(
         CLK => clk,
         RESET => reset,
         rule_number => rule_number,
         w_enable => w_rule_enable,
         data_in => data_rule,
-        data_out => rules_array
+        data_out => rules_array{swap_map}
     );
 
     -- process to check whether the master who requested the has the right to write or to read
     process (clk)
         variable res_w : std_logic := '0';
         variable res_r : std_logic := '0';
-        
+{port_variables}        
         variable field_id : std_logic_vector({ID_width-1} DOWNTO 0);
         variable field_rwx : std_logic_vector({rwx_width-1} DOWNTO 0);
-        variable field_addr_min : std_logic_vector( {adress_width - 1} DOWNTO 0);
-        variable field_addr_max : std_logic_vector( {adress_width - 1} DOWNTO 0);
-        
+{address_variables}        
     begin
         if rising_edge(clk) then
-            if w_rule_enable /= '1' then
+            if {rules_guard} then
                 res_w := '0';
                 res_r := '0';    
-                myloop:for i in 0 to {MEM_DEPTH-1} loop
+{port_clear}                myloop:for i in 0 to {MEM_DEPTH-1} loop
                     field_id := rules_array(i)({MEM_WIDTH-1} DOWNTO {MEM_WIDTH-ID_width});
                     field_rwx := rules_array(i)({MEM_WIDTH-ID_width-1} DOWNTO {MEM_WIDTH-ID_width-rwx_width});
-                    field_addr_min := rules_array(i)({MEM_WIDTH-ID_width-rwx_width-1} DOWNTO {MEM_WIDTH-ID_width-rwx_width-adress_width});
-                    field_addr_max := rules_array(i)({MEM_WIDTH-ID_width-rwx_width-adress_width-1} DOWNTO 0);
-                    if field_id = MID_W AND field_rwx = ("01" & x_enable) AND addr_w >= field_addr_min AND addr_w < field_addr_max then
+{address_slicing}                    if field_id = MID_W AND field_rwx = ("01" & x_enable) AND {address_match("addr_w", "addr_w_last", encoding)} then
                         res_w := '1';
                     end if;
-                    if field_id = MID_R AND field_rwx = ("10" & x_enable) AND addr_r >= field_addr_min AND addr_r < field_addr_max then
+                    if field_id = MID_R AND field_rwx = ("10" & x_enable) AND {address_match("addr_r", "addr_r_last", encoding)} then
                         res_r := '1';
                     end if;
-                end loop;
+{port_checks}                end loop;
                 wrapper_write_response <= res_w;
                 wrapper_read_response <= res_r;
-            else
+{port_responses}            else
                 wrapper_write_response <= '0';
                 wrapper_read_response <= '0';
-            end if;
+{port_disabled}            end if;
         end if;
     end process;
 
@@ -171,11 +2144,22 @@ entity {interface_AXI_file_name} is
         C_S_AXI_RUSER_WIDTH    : integer := 0;
         C_S_AXI_BUSER_WIDTH    : integer := 0;
 
-        C_MASTER_ID_WIDTH      : integer := 3
+        C_MASTER_ID_WIDTH      : integer := {ID_width};
+
+        -- Clock cycles between an address and the wrapper decision
+        C_DECISION_LATENCY     : integer := {decision_latency};
+        -- Depth of the address, write route and local response FIFOs, at least C_DECISION_LATENCY+2 for one address per cycle
+        C_FIFO_DEPTH           : integer := {decision_latency+2};
+        -- Transactions forwarded to the protected slave per ID
+        C_MAX_OUTSTANDING      : integer := 255;
+        -- Response of a denied transaction, SLVERR ("10") or DECERR ("11")
+        C_DENY_RESP            : std_logic_vector(1 downto 0) := "10";
+        -- Rule image loaded into the rules at elaboration and restored by reset, empty for no preloaded rules
+        C_RULES_INIT_FILE      : string := ""
     );
     port(
         -- Memory configuration
-        rule_number        : in std_logic_vector({ID_width-1} downto 0);
+        rule_number        : in std_logic_vector({rule_number_width-1} downto 0);
         data_rule          : in std_logic_vector({MEM_WIDTH-1} downto 0);
         w_rule_enable      : in std_logic; -- Signal to indicate that a rule is being written into memory
 
@@ -188,7 +2172,7 @@ entity {interface_AXI_file_name} is
         -- Signals for the responses
         wrapper_write_response  : out std_logic;
         wrapper_read_response   : out std_logic;
-
+{interface_ports}
         ------------------------------------------- AXI signals -------------------------------------------
         -- Clock
         S_AXI_ACLK        : in std_logic;
@@ -257,52 +2241,136 @@ entity {interface_AXI_file_name} is
         S_AXI_RRESP       : out std_logic_vector(1 downto 0); -- Read response code (OKAY, EXOKAY, SLVERR, DECERR)
         S_AXI_RLAST       : out std_logic; -- Indicates the last data transfer in a read burst
         S_AXI_RUSER       : out std_logic_vector(C_S_AXI_RUSER_WIDTH-1 downto 0); -- Additional user signals 
-        S_AXI_RVALID      : out std_logic  -- Indicates that the read data is valid
-    );
-end {interface_AXI_file_name};
+        S_AXI_RVALID      : out std_logic; -- Indicates that the read data is valid
 
-architecture {interface_AXI_file_name}_arch of {interface_AXI_file_name} is
+        -- Firewall to protected slave signals, only the allowed transactions are forwarded
 
-begin
+        -- Write address and control channels
+        M_AXI_AWID        : out std_logic_vector(C_S_AXI_ID_WIDTH-1 downto 0);
+        M_AXI_AWADDR      : out std_logic_vector(C_S_AXI_ADDR_WIDTH-1 downto 0);
+        M_AXI_AWLEN       : out std_logic_vector(7 downto 0);
+        M_AXI_AWSIZE      : out std_logic_vector(2 downto 0);
+        M_AXI_AWBURST     : out std_logic_vector(1 downto 0);
+        M_AXI_AWLOCK      : out std_logic;
+        M_AXI_AWCACHE     : out std_logic_vector(3 downto 0);
+        M_AXI_AWPROT      : out std_logic_vector(2 downto 0);
+        M_AXI_AWQOS       : out std_logic_vector(3 downto 0);
+        M_AXI_AWREGION    : out std_logic_vector(3 downto 0);
+        M_AXI_AWUSER      : out std_logic_vector(C_S_AXI_AWUSER_WIDTH-1 downto 0);
+        M_AXI_AWVALID     : out std_logic;
+        M_AXI_AWREADY     : in std_logic := '0';
 
-    {wrapper_file_name}_inst: entity work.{wrapper_file_name}
-     port map(
-        clk => S_AXI_ACLK,
-        reset => S_AXI_ARESETN,
-        w_rule_enable => w_rule_enable,
-        data_rule => data_rule,
-        rule_number => rule_number,
-        MID_W => MID_W,
-        MID_R => MID_R,
-        x_enable => x_enable,
-        addr_w => S_AXI_AWADDR,
-        addr_r => S_AXI_ARADDR,
-        wrapper_write_response => wrapper_write_response,
-        wrapper_read_response => wrapper_read_response
+        -- Write data and control channels
+        M_AXI_WDATA       : out std_logic_vector(C_S_AXI_DATA_WIDTH-1 downto 0);
+        M_AXI_WSTRB       : out std_logic_vector((C_S_AXI_DATA_WIDTH/8)-1 downto 0);
+        M_AXI_WLAST       : out std_logic;
+        M_AXI_WUSER       : out std_logic_vector(C_S_AXI_WUSER_WIDTH-1 downto 0);
+        M_AXI_WVALID      : out std_logic;
+        M_AXI_WREADY      : in std_logic := '0';
+
+        -- Write response from the protected slave
+        M_AXI_BID         : in std_logic_vector(C_S_AXI_ID_WIDTH-1 downto 0) := (others => '0');
+        M_AXI_BRESP       : in std_logic_vector(1 downto 0) := "00";
+        M_AXI_BUSER       : in std_logic_vector(C_S_AXI_BUSER_WIDTH-1 downto 0) := (others => '0');
+        M_AXI_BVALID      : in std_logic := '0';
+        M_AXI_BREADY      : out std_logic;
+
+        -- Read address and control channels
+        M_AXI_ARID        : out std_logic_vector(C_S_AXI_ID_WIDTH-1 downto 0);
+        M_AXI_ARADDR      : out std_logic_vector(C_S_AXI_ADDR_WIDTH-1 downto 0);
+        M_AXI_ARLEN       : out std_logic_vector(7 downto 0);
+        M_AXI_ARSIZE      : out std_logic_vector(2 downto 0);
+        M_AXI_ARBURST     : out std_logic_vector(1 downto 0);
+        M_AXI_ARLOCK      : out std_logic;
+        M_AXI_ARCACHE     : out std_logic_vector(3 downto 0);
+        M_AXI_ARPROT      : out std_logic_vector(2 downto 0);
+        M_AXI_ARQOS       : out std_logic_vector(3 downto 0);
+        M_AXI_ARREGION    : out std_logic_vector(3 downto 0);
+        M_AXI_ARUSER      : out std_logic_vector(C_S_AXI_ARUSER_WIDTH-1 downto 0);
+        M_AXI_ARVALID     : out std_logic;
+        M_AXI_ARREADY     : in std_logic := '0';
+
+        -- Read data from the protected slave
+        M_AXI_RID         : in std_logic_vector(C_S_AXI_ID_WIDTH-1 downto 0) := (others => '0');
+        M_AXI_RDATA       : in std_logic_vector(C_S_AXI_DATA_WIDTH-1 downto 0) := (others => '0');
+        M_AXI_RRESP       : in std_logic_vector(1 downto 0) := "00";
+        M_AXI_RLAST       : in std_logic := '0';
+        M_AXI_RUSER       : in std_logic_vector(C_S_AXI_RUSER_WIDTH-1 downto 0) := (others => '0');
+        M_AXI_RVALID      : in std_logic := '0';
+        M_AXI_RREADY      : out std_logic
     );
+end {interface_AXI_file_name};
 
-end architecture;
 """
+    interface_AXI += axi_datapath_architecture(interface_AXI_file_name, wrapper_file_name, port_map, arch == "bram")
     ######################################################################################Génération###########################
 
-    with open(f"{rules_array_file_name}.vhd", 'w') as f:
-        f.write(rules_array)
+    files : dict = {f"{rules_array_file_name}.vhd": rules_array, f"{wrapper_file_name}.vhd": wrapper, f"{interface_AXI_file_name}.vhd": interface_AXI}
+    return files, cost_model(MEM_DEPTH, MEM_WIDTH, arch=arch, **options)
+
+def generate_vhdl(MEM_DEPTH : int, MEM_WIDTH : int, pipeline_stages : int = 1, arch : str = "scan", rules_file = None,
+                  cache_entries : int = 0, cache_policy : str = "fifo", cache_region_bits : int = 0, ports : int = 0,
+                  shadow_bank : bool = False, target : str = "latency", slots_per_mid : int = 0, encoding : str = "range",
+                  rules_per_cycle : int = 1, scan_slots : int = 1, output_dir : str = "."):
+    """Write the files of render_vhdl() to output_dir and return the cost_model() of the rule matching.
 
-    with open(f"{wrapper_file_name}.vhd", 'w') as f:
-        f.write(wrapper)
+    The generation manifest is kept in output_dir, give each concurrent generation its own directory. It also records
+    the latency and settle cycles of the test bench of the design, see test_bench_timing().
+    """
+    files, cost = render_vhdl(MEM_DEPTH, MEM_WIDTH, pipeline_stages, arch, rules_file, cache_entries, cache_policy, cache_region_bits,
+                              ports, shadow_bank, target, slots_per_mid, encoding, rules_per_cycle, scan_slots)
 
-    with open(f"{interface_AXI_file_name}.vhd", 'w') as f:
-        f.write(interface_AXI)
+    # unchanged files are not rewritten so that only the changed ones are analysed again
+    outputs : list = [os.path.normpath(os.path.join(output_dir, name)) for name in files]
+    for path, content in zip(outputs, files.values()):
+        write_if_changed(path, content)
+
+    parameters : dict = {"MEM_DEPTH": MEM_DEPTH, "MEM_WIDTH": MEM_WIDTH, "pipeline_stages": pipeline_stages, "arch": cost["arch"],
+                         "cache_entries": cache_entries, "cache_policy": cache_policy, "cache_region_bits": cache_region_bits,
+                         "ports": ports, "shadow_bank": shadow_bank, "slots_per_mid": slots_per_mid, "encoding": encoding,
+                         "rules_per_cycle": rules_per_cycle, "scan_slots": scan_slots}
+    parameters["latency"], parameters["settle_cycles"] = test_bench_timing(MEM_DEPTH, cost, pipeline_stages, rules_per_cycle, scan_slots)
+    inputs : list = GENERATOR_SOURCES + ([rules_file] if cost["arch"] == "interval" and isinstance(rules_file, (str, os.PathLike)) else [])
+    record(os.path.join(output_dir, MANIFEST_FILE), "wrapper", parameters, inputs, outputs)
+
+    return cost
 
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description='Generate VHDL files for a wrapper with specified MEM_DEPTH and MEM_WIDTH.')
     parser.add_argument('--mem_depth','-d', type=int, default= MEM_DEPTH, required=False, help='Memory depth (number of memory cells)')
     parser.add_argument('--mem_width','-w', type=int, default= MEM_WIDTH, required=False, help='Memory width (width of each memory cell)')
+    parser.add_argument('--pipeline_stages','--pipeline-stages','-p', type=int, default= 1, required=False, help='Number of pipeline stages of the rule matching (latency in clock cycles), 1 keeps the single cycle loop')
+    parser.add_argument('--arch','-a', choices=ARCHITECTURES + ['auto'], default= 'scan', required=False, help='Rule matching architecture: scan of the rules array, interval index compiled from a static rule file, direct-mapped permission bitmap, multi-cycle scan of rules kept in block RAM, or auto to let the cost model choose between scan and bitmap')
+    parser.add_argument('--target', choices=['latency', 'area'], default= 'latency', required=False, help='What --arch auto minimises: decision latency (cycles then logic levels) or area (storage and comparator bits)')
+    parser.add_argument('--cache_entries','-c', type=int, default= 0, required=False, help='Number of entries per lane of the decision cache in front of the rules array scan, 0 for no cache')
+    parser.add_argument('--cache_policy', choices=['fifo', 'lru'], default= 'fifo', required=False, help='Replacement policy of the decision cache')
+    parser.add_argument('--cache_region_bits', type=int, default= 0, required=False, help='log2 of the number of addresses sharing a cached decision, only exact when no rule bound splits a region')
+    parser.add_argument('--ports', type=int, default= 0, required=False, help='Number of extra request ports, each with its own MID, lane, x_enable and address, checked in the same cycle against the rules array')
+    parser.add_argument('--shadow_bank', action='store_true', help='Write the rules into a shadow bank made active by a bank_swap pulse, the active bank keeps answering during reprogramming')
+    parser.add_argument('--slots_per_mid', type=int, default= 0, required=False, help='Partition the rules array in one bank of this many rules (a power of two) per MID, a request is only compared with its bank; 0 keeps one shared array')
+    parser.add_argument('--encoding','-e', choices=ENCODINGS, default= 'range', required=False, help='Address field of the rules: addr_min and addr_max, or one NAPOT region (naturally aligned power of two, one masked equality per rule and an address about twice as wide)')
+    parser.add_argument('--rules_per_cycle','-k', type=int, default= 1, required=False, help='Rules compared per clock cycle by the bram architecture (a power of two), the scan of all the rules takes MEM_DEPTH/rules_per_cycle cycles')
+    parser.add_argument('--scan_slots', type=int, default= 1, required=False, help='Scans in flight in the bram architecture, each one with its own comparators : one request pair accepted every MEM_DEPTH/rules_per_cycle/scan_slots cycles')
+    parser.add_argument('--rules','-r', default= os.path.join("test_bench_generator", "memory_configuration.txt"), required=False, help='Static rule file compiled by the interval architecture')
 
     args = parser.parse_args()
 
-    generate_vhdl( args.mem_depth, args.mem_width)
+    if args.arch == "auto":
+        args.arch = select_architecture(args.mem_depth, args.mem_width, args.target, pipeline_stages=args.pipeline_stages, rules_file=args.rules,
+                                        cache_entries=args.cache_entries, cache_policy=args.cache_policy, cache_region_bits=args.cache_region_bits,
+                                        ports=args.ports, shadow_bank=args.shadow_bank, slots_per_mid=args.slots_per_mid, encoding=args.encoding,
+                                        rules_per_cycle=args.rules_per_cycle, scan_slots=args.scan_slots)
+        print(f"Architecture selected for {args.target}: {args.arch}")
+    try:
+        validate_options(args.mem_depth, args.arch, args.pipeline_stages, args.rules, args.cache_entries, args.cache_policy, args.cache_region_bits,
+                         args.ports, args.shadow_bank, args.slots_per_mid, args.encoding, args.rules_per_cycle, args.scan_slots)
+    except ValueError as error:
+        parser.error(str(error))
+
+    cost = generate_vhdl( args.mem_depth, args.mem_width, args.pipeline_stages, args.arch, args.rules,
+                          args.cache_entries, args.cache_policy, args.cache_region_bits, args.ports, args.shadow_bank, slots_per_mid=args.slots_per_mid,
+                          encoding=args.encoding, rules_per_cycle=args.rules_per_cycle, scan_slots=args.scan_slots)
 
     if MEM_DEPTH == args.mem_depth and MEM_WIDTH == args.mem_width:
         print(f"VHDL files generated with MEM_DEPTH = {MEM_DEPTH} and MEM_WIDTH = {MEM_WIDTH} to change this values use the -d and -w options")
@@ -311,4 +2379,27 @@ if __name__ == "__main__":
         MEM_WIDTH = args.mem_width
         print(f"VHDL files generated with MEM_DEPTH = {args.mem_depth} and MEM_WIDTH = {args.mem_width}")
 
-    
\ No newline at end of file
+    
+
+    if args.pipeline_stages > 1:
+        fan_in, sizes = or_tree_levels(args.mem_depth, args.pipeline_stages)
+        print(f"Pipelined rule matching: {args.pipeline_stages} stages (comparators then OR-tree of fan-in {fan_in}), responses {args.pipeline_stages} clock cycles after the request")
+    if args.slots_per_mid > 0:
+        ID_width : int = math.ceil(math.log2(args.mem_depth))
+        print(f"Partitioned rules: {2**ID_width} banks of {args.slots_per_mid} slot(s), rule_number is MID & slot, "
+              f"generate the test bench with --slots_per_mid {args.slots_per_mid}")
+    if args.encoding == "napot":
+        ID_width : int = math.ceil(math.log2(args.mem_depth))
+        print(f"NAPOT rules: {rule_adress_width(args.mem_width, ID_width, 'napot')} bit addresses instead of {rule_adress_width(args.mem_width, ID_width)}, "
+              f"generate the test bench with --encoding napot")
+    if args.arch == "bitmap":
+        ID_width : int = math.ceil(math.log2(args.mem_depth))
+        adress_width : int = math.ceil((args.mem_width-ID_width-3)/2)
+        print(f"Permission bitmap: {args.mem_depth} planes of 4 x {2**(ID_width+1+adress_width)} bits, reprogramming a rule takes up to {2*2**adress_width+2} clock cycles, "
+              f"the rules written together are redrawn one after the other")
+    if args.arch == "bram":
+        rows, _, decision_latency, hold_latency = bram_scan_schedule(args.mem_depth, args.rules_per_cycle, args.scan_slots)
+        print(f"Block RAM scan: {args.rules_per_cycle} RAM(s) of {rows} rules, {args.scan_slots} scan(s) in flight, {cost['decisions_per_cycle']:.3f} request pairs per cycle, "
+              f"decisions {decision_latency} clock cycles after the AXI handshake, generate the test bench with --latency {hold_latency}")
+    print(f"Cost model: {cost['equality_comparators']} equality and {cost['magnitude_comparators']} magnitude comparators ({cost['comparator_bits']} input bits), "
+          f"{cost['storage_bits']} storage bits, OR depth {cost['or_depth']}, {cost['logic_levels']} logic levels per cycle, latency {cost['latency_cycles']} cycle(s)")
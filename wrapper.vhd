@@ -4,7 +4,10 @@ use ieee.numeric_std.all;
 use work.Memory_type.all;
 
 entity wrapper is
-
+    generic (
+        -- rule image the rules start from, see load_rule_image in rules_array.vhd
+        INIT_FILE : string := ""
+    );
     port (
         clk     : in std_logic;
         reset   : in std_logic;
@@ -18,6 +21,9 @@ entity wrapper is
         x_enable : in std_logic;
         addr_w  : in std_logic_vector(4 DOWNTO 0);
         addr_r  : in std_logic_vector(4 DOWNTO 0);
+        -- highest address of the burst footprint starting at addr_w / addr_r, a request is allowed when one rule contains the footprint
+        addr_w_last : in std_logic_vector(4 DOWNTO 0);
+        addr_r_last : in std_logic_vector(4 DOWNTO 0);
         -- output
         wrapper_write_response  : out std_logic := '0';
         wrapper_read_response   : out std_logic := '0'
@@ -31,6 +37,9 @@ begin
 
     -- instance of memory for rules
     rules_array_inst: entity work.rules_array
+     generic map(
+        INIT_FILE => INIT_FILE
+    )
      port map(
         CLK => clk,
         RESET => reset,
@@ -60,10 +69,10 @@ begin
                     field_rwx := rules_array(i)(12 DOWNTO 10);
                     field_addr_min := rules_array(i)(9 DOWNTO 5);
                     field_addr_max := rules_array(i)(4 DOWNTO 0);
-                    if field_id = MID_W AND field_rwx = ("01" & x_enable) AND addr_w >= field_addr_min AND addr_w < field_addr_max then
+                    if field_id = MID_W AND field_rwx = ("01" & x_enable) AND addr_w >= field_addr_min AND addr_w_last < field_addr_max then
                         res_w := '1';
                     end if;
-                    if field_id = MID_R AND field_rwx = ("10" & x_enable) AND addr_r >= field_addr_min AND addr_r < field_addr_max then
+                    if field_id = MID_R AND field_rwx = ("10" & x_enable) AND addr_r >= field_addr_min AND addr_r_last < field_addr_max then
                         res_r := '1';
                     end if;
                 end loop;